@@ -20,6 +20,7 @@
 # along with PyX; if not, write to the Free Software
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
 
+import weakref
 from . import attr
 
 class canvasitem:
@@ -67,6 +68,55 @@ class canvasitem:
         """
         raise NotImplementedError()
 
+    def addparent(self, parent):
+        """register a canvas the canvasitem was inserted into
+
+        Canvases cache the bounding box of modifiablecanvasitems, which
+        invalidate the cached bounding boxes of their parents when modified.
+        The bounding box of all other canvasitems and of volatile
+        modifiablecanvasitems is recalculated on each request."""
+        pass
+
+
+class modifiable:
+
+    """Base class for objects notifying their parents about modifications"""
+
+    __slots__ = ()
+
+    _parents = None
+
+    def addparent(self, parent):
+        if self._parents is None:
+            self._parents = []
+        else:
+            # remove parents not alive anymore
+            self._parents = [ref for ref in self._parents if ref() is not None]
+        self._parents.append(weakref.ref(parent))
+
+    def modified(self):
+        """invalidate the cached bounding boxes of the parents
+
+        Has to be called whenever the bounding box of the object changes."""
+        if self._parents:
+            for parent in self._parents:
+                parent = parent()
+                if parent is not None:
+                    parent.modified()
+
+
+class modifiablecanvasitem(modifiable, canvasitem):
+
+    """Base class for canvasitems which may change their bounding box after
+    being inserted into a canvas"""
+
+    def isvolatile(self):
+        """return whether the bounding box might change without a notification
+
+        The bounding box of volatile items is not cached by their parents.
+        The result is valid after calling :meth:`bbox` only."""
+        return False
+
 
 class deformer(attr.attr):
 
@@ -20,7 +20,7 @@
 # along with PyX; if not, write to the Free Software
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
 
-import binascii, hashlib, logging, struct, io
+import binascii, functools, hashlib, itertools, logging, struct, io, weakref
 try:
     import zlib
     haszlib = True
@@ -28,6 +28,7 @@ except ImportError:
     haszlib = False
 
 from . import bbox, baseclasses, pswriter, pdfwriter, trafo, unit
+from .writer import ascii85lines, ascii85stream, asciihexlines, asciihexstream
 
 logger = logging.getLogger("pyx")
 
@@ -40,59 +41,6 @@ decodestrings = {"L": "[0 1]",
                  "P": "[0 255]"}
 
 
-def ascii85lines(datalen):
-    if datalen < 4:
-        return 1
-    return (datalen + 56)/60
-
-def ascii85stream(file, data):
-    """Encodes the string data in ASCII85 and writes it to
-    the stream file. The number of lines written to the stream
-    is known just from the length of the data by means of the
-    ascii85lines function. Note that the tailing newline character
-    of the last line is not added by this function, but it is taken
-    into account in the ascii85lines function."""
-    i = 3 # go on smoothly in case of data length equals zero
-    l = 0
-    l = [None, None, None, None]
-    for i in range(len(data)):
-        c = data[i]
-        l[i%4] = c
-        if i%4 == 3:
-            if i%60 == 3 and i != 3:
-                file.write("\n")
-            if l:
-                # instead of
-                # l[3], c5 = divmod(256*256*256*l[0]+256*256*l[1]+256*l[2]+l[3], 85)
-                # l[2], c4 = divmod(l[3], 85)
-                # we have to avoid number > 2**31 by
-                l[3], c5 = divmod(256*256*l[0]+256*256*l[1]+256*l[2]+l[3], 85)
-                l[2], c4 = divmod(256*256*3*l[0]+l[3], 85)
-                l[1], c3 = divmod(l[2], 85)
-                c1  , c2 = divmod(l[1], 85)
-                file.write_bytes(struct.pack("BBBBB", c1+33, c2+33, c3+33, c4+33, c5+33))
-            else:
-                file.write("z")
-    if i%4 != 3:
-        for j in range((i%4) + 1, 4):
-            l[j] = 0
-        l[3], c5 = divmod(256*256*l[0]+256*256*l[1]+256*l[2]+l[3], 85)
-        l[2], c4 = divmod(256*256*3*l[0]+l[3], 85)
-        l[1], c3 = divmod(l[2], 85)
-        c1  , c2 = divmod(l[1], 85)
-        file.write_bytes(struct.pack("BBBB", c1+33, c2+33, c3+33, c4+33)[:(i%4)+2])
-
-_asciihexlinelength = 64
-def asciihexlines(datalen):
-    return (datalen*2 + _asciihexlinelength - 1) / _asciihexlinelength
-
-def asciihexstream(file, data):
-    hexdata = binascii.b2a_hex(data)
-    for i in range((len(hexdata)-1)/_asciihexlinelength + 1):
-        file.write(hexdata[i*_asciihexlinelength: i*_asciihexlinelength+_asciihexlinelength])
-        file.write("\n")
-
-
 class palette:
 
     def __init__(self, mode, data):
@@ -105,7 +53,7 @@ class palette:
 
 class image:
 
-    def __init__(self, width, height, mode, data, compressed=None, palette=None):
+    def __init__(self, width, height, mode, data, compressed=None, palette=None, decodeparms=None):
         if width <= 0 or height <= 0:
             raise ValueError("valid image size")
         if mode not in ["L", "RGB", "CMYK", "LA", "RGBA", "CMYKA", "AL", "ARGB", "ACMYK", "P"]:
@@ -117,6 +65,7 @@ class image:
         self.data = data
         self.compressed = compressed
         self.palette = palette
+        self.decodeparms = decodeparms
 
     def split(self):
         if self.compressed is not None:
@@ -214,6 +163,152 @@ class jpegimage(image):
         file.write(self.data)
 
 
+def _addbytes(a, b):
+    """ returns the bytewise sum modulo 256 of the bytes a and b of equal length"""
+    n = len(a)
+    x = int.from_bytes(a, "big")
+    y = int.from_bytes(b, "big")
+    low = int.from_bytes(b"\x7f"*n, "big")
+    high = int.from_bytes(b"\x80"*n, "big")
+    # the sum of the lower seven bits does not carry into the next byte
+    return (((x & low) + (y & low)) ^ ((x ^ y) & high)).to_bytes(n, "big")
+
+
+def pngunfilter(data, width, height, bytesperpixel):
+    """ returns the pixel data of the PNG scanlines in data
+
+    Each scanline of width pixels is preceded by its filter type byte. The
+    sub and up filters are undone for whole scanlines at once, while the
+    average and Paeth filters require a loop over the bytes."""
+    rowlength = width*bytesperpixel
+    result = bytearray(rowlength*height)
+    prior = bytes(rowlength)
+    pos = 0
+    for y in range(height):
+        filtertype = data[pos]
+        row = bytearray(data[pos+1:pos+1+rowlength])
+        pos += rowlength + 1
+        if filtertype == 4 and not any(prior):
+            filtertype = 1 # the Paeth predictor is the left byte for the first scanline
+        if filtertype == 1:
+            for i in range(bytesperpixel):
+                row[i::bytesperpixel] = bytes(map((255).__and__, itertools.accumulate(row[i::bytesperpixel])))
+        elif filtertype == 2:
+            row = bytearray(_addbytes(row, prior))
+        elif filtertype == 3:
+            for i in range(rowlength):
+                left = row[i-bytesperpixel] if i >= bytesperpixel else 0
+                row[i] = (row[i] + ((left + prior[i]) >> 1)) & 0xff
+        elif filtertype == 4:
+            for i in range(rowlength):
+                if i >= bytesperpixel:
+                    a = row[i-bytesperpixel]
+                    c = prior[i-bytesperpixel]
+                else:
+                    a = c = 0
+                b = prior[i]
+                p = a + b - c
+                pa = abs(p - a)
+                pb = abs(p - b)
+                pc = abs(p - c)
+                if pa <= pb and pa <= pc:
+                    row[i] = (row[i] + a) & 0xff
+                elif pb <= pc:
+                    row[i] = (row[i] + b) & 0xff
+                else:
+                    row[i] = (row[i] + c) & 0xff
+        elif filtertype:
+            raise ValueError("invalid PNG filter type %i" % filtertype)
+        result[y*rowlength:(y+1)*rowlength] = row
+        prior = row
+    return bytes(result)
+
+
+class pngimage(image):
+
+    """ image read from a PNG file
+
+    For grayscale, RGB, and palette images the compressed data of the IDAT
+    chunks is kept and passed to the output as a Flate stream with the PNG
+    predictor. Only images with an alpha channel are uncompressed in order to
+    separate the alpha channel. PIL is used for this when available."""
+
+    def __init__(self, file):
+        try:
+            data = file.read()
+        except Exception:
+            with open(file, "rb") as f:
+                data = f.read()
+        if data[:8] != b"\x89PNG\r\n\x1a\n":
+            raise ValueError("PNG signature expected")
+        pos = 8
+        idat = []
+        mode = palettedata = None
+        while True:
+            if pos + 8 > len(data):
+                raise ValueError("IEND chunk expected")
+            length, name = struct.unpack(">I4s", data[pos:pos+8])
+            chunk = data[pos+8:pos+8+length]
+            pos += length + 12
+            if name == b"IHDR":
+                width, height, bits, colortype, compression, filtermethod, interlace = struct.unpack(">2I5B", chunk)
+                if bits != 8:
+                    raise ValueError("implementation limited to 8 bit per component only")
+                if interlace:
+                    raise ValueError("interlaced PNG images not supported")
+                try:
+                    mode = {0: "L", 2: "RGB", 3: "P", 4: "LA", 6: "RGBA"}[colortype]
+                except KeyError:
+                    raise ValueError("invalid color type")
+            elif name == b"PLTE":
+                palettedata = chunk
+            elif name == b"IDAT":
+                idat.append(chunk)
+            elif name == b"tRNS":
+                logger.warning("transparency of PNG image ignored")
+            elif name == b"pHYs":
+                xppu, yppu, unit = struct.unpack(">2IB", chunk)
+                if unit == 1:
+                    self.info = {"dpi": (xppu*0.0254, yppu*0.0254)}
+                # else do not provide dpi information
+            elif name == b"IEND":
+                break
+        if mode is None:
+            raise ValueError("IHDR chunk expected")
+        self.pngdata = data[:pos]
+        idat = b"".join(idat)
+
+        if mode == "P":
+            if palettedata is None:
+                raise ValueError("PLTE chunk expected")
+            apalette = palette("RGB", palettedata)
+        else:
+            apalette = None
+        if len(mode) == 2 or len(mode) == 4:
+            if not haszlib:
+                raise ValueError("PNG image with alpha channel not available due to missing zlib module.")
+            try:
+                from PIL import Image
+            except ImportError:
+                pixels = pngunfilter(zlib.decompress(idat), width, height, len(mode))
+            else:
+                # PIL undoes the filters much faster
+                pixels = Image.open(io.BytesIO(self.pngdata)).tobytes()
+            image.__init__(self, width, height, mode, pixels)
+        else:
+            image.__init__(self, width, height, mode, idat, compressed="Flate", palette=apalette,
+                           decodeparms={"Predictor": 15, "Colors": len(mode), "BitsPerComponent": 8, "Columns": width})
+
+    def save(self, file, format=None, **attrs):
+        if format != "png":
+            raise RuntimeError("PNG image can be output as PNG only.")
+        file.write(self.pngdata)
+
+
+def decodeparmsstring(decodeparms):
+    return "<< %s >>" % " ".join("/%s %s" % item for item in decodeparms.items())
+
+
 class PSimagedata(pswriter.PSresource):
 
     def __init__(self, name, data, singlestring, maxstrlen):
@@ -234,7 +329,7 @@ class PSimagedata(pswriter.PSresource):
             datalen = len(self.data)
             tailpos = datalen - datalen % self.maxstrlen
             file.write("%%%%BeginData: %i ASCII Lines\n" %
-                       ((tailpos/self.maxstrlen) * ascii85lines(self.maxstrlen) +
+                       ((tailpos//self.maxstrlen) * ascii85lines(self.maxstrlen) +
                         ascii85lines(datalen-tailpos)))
             file.write("[ ")
             for i in range(0, tailpos, self.maxstrlen):
@@ -270,7 +365,7 @@ class PDFimagepalettedata(pdfwriter.PDFobject):
 class PDFimage(pdfwriter.PDFobject):
 
     def __init__(self, name, width, height, palettemode, palettedata, mode,
-                       bitspercomponent, compressmode, data, smask, registry, addresource=True):
+                       bitspercomponent, compressmode, data, smask, registry, addresource=True, decodeparms=None):
         pdfwriter.PDFobject.__init__(self, "image", name)
 
         if addresource:
@@ -296,6 +391,7 @@ class PDFimage(pdfwriter.PDFobject):
         self.compressmode = compressmode
         self.data = data
         self.smask = smask
+        self.decodeparms = decodeparms
 
     def write(self, file, writer, registry):
         file.write("<<\n"
@@ -315,12 +411,61 @@ class PDFimage(pdfwriter.PDFobject):
         file.write("/Length %d\n" % len(self.data))
         if self.compressmode:
             file.write("/Filter /%sDecode\n" % self.compressmode)
+        if self.decodeparms:
+            file.write("/DecodeParms %s\n" % decodeparmsstring(self.decodeparms))
         file.write(">>\n"
                    "stream\n")
         file.write_bytes(self.data)
         file.write("\n"
                    "endstream\n")
 
+def selectbands(data, bands, indices):
+    """ returns the interleaved pixel data of the bands at the given indices
+
+    data contains the interleaved pixel data of bands bands. The bands are
+    copied by strided slice assignments, not pixel by pixel."""
+    result = bytearray(len(data) // bands * len(indices))
+    for i, index in enumerate(indices):
+        result[i::len(indices)] = data[index::bands]
+    return bytes(result)
+
+
+class encodedimagecache:
+
+    """ cache of the encoded image data
+
+    The encoded data is stored per image instance and encoding parameters.
+    The images are referenced weakly, i.e. the encoded data is dropped when
+    the image is deleted. The encoded data is also dropped when the mode, the
+    size or a checksum of the pixel data of the image has changed since its
+    encoding, i.e. when the image has been modified in place."""
+
+    def __init__(self):
+        self.entries = {}
+
+    def _remove(self, imageid, ref):
+        entry = self.entries.get(imageid)
+        if entry is not None and entry[0] is ref:
+            del self.entries[imageid]
+
+    def get(self, image, key, encode):
+        """ returns the encoded data of image for the key of the
+        encoding parameters, calling encode (without arguments) once only
+        for an unmodified image"""
+        state = image.mode, image.size, binascii.crc32(image.tobytes())
+        entry = self.entries.get(id(image))
+        if entry is None or entry[0]() is not image or entry[1] != state:
+            try:
+                ref = weakref.ref(image, functools.partial(self._remove, id(image)))
+            except TypeError:
+                return encode()
+            entry = self.entries[id(image)] = ref, state, {}
+        encoded = entry[2]
+        if key not in encoded:
+            encoded[key] = encode()
+        return encoded[key]
+
+_encodedimagecache = encodedimagecache()
 
 
 class bitmap_trafo(baseclasses.canvasitem):
@@ -346,6 +491,13 @@ class bitmap_trafo(baseclasses.canvasitem):
             self.imagecompressed = image.compressed
         except Exception:
             self.imagecompressed = None
+        try:
+            self.imagedecodeparms = image.decodeparms
+        except Exception:
+            self.imagedecodeparms = None
+        if self.compressmode == "Flate" and self.imagecompressed == "Flate":
+            # pass through the compressed data
+            self.compressmode = None
         if self.compressmode not in [None, "Flate", "DCT"]:
             raise ValueError("invalid compressmode '%s'" % self.compressmode)
         if self.imagecompressed not in [None, "Flate", "DCT"]:
@@ -364,8 +516,14 @@ class bitmap_trafo(baseclasses.canvasitem):
         returned as a band in alpha itself. For interleavealpha == True
         alpha will be True and the channel is interleaved in front of each
         pixel in data.
+
+        The result is cached for the image and the encoding parameters.
         """
+        key = (interleavealpha, self.compressmode, self.flatecompresslevel,
+               self.dctquality, self.dctoptimize, self.dctprogression)
+        return _encodedimagecache.get(self.image, key, lambda: self._imagedata(interleavealpha))
 
+    def _imagedata(self, interleavealpha):
         alpha = palettemode = palettedata = None
         data = self.image
         mode = data.mode
@@ -374,28 +532,19 @@ class bitmap_trafo(baseclasses.canvasitem):
             if interleavealpha:
                 alpha = True
             else:
-                bands = data.split()
-                alpha = bands[0]
+                alpha = data.split()[0]
                 data = image(self.imagewidth, self.imageheight, mode,
-                             b"".join([bytes(values)
-                                       for values in zip(*[band.tobytes()
-                                                           for band in bands[1:]])]), palette=data.palette)
+                             selectbands(data.tobytes(), len(mode)+1, range(1, len(mode)+1)), palette=data.palette)
         if mode.endswith("A"):
-            bands = data.split()
             mode = mode[:-1]
             if interleavealpha:
                 alpha = True
-                bands = list(bands[-1:]) + list(bands[:-1])
                 data = image(self.imagewidth, self.imageheight, "A%s" % mode,
-                             b"".join([bytes(values)
-                                       for values in zip(*[band.tobytes()
-                                                           for band in bands])]), palette=data.palette)
+                             selectbands(data.tobytes(), len(mode)+1, [len(mode)] + list(range(len(mode)))), palette=data.palette)
             else:
-                alpha = bands[-1]
+                alpha = data.split()[-1]
                 data = image(self.imagewidth, self.imageheight, mode,
-                             b"".join([bytes(values)
-                                       for values in zip(*[band.tobytes()
-                                                           for band in bands[:-1]])]), palette=data.palette)
+                             selectbands(data.tobytes(), len(mode)+1, range(len(mode))), palette=data.palette)
 
         if mode == "P":
             palettemode, palettedata = data.palette.getdata()
@@ -500,6 +649,8 @@ class bitmap_trafo(baseclasses.canvasitem):
                 file.write("currentfile /ASCIIHexDecode filter")
             else:
                 file.write("currentfile /ASCII85Decode filter")
+        if self.imagedecodeparms:
+            file.write(" %s" % decodeparmsstring(self.imagedecodeparms))
         if self.compressmode or self.imagecompressed:
             file.write(" /%sDecode filter" % (self.compressmode or self.imagecompressed))
         file.write("\n")
@@ -548,7 +699,8 @@ class bitmap_trafo(baseclasses.canvasitem):
             registry.add(alpha)
         registry.add(PDFimage(name, self.imagewidth, self.imageheight,
                               palettemode, palettedata, mode, 8,
-                              self.compressmode or self.imagecompressed, data, alpha, registry))
+                              self.compressmode or self.imagecompressed, data, alpha, registry,
+                              decodeparms=self.imagedecodeparms))
 
         bbox += self.bbox()
 
@@ -558,7 +710,7 @@ class bitmap_trafo(baseclasses.canvasitem):
         file.write("Q\n")
 
     def processSVG(self, xml, writer, context, registry, bbox):
-        if self.compressmode == "Flate":
+        if self.compressmode == "Flate" or (self.imagecompressed == "Flate" and isinstance(self.image, pngimage)):
             f = io.BytesIO()
             self.image.save(f, "png")
             inlinedata = "data:image/png;base64," + binascii.b2a_base64(f.getvalue()).decode('ascii').replace("\n", "")
@@ -566,6 +718,8 @@ class bitmap_trafo(baseclasses.canvasitem):
             f = io.BytesIO()
             self.image.save(f, "jpeg")
             inlinedata = "data:image/jpeg;base64," + binascii.b2a_base64(f.getvalue()).decode('ascii').replace("\n", "")
+        elif self.imagecompressed == "Flate":
+            raise ValueError("SVG cannot store Flate compressed image data except for PNG images.")
         else:
             raise ValueError("SVG cannot store uncompressed image data.")
         attrs = {"preserveAspectRatio": "none", "x": "0", "y": "-1", "width": "1", "height": "1", "xlink:href": inlinedata}
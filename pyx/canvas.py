@@ -96,7 +96,7 @@ class clip(attr.attr):
 # general canvas class
 #
 
-class canvas(baseclasses.canvasitem):
+class canvas(baseclasses.modifiablecanvasitem):
 
     """a canvas holds a collection of canvasitems"""
 
@@ -119,6 +119,14 @@ class canvas(baseclasses.canvasitem):
         """
 
         self.items = []
+        # cached bbox of the modifiablecanvasitems (not taking into account
+        # trafo and clip) or None when it needs to be calculated
+        self.itemsbbox = None
+        # the other items, whose bbox is calculated on each call of bbox() as
+        # they do not notify the canvas about their modifications (like
+        # normpaths being extended after having been stroked); valid only
+        # when itemsbbox is not None
+        self.volatileitems = []
         self.trafo = trafo.identity
         self.clip = None
         self.layers = {}
@@ -157,7 +165,17 @@ class canvas(baseclasses.canvasitem):
     def clear(self):
         """clear canvas"""
         self.items.clear()
+        self.volatileitems.clear()
         self.layers.clear()
+        self.modified()
+
+    def modified(self):
+        self.itemsbbox = None
+        baseclasses.modifiablecanvasitem.modified(self)
+
+    def isvolatile(self):
+        # the bbox of a canvas with volatile items may change without notice
+        return self.itemsbbox is None or bool(self.volatileitems)
 
     def _repr_png_(self):
         """
@@ -179,8 +197,19 @@ class canvas(baseclasses.canvasitem):
         Note that this bounding box doesn't take into account the linewidths, so
         is less accurate than the one used when writing the output to a file.
         """
-        obbox = bboxmodule.empty()
-        for cmd in self.items:
+        if self.itemsbbox is None:
+            itemsbbox = bboxmodule.empty()
+            self.volatileitems = []
+            for cmd in self.items:
+                if isinstance(cmd, baseclasses.modifiablecanvasitem):
+                    cmdbbox = cmd.bbox()
+                    if not cmd.isvolatile():
+                        itemsbbox += cmdbbox
+                        continue
+                self.volatileitems.append(cmd)
+            self.itemsbbox = itemsbbox
+        obbox = self.itemsbbox.copy()
+        for cmd in self.volatileitems:
             obbox += cmd.bbox()
 
         # transform according to our global transformation and
@@ -305,8 +334,9 @@ class canvas(baseclasses.canvasitem):
                     # remove for repositioning
                     self.items.remove(self.layers[name])
             else:
-                # create new layer
+                # create new layer (empty, i.e. the bbox is not modified)
                 self.layers[name] = canvas(textengine=self.textengine)
+                self.layers[name].addparent(self)
                 if above is None and below is None:
                     self.items.append(self.layers[name])
 
@@ -348,6 +378,21 @@ class canvas(baseclasses.canvasitem):
             item = sc
 
         self.items.append(item)
+        item.addparent(self)
+        if self.itemsbbox is not None:
+            if not isinstance(item, baseclasses.modifiablecanvasitem):
+                self.volatileitems.append(item)
+            elif isinstance(item, canvas) and item.itemsbbox is None:
+                # do not force the calculation of the bbox of the inserted
+                # canvas (for a graph this would finish it)
+                self.itemsbbox = None
+            else:
+                itembbox = item.bbox()
+                if item.isvolatile():
+                    self.volatileitems.append(item)
+                else:
+                    self.itemsbbox += itembbox
+        baseclasses.modifiablecanvasitem.modified(self)
         return item
 
     def draw(self, path, attrs):
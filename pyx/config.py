@@ -20,7 +20,7 @@
 # along with PyX; if not, write to the Free Software
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
 
-import configparser, io, logging, os, pkgutil, subprocess, shutil
+import atexit, configparser, io, json, logging, os, pkgutil, subprocess, shutil, tempfile
 
 logger = logging.getLogger("pyx")
 logger_execute = logging.getLogger("pyx.execute")
@@ -231,27 +231,122 @@ def fix_cygwin(full_filename):
 
 
 class kpsewhich:
-    """locate files using the kpsewhich executable"""
+    """locate files using the kpsewhich executable
+
+    Several files of the same format are located by a single kpsewhich call
+    (see prefetch). The results are cached and, when the option 'kpsewhichcache'
+    is set, stored in this file for later runs. The stored results are dropped
+    when one of the ls-R databases of the TeX installation is modified."""
 
     def __init__(self):
         self.kpsewhich = get("filelocator", "kpsewhich", "kpsewhich")
+        self.cachefilename = get("filelocator", "kpsewhichcache", None)
+        # maps (format name, filename) to the full filename or None, when the
+        # file could not be found
+        self.locations = None
+        self.modified = False
+
+    def run(self, args):
+        """returns the output lines of a kpsewhich call"""
+        with Popen([self.kpsewhich] + args, stdout=subprocess.PIPE) as process:
+            with io.TextIOWrapper(process.stdout, encoding="ascii", errors="surrogateescape") as text_output:
+                return [fix_cygwin(line.rstrip()) for line in text_output if line.rstrip()]
+
+    def databases(self):
+        """returns the signatures of the ls-R databases"""
+        result = {}
+        for database in self.run(["--all", "--format", "ls-R", "ls-R"]):
+            stat = os.stat(database)
+            result[database] = [stat.st_mtime_ns, stat.st_size]
+        return result
+
+    def readcache(self):
+        self.locations = {}
+        if self.cachefilename is None:
+            return
+        atexit.register(self.writecache)
+        try:
+            with builtinopen(self.cachefilename, "r", encoding="utf-8") as f:
+                cache = json.load(f)
+            if cache["kpsewhich"] != self.kpsewhich:
+                return
+            for database, signature in cache["databases"].items():
+                stat = os.stat(database)
+                if [stat.st_mtime_ns, stat.st_size] != signature:
+                    return
+        except (EnvironmentError, ValueError, KeyError):
+            return
+        for formatname, filename, full_filename in cache["locations"]:
+            self.locations[formatname, filename] = full_filename
+
+    def writecache(self):
+        if not self.modified:
+            return
+        try:
+            databases = self.databases()
+            if not databases:
+                return
+            locations = [[formatname, filename, full_filename]
+                         for (formatname, filename), full_filename in self.locations.items()
+                         # files not found and results relative to the current
+                         # directory depend on the environment and are not stored
+                         if full_filename is not None and os.path.isabs(full_filename)]
+            dirname = os.path.dirname(os.path.abspath(self.cachefilename))
+            fd, tmpfilename = tempfile.mkstemp(prefix=".", dir=dirname)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"kpsewhich": self.kpsewhich, "databases": databases, "locations": locations}, f)
+            os.replace(tmpfilename, self.cachefilename)
+        except EnvironmentError as e:
+            logger.warning("could not write kpsewhich cache file '%s': %s" % (self.cachefilename, e))
+
+    def prefetch(self, filenames, formats):
+        if self.locations is None:
+            self.readcache()
+        for format in formats:
+            missing = [filename for filename in filenames if (format.name, filename) not in self.locations]
+            if missing:
+                try:
+                    full_filenames = self.run(["--format", format.name] + missing)
+                except OSError:
+                    return
+                # kpsewhich only outputs the files found (keeping the order)
+                unmatched = []
+                for filename in missing:
+                    basename = os.path.basename(filename)
+                    if full_filenames and (os.path.basename(full_filenames[0]) == basename or
+                                           os.path.basename(full_filenames[0]).startswith(basename + ".")):
+                        self.locations[format.name, filename] = full_filenames.pop(0)
+                    else:
+                        unmatched.append(filename)
+                for filename in unmatched:
+                    if full_filenames:
+                        # some result could not be matched by its name, thus we
+                        # need to locate the remaining files one by one
+                        try:
+                            self.locations[format.name, filename] = (self.run(["--format", format.name, filename]) or [None])[0]
+                        except OSError:
+                            return
+                    else:
+                        self.locations[format.name, filename] = None
+                self.modified = True
+            # files found already need not be located for further formats
+            filenames = [filename for filename in filenames if not self.locations[format.name, filename]]
 
     def openers(self, filename, formats):
         full_filename = None
         for format in formats:
-            try:
-                with Popen([self.kpsewhich, '--format', format.name, filename], stdout=subprocess.PIPE) as process:
-                    with io.TextIOWrapper(process.stdout, encoding="ascii", errors="surrogateescape") as text_output:
-                        full_filename = text_output.readline().rstrip()
-            except OSError:
-                return []
+            self.prefetch([filename], [format])
+            full_filename = self.locations.get((format.name, filename))
+            if full_filename and not os.path.exists(full_filename):
+                # the cached location is outdated
+                del self.locations[format.name, filename]
+                self.prefetch([filename], [format])
+                full_filename = self.locations.get((format.name, filename))
             if full_filename:
                 break
         else:
             return []
 
-        full_filename = fix_cygwin(full_filename)
-
         def _opener():
             try:
                 return builtinopen(full_filename, "rb")
@@ -367,6 +462,16 @@ methods = [locator_classes[method]()
 opener_cache = {}
 
 
+def prefetch(filenames, formats):
+    """locates several files at once by the methods supporting it
+
+    This is an optimization only: open still has to be called for each of the
+    files."""
+    for method in methods:
+        if hasattr(method, "prefetch"):
+            method.prefetch(filenames, formats)
+
+
 def open(filename, formats, ascii=False):
     """returns an open file searched according the list of formats"""
 
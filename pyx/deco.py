@@ -26,7 +26,7 @@
 #   should we at least factor it out?
 
 import sys, math
-from . import attr, baseclasses, canvas, color, path, normpath, style, trafo, unit, deformer
+from . import attr, baseclasses, canvas, color, mathutils, path, normpath, style, trafo, unit, deformer
 
 _marker = object()
 
@@ -34,7 +34,7 @@ _marker = object()
 # Decorated path
 #
 
-class decoratedpath(baseclasses.canvasitem):
+class decoratedpath(baseclasses.modifiablecanvasitem):
     """Decorated path
 
     The main purpose of this class is during the drawing
@@ -64,10 +64,17 @@ class decoratedpath(baseclasses.canvasitem):
 
         self.nostrokeranges = None
 
+        # cached bbox, invalidated by modifications of the path and the ornaments
+        self._bbox = None
+        if isinstance(self.path, baseclasses.modifiable):
+            self.path.addparent(self)
+        self.ornaments.addparent(self)
+
     def ensurenormpath(self):
         """convert self.path into a normpath"""
         assert self.nostrokeranges is None or isinstance(self.path, path.normpath), "you don't understand what you are doing"
         self.path = self.path.normpath()
+        self.modified()
 
     def excluderange(self, begin, end):
         assert isinstance(self.path, path.normpath), "you don't understand what this is about"
@@ -97,13 +104,24 @@ class decoratedpath(baseclasses.canvasitem):
 
             self.nostrokeranges[ibegin:iend+1] = [(begin, end)]
 
+    def modified(self):
+        self._bbox = None
+        baseclasses.modifiablecanvasitem.modified(self)
+
+    def isvolatile(self):
+        # normpaths do not notify about their modifications
+        return not isinstance(self.path, baseclasses.modifiable) or self.ornaments.isvolatile()
+
     def bbox(self):
+        if self._bbox is not None:
+            return self._bbox.copy()
         pathbbox = self.path.bbox()
         ornamentsbbox = self.ornaments.bbox()
         if ornamentsbbox is not None:
-            return ornamentsbbox + pathbbox
-        else:
-            return pathbbox
+            pathbbox = ornamentsbbox + pathbbox
+        if not self.isvolatile():
+            self._bbox = pathbbox.copy()
+        return pathbbox
 
     def strokepath(self):
         if self.nostrokeranges:
@@ -739,6 +757,40 @@ class shownormpath(deco, attr.attr):
                     dp.ornaments.fill(path.circle_pt(x_pt, y_pt, self.endpoint_size_pt), self.endpoint_attrs)
 
 
+def _hatchcrossings(crossings, x0_pt, dist_pt, xa_pt, xb_pt, y_pt):
+    """add the crossings of a monotonic segment from xa_pt to xb_pt to the
+    hatch lines at x0_pt + i*dist_pt
+
+    The crossings are stored as tuples (y, direction), where y is calculated
+    by the function y_pt for the x coordinate of the hatch line. The x range
+    is taken as a half-open interval to count a crossing at a point joining
+    two segments once."""
+    if xa_pt == xb_pt:
+        return
+    xmin_pt, xmax_pt = min(xa_pt, xb_pt), max(xa_pt, xb_pt)
+    direction = 1 if xb_pt > xa_pt else -1
+    for i in range(max(0, int(math.floor((xmin_pt-x0_pt)/dist_pt))),
+                   min(len(crossings), int(math.ceil((xmax_pt-x0_pt)/dist_pt)) + 1)):
+        x_pt = x0_pt + i*dist_pt
+        if xmin_pt <= x_pt < xmax_pt:
+            crossings[i].append((y_pt(x_pt), direction))
+
+
+def _hatchcurvecrossings(crossings, x0_pt, dist_pt, curve):
+    """add the crossings of a normcurve_pt to the hatch lines at x0_pt + i*dist_pt"""
+    a = curve.x3_pt - 3*curve.x2_pt + 3*curve.x1_pt - curve.x0_pt
+    b = 3*curve.x0_pt - 6*curve.x1_pt + 3*curve.x2_pt
+    c = 3*curve.x1_pt - 3*curve.x0_pt
+    # split the curve into parts being monotonic in x
+    ts = [0] + sorted(t for t in mathutils.realpolyroots(3*a, 2*b, c) if 0 < t < 1) + [1]
+    for ta, tb in zip(ts[:-1], ts[1:]):
+        def y_pt(x_pt, ta=ta, tb=tb):
+            roots = mathutils.realpolyroots(a, b, c, curve.x0_pt-x_pt) or [ta]
+            t = min(roots, key=lambda t: max(ta-t, t-tb))
+            return curve.y_pt(min(max(t, ta), tb))
+        _hatchcrossings(crossings, x0_pt, dist_pt, curve.x_pt(ta), curve.x_pt(tb), y_pt)
+
+
 class linehatched(deco, attr.exclusiveattr, attr.clearclass):
     """draws a pattern with explicit lines
 
@@ -774,10 +826,39 @@ class linehatched(deco, attr.exclusiveattr, attr.clearclass):
         center_pt = 0.5*(llx_pt+urx_pt), 0.5*(lly_pt+ury_pt)
         radius_pt = 0.5*math.hypot(urx_pt-llx_pt, ury_pt-lly_pt) + dist_pt
         n = int(2*radius_pt / dist_pt) + 1
-        for i in range(n):
-            x_pt = center_pt[0] - radius_pt + i*dist_pt
-            c.stroke(path.line_pt(x_pt, center_pt[1]-radius_pt, x_pt, center_pt[1]+radius_pt),
-                     [trafo.rotate_pt(angle, center_pt[0], center_pt[1])] + self.strokestyles)
+        x0_pt = center_pt[0] - radius_pt
+
+        # The hatch lines are vertical lines at x0_pt + i*dist_pt in the
+        # coordinates rotated by -angle. They are clipped to the inside of
+        # the path according to the nonzero winding rule by means of the
+        # crossings of the path with the lines.
+        crossings = [[] for i in range(n)]
+        for normsubpath in dp.path.transformed(trafo.rotate_pt(-angle, *center_pt)).normsubpaths:
+            items = list(normsubpath.normsubpathitems)
+            if not items:
+                continue
+            if not normsubpath.closed:
+                items.append(normpath.normline_pt(*(items[-1].atend_pt() + items[0].atbegin_pt())))
+            for item in items:
+                if isinstance(item, normpath.normline_pt):
+                    _hatchcrossings(crossings, x0_pt, dist_pt, item.x0_pt, item.x1_pt,
+                                    lambda x_pt, item=item: item.y0_pt + (item.y1_pt-item.y0_pt)*(x_pt-item.x0_pt)/(item.x1_pt-item.x0_pt))
+                else:
+                    _hatchcurvecrossings(crossings, x0_pt, dist_pt, item)
+
+        hatchitems = []
+        for i, ys_pt in enumerate(crossings):
+            x_pt = x0_pt + i*dist_pt
+            winding = 0
+            for y_pt, direction in sorted(ys_pt):
+                if not winding:
+                    y0_pt = y_pt
+                winding += direction
+                if not winding:
+                    hatchitems.append(path.moveto_pt(x_pt, y0_pt))
+                    hatchitems.append(path.lineto_pt(x_pt, y_pt))
+        if hatchitems:
+            c.stroke(path.path(*hatchitems), [trafo.rotate_pt(angle, center_pt[0], center_pt[1])] + self.strokestyles)
         return c
 
     def decorate(self, dp, texrunner):
@@ -82,8 +82,11 @@ class DVIError(Exception): pass
 
 class DVIfile:
 
-    def __init__(self, filename, debug=0, debugfile=sys.stdout):
-        """ opens the dvi file and reads the preamble """
+    def __init__(self, filename, debug=0, debugfile=sys.stdout, data=None):
+        """ opens the dvi file and reads the preamble
+
+        When data is not None, the dvi file is read from the given bytes
+        instead of the file filename."""
         self.filename = filename
         self.debug = debug
         self.debugfile = debugfile
@@ -92,6 +95,14 @@ class DVIfile:
         self.fonts = {}
         self.activefont = None
 
+        # font definitions (checksum, scale, design size, name) by font number
+        # and fonts used on the current page (used by pagedata)
+        self.fontdefs = {}
+        self.pagefonts = set()
+
+        # file positions of the beginning and the end of the current page
+        self.pagestart = self.pageend = None
+
         # stack of fonts and fontscale currently used (used for VFs)
         self.fontstack = []
         self.stack = []
@@ -102,7 +113,10 @@ class DVIfile:
         # stack for self.file, self.fonts and self.stack, needed for VF inclusion
         self.statestack = []
 
-        self.file = reader.reader(self.filename)
+        if data is None:
+            self.file = reader.reader(self.filename)
+        else:
+            self.file = reader.bytesreader(data)
 
         # currently read byte in file (for debugging output)
         self.filepos = None
@@ -185,6 +199,8 @@ class DVIfile:
     def usefont(self, fontnum, id1234, fontmap):
         self.flushtext(fontmap)
         self.activefont = self.fonts[fontnum]
+        if not self.statestack:
+            self.pagefonts.add(fontnum)
         if self.debug:
             self.debugfile.write("%d: fnt%s%i current font is %s\n" %
                                  (self.filepos,
@@ -208,6 +224,7 @@ class DVIfile:
             afont = texfont.TeXfont(fontname, c, q/self.tfmconv, d/self.tfmconv, self.tfmconv, self.pyxconv, self.debug>1)
 
         self.fonts[num] = afont
+        self.fontdefs[num] = c, q, d, fontname
 
         if self.debug:
             self.debugfile.write("%d: fntdef%d %i: %s\n" % (self.filepos, cmdnr, num, fontname))
@@ -319,6 +336,28 @@ class DVIfile:
         else:
             raise RuntimeError("unknown PyX special '%s', aborting" % command)
 
+    def pagedata(self, pageid):
+        """ returns the page read last as dvi data of its own
+
+        The returned dvi data contains a single page with the given pageid. It
+        includes the definitions of all fonts used on the page and can be read
+        by a DVIfile instance created with the data argument."""
+
+        # skip bop, the ten counts and the pointer to the previous page
+        bodystart = self.pagestart + 45
+        pos = self.file.tell()
+        self.file.seek(bodystart)
+        body = self.file.read(self.pageend - bodystart)
+        self.file.seek(pos)
+        fontdefs = []
+        for num in sorted(self.pagefonts):
+            c, q, d, fontname = self.fontdefs[num]
+            fontname = fontname.encode("ascii")
+            fontdefs.append(struct.pack(">BllllBB", _DVI_FNTDEF1234+3, num, c, q, d, 0, len(fontname)) + fontname)
+        return b"".join([struct.pack(">BBLLLB", _DVI_PRE, _DVI_VERSION, self.num, self.den, self.mag, 0),
+                         struct.pack(">B10Ll", _DVI_BOP, *pageid, -1)]
+                        + fontdefs + [body, bytes([_DVI_POST])])
+
     # routines for pushing and popping different dvi chunks on the reader
 
     def _push_dvistring(self, dvi, fonts, afterpos, fontsize, fontmap):
@@ -368,8 +407,8 @@ class DVIfile:
                 pass
             elif cmd == _DVI_PRE:
                 if afile.readuchar() != _DVI_VERSION: raise DVIError
-                num = afile.readuint32()
-                den = afile.readuint32()
+                self.num = num = afile.readuint32()
+                self.den = den = afile.readuint32()
                 self.mag = afile.readuint32()
 
                 # For the interpretation of the lengths in dvi and tfm files, 
@@ -421,6 +460,8 @@ class DVIfile:
                 if self.debug:
                     self.debugfile.write("%d: beginning of page %i\n" % (self.filepos, ispageid[0]))
                 self.file.readuint32()
+                self.pagestart = self.filepos
+                self.pagefonts = set()
                 break
             elif cmd == _DVI_POST:
                 self.file.close()
@@ -435,6 +476,7 @@ class DVIfile:
         # tuple (hpos, vpos, codepoints) to be output, or None if no output is pending
         self.activetext = None
 
+        dispatch = _dispatch
         while True:
             afile = self.file
             self.filepos = afile.tell()
@@ -445,172 +487,247 @@ class DVIfile:
                 # so we have to continue with the rest of the dvi file
                 self._pop_dvistring(fontmap)
                 continue
-            if cmd == _DVI_NOP:
-                pass
-            if cmd >= _DVI_CHARMIN and cmd <= _DVI_CHARMAX:
-                self.putchar(cmd, True, 0, fontmap)
-            elif cmd >= _DVI_SET1234 and cmd < _DVI_SET1234 + 4:
-                self.putchar(afile.readint(cmd - _DVI_SET1234 + 1), True, cmd-_DVI_SET1234+1, fontmap)
-            elif cmd == _DVI_SETRULE:
-                self.putrule(afile.readint32()*self.scale, afile.readint32()*self.scale, True, fontmap)
-            elif cmd >= _DVI_PUT1234 and cmd < _DVI_PUT1234 + 4:
-                self.putchar(afile.readint(cmd - _DVI_PUT1234 + 1), False, cmd-_DVI_SET1234+1, fontmap)
-            elif cmd == _DVI_PUTRULE:
-                self.putrule(afile.readint32()*self.scale, afile.readint32()*self.scale, False, fontmap)
-            elif cmd == _DVI_EOP:
-                self.flushtext(fontmap)
-                if self.debug:
-                    self.debugfile.write("%d: eop\n \n" % self.filepos)
+            if dispatch[cmd](self, cmd, afile, fontmap):
                 return self.actpage
-            elif cmd == _DVI_PUSH:
-                self.stack.append(list(self.pos))
-                if self.debug:
-                    self.debugfile.write("%s: push\n"
-                                         "level %d:(h=%d,v=%d,w=%d,x=%d,y=%d,z=%d,hh=???,vv=???)\n" %
-                                         ((self.filepos, len(self.stack)-1) + tuple(self.pos)))
-            elif cmd == _DVI_POP:
-                self.flushtext(fontmap)
-                self.pos = self.stack.pop()
-                if self.debug:
-                    self.debugfile.write("%s: pop\n"
-                                         "level %d:(h=%d,v=%d,w=%d,x=%d,y=%d,z=%d,hh=???,vv=???)\n" %
-                                         ((self.filepos, len(self.stack)) + tuple(self.pos)))
-            elif cmd >= _DVI_RIGHT1234 and cmd < _DVI_RIGHT1234 + 4:
-                self.flushtext(fontmap)
-                dh = afile.readint(cmd - _DVI_RIGHT1234 + 1, 1) * self.scale
-                if self.debug:
-                    self.debugfile.write("%d: right%d %d h:=%d%+d=%d, hh:=???\n" %
-                                         (self.filepos,
-                                          cmd - _DVI_RIGHT1234 + 1,
-                                          dh,
-                                          self.pos[_POS_H],
-                                          dh,
-                                          self.pos[_POS_H]+dh))
-                self.pos[_POS_H] += dh
-            elif cmd == _DVI_W0:
-                self.flushtext(fontmap)
-                if self.debug:
-                    self.debugfile.write("%d: w0 %d h:=%d%+d=%d, hh:=???\n" %
-                                         (self.filepos,
-                                          self.pos[_POS_W],
-                                          self.pos[_POS_H],
-                                          self.pos[_POS_W],
-                                          self.pos[_POS_H]+self.pos[_POS_W]))
-                self.pos[_POS_H] += self.pos[_POS_W]
-            elif cmd >= _DVI_W1234 and cmd < _DVI_W1234 + 4:
-                self.flushtext(fontmap)
-                self.pos[_POS_W] = afile.readint(cmd - _DVI_W1234 + 1, 1) * self.scale
-                if self.debug:
-                    self.debugfile.write("%d: w%d %d h:=%d%+d=%d, hh:=???\n" %
-                                         (self.filepos,
-                                          cmd - _DVI_W1234 + 1,
-                                          self.pos[_POS_W],
-                                          self.pos[_POS_H],
-                                          self.pos[_POS_W],
-                                          self.pos[_POS_H]+self.pos[_POS_W]))
-                self.pos[_POS_H] += self.pos[_POS_W]
-            elif cmd == _DVI_X0:
-                self.flushtext(fontmap)
-                if self.debug:
-                    self.debugfile.write("%d: x0 %d h:=%d%+d=%d, hh:=???\n" %
-                                         (self.filepos,
-                                          self.pos[_POS_X],
-                                          self.pos[_POS_H],
-                                          self.pos[_POS_X],
-                                          self.pos[_POS_H]+self.pos[_POS_X]))
-                self.pos[_POS_H] += self.pos[_POS_X]
-            elif cmd >= _DVI_X1234 and cmd < _DVI_X1234 + 4:
-                self.flushtext(fontmap)
-                self.pos[_POS_X] = afile.readint(cmd - _DVI_X1234 + 1, 1) * self.scale
-                if self.debug:
-                    self.debugfile.write("%d: x%d %d h:=%d%+d=%d, hh:=???\n" %
-                                         (self.filepos,
-                                          cmd - _DVI_X1234 + 1,
-                                          self.pos[_POS_X],
-                                          self.pos[_POS_H],
-                                          self.pos[_POS_X],
-                                          self.pos[_POS_H]+self.pos[_POS_X]))
-                self.pos[_POS_H] += self.pos[_POS_X]
-            elif cmd >= _DVI_DOWN1234 and cmd < _DVI_DOWN1234 + 4:
-                self.flushtext(fontmap)
-                dv = afile.readint(cmd - _DVI_DOWN1234 + 1, 1) * self.scale
-                if self.debug:
-                    self.debugfile.write("%d: down%d %d v:=%d%+d=%d, vv:=???\n" %
-                                         (self.filepos,
-                                          cmd - _DVI_DOWN1234 + 1,
-                                          dv,
-                                          self.pos[_POS_V],
-                                          dv,
-                                          self.pos[_POS_V]+dv))
-                self.pos[_POS_V] += dv
-            elif cmd == _DVI_Y0:
-                self.flushtext(fontmap)
-                if self.debug:
-                    self.debugfile.write("%d: y0 %d v:=%d%+d=%d, vv:=???\n" %
-                                         (self.filepos,
-                                          self.pos[_POS_Y],
-                                          self.pos[_POS_V],
-                                          self.pos[_POS_Y],
-                                          self.pos[_POS_V]+self.pos[_POS_Y]))
-                self.pos[_POS_V] += self.pos[_POS_Y]
-            elif cmd >= _DVI_Y1234 and cmd < _DVI_Y1234 + 4:
-                self.flushtext(fontmap)
-                self.pos[_POS_Y] = afile.readint(cmd - _DVI_Y1234 + 1, 1) * self.scale
-                if self.debug:
-                    self.debugfile.write("%d: y%d %d v:=%d%+d=%d, vv:=???\n" %
-                                         (self.filepos,
-                                          cmd - _DVI_Y1234 + 1,
-                                          self.pos[_POS_Y],
-                                          self.pos[_POS_V],
-                                          self.pos[_POS_Y],
-                                          self.pos[_POS_V]+self.pos[_POS_Y]))
-                self.pos[_POS_V] += self.pos[_POS_Y]
-            elif cmd == _DVI_Z0:
-                self.flushtext(fontmap)
-                if self.debug:
-                    self.debugfile.write("%d: z0 %d v:=%d%+d=%d, vv:=???\n" %
-                                         (self.filepos,
-                                          self.pos[_POS_Z],
-                                          self.pos[_POS_V],
-                                          self.pos[_POS_Z],
-                                          self.pos[_POS_V]+self.pos[_POS_Z]))
-                self.pos[_POS_V] += self.pos[_POS_Z]
-            elif cmd >= _DVI_Z1234 and cmd < _DVI_Z1234 + 4:
-                self.flushtext(fontmap)
-                self.pos[_POS_Z] = afile.readint(cmd - _DVI_Z1234 + 1, 1) * self.scale
-                if self.debug:
-                    self.debugfile.write("%d: z%d %d v:=%d%+d=%d, vv:=???\n" %
-                                         (self.filepos,
-                                          cmd - _DVI_Z1234 + 1,
-                                          self.pos[_POS_Z],
-                                          self.pos[_POS_V],
-                                          self.pos[_POS_Z],
-                                          self.pos[_POS_V]+self.pos[_POS_Z]))
-                self.pos[_POS_V] += self.pos[_POS_Z]
-            elif cmd >= _DVI_FNTNUMMIN and cmd <= _DVI_FNTNUMMAX:
-                self.usefont(cmd - _DVI_FNTNUMMIN, 0, fontmap)
-            elif cmd >= _DVI_FNT1234 and cmd < _DVI_FNT1234 + 4:
-                # note that according to the DVI docs, for four byte font numbers,
-                # the font number is signed. Don't ask why!
-                fntnum = afile.readint(cmd - _DVI_FNT1234 + 1, cmd == _DVI_FNT1234 + 3)
-                self.usefont(fntnum, cmd-_DVI_FNT1234+1, fontmap)
-            elif cmd >= _DVI_SPECIAL1234 and cmd < _DVI_SPECIAL1234 + 4:
-                self.special(afile.read(afile.readint(cmd - _DVI_SPECIAL1234 + 1)).decode("ascii"), fontmap)
-            elif cmd >= _DVI_FNTDEF1234 and cmd < _DVI_FNTDEF1234 + 4:
-                if cmd == _DVI_FNTDEF1234:
-                    num = afile.readuchar()
-                elif cmd == _DVI_FNTDEF1234+1:
-                    num = afile.readuint16()
-                elif cmd == _DVI_FNTDEF1234+2:
-                    num = afile.readuint24()
-                elif cmd == _DVI_FNTDEF1234+3:
-                    # Cool, here we have according to docu a signed int. Why?
-                    num = afile.readint32()
-                self.definefont(cmd-_DVI_FNTDEF1234+1,
-                                num,
-                                afile.readint32(),
-                                afile.readint32(),
-                                afile.readint32(),
-                                afile.read(afile.readuchar()+afile.readuchar()).decode("ascii"))
-            else:
-                raise DVIError
+
+    # handlers of the dvi commands within a page as called by readpage via the
+    # dispatch table; a true return value signals the end of the page
+
+    def _dvi_invalid(self, cmd, afile, fontmap):
+        raise DVIError
+
+    def _dvi_nop(self, cmd, afile, fontmap):
+        pass
+
+    def _dvi_setchar(self, cmd, afile, fontmap):
+        font = self.activefont
+        if self.debug or self.singlecharmode or isinstance(font, texfont.virtualfont):
+            self.putchar(cmd, True, 0, fontmap)
+            return
+        # typeset the whole run of characters at once
+        afile.seek(self.filepos)
+        chars = afile.readmatch(_DVI_CHARRUN)
+        try:
+            dx = sum(map(font.getwidths_dvi().__getitem__, chars))
+        except TypeError:
+            # invalid character in the run
+            for char in chars:
+                self.putchar(char, True, 0, fontmap)
+            return
+        if self.activetext is None:
+            self.activetext = (self.pos[_POS_H], self.pos[_POS_V], [])
+        self.activetext[2].extend(chars)
+        self.pos[_POS_H] += dx
+
+    def _dvi_set(self, cmd, afile, fontmap):
+        self.putchar(afile.readint(cmd - _DVI_SET1234 + 1), True, cmd-_DVI_SET1234+1, fontmap)
+
+    def _dvi_setrule(self, cmd, afile, fontmap):
+        self.putrule(afile.readint32()*self.scale, afile.readint32()*self.scale, True, fontmap)
+
+    def _dvi_put(self, cmd, afile, fontmap):
+        self.putchar(afile.readint(cmd - _DVI_PUT1234 + 1), False, cmd-_DVI_SET1234+1, fontmap)
+
+    def _dvi_putrule(self, cmd, afile, fontmap):
+        self.putrule(afile.readint32()*self.scale, afile.readint32()*self.scale, False, fontmap)
+
+    def _dvi_eop(self, cmd, afile, fontmap):
+        self.flushtext(fontmap)
+        self.pageend = afile.tell()
+        if self.debug:
+            self.debugfile.write("%d: eop\n \n" % self.filepos)
+        return True
+
+    def _dvi_push(self, cmd, afile, fontmap):
+        self.stack.append(list(self.pos))
+        if self.debug:
+            self.debugfile.write("%s: push\n"
+                                 "level %d:(h=%d,v=%d,w=%d,x=%d,y=%d,z=%d,hh=???,vv=???)\n" %
+                                 ((self.filepos, len(self.stack)-1) + tuple(self.pos)))
+
+    def _dvi_pop(self, cmd, afile, fontmap):
+        self.flushtext(fontmap)
+        self.pos = self.stack.pop()
+        if self.debug:
+            self.debugfile.write("%s: pop\n"
+                                 "level %d:(h=%d,v=%d,w=%d,x=%d,y=%d,z=%d,hh=???,vv=???)\n" %
+                                 ((self.filepos, len(self.stack)) + tuple(self.pos)))
+
+    def _dvi_right(self, cmd, afile, fontmap):
+        self.flushtext(fontmap)
+        dh = afile.readint(cmd - _DVI_RIGHT1234 + 1, 1) * self.scale
+        if self.debug:
+            self.debugfile.write("%d: right%d %d h:=%d%+d=%d, hh:=???\n" %
+                                 (self.filepos,
+                                  cmd - _DVI_RIGHT1234 + 1,
+                                  dh,
+                                  self.pos[_POS_H],
+                                  dh,
+                                  self.pos[_POS_H]+dh))
+        self.pos[_POS_H] += dh
+
+    def _dvi_w0(self, cmd, afile, fontmap):
+        self.flushtext(fontmap)
+        if self.debug:
+            self.debugfile.write("%d: w0 %d h:=%d%+d=%d, hh:=???\n" %
+                                 (self.filepos,
+                                  self.pos[_POS_W],
+                                  self.pos[_POS_H],
+                                  self.pos[_POS_W],
+                                  self.pos[_POS_H]+self.pos[_POS_W]))
+        self.pos[_POS_H] += self.pos[_POS_W]
+
+    def _dvi_w(self, cmd, afile, fontmap):
+        self.flushtext(fontmap)
+        self.pos[_POS_W] = afile.readint(cmd - _DVI_W1234 + 1, 1) * self.scale
+        if self.debug:
+            self.debugfile.write("%d: w%d %d h:=%d%+d=%d, hh:=???\n" %
+                                 (self.filepos,
+                                  cmd - _DVI_W1234 + 1,
+                                  self.pos[_POS_W],
+                                  self.pos[_POS_H],
+                                  self.pos[_POS_W],
+                                  self.pos[_POS_H]+self.pos[_POS_W]))
+        self.pos[_POS_H] += self.pos[_POS_W]
+
+    def _dvi_x0(self, cmd, afile, fontmap):
+        self.flushtext(fontmap)
+        if self.debug:
+            self.debugfile.write("%d: x0 %d h:=%d%+d=%d, hh:=???\n" %
+                                 (self.filepos,
+                                  self.pos[_POS_X],
+                                  self.pos[_POS_H],
+                                  self.pos[_POS_X],
+                                  self.pos[_POS_H]+self.pos[_POS_X]))
+        self.pos[_POS_H] += self.pos[_POS_X]
+
+    def _dvi_x(self, cmd, afile, fontmap):
+        self.flushtext(fontmap)
+        self.pos[_POS_X] = afile.readint(cmd - _DVI_X1234 + 1, 1) * self.scale
+        if self.debug:
+            self.debugfile.write("%d: x%d %d h:=%d%+d=%d, hh:=???\n" %
+                                 (self.filepos,
+                                  cmd - _DVI_X1234 + 1,
+                                  self.pos[_POS_X],
+                                  self.pos[_POS_H],
+                                  self.pos[_POS_X],
+                                  self.pos[_POS_H]+self.pos[_POS_X]))
+        self.pos[_POS_H] += self.pos[_POS_X]
+
+    def _dvi_down(self, cmd, afile, fontmap):
+        self.flushtext(fontmap)
+        dv = afile.readint(cmd - _DVI_DOWN1234 + 1, 1) * self.scale
+        if self.debug:
+            self.debugfile.write("%d: down%d %d v:=%d%+d=%d, vv:=???\n" %
+                                 (self.filepos,
+                                  cmd - _DVI_DOWN1234 + 1,
+                                  dv,
+                                  self.pos[_POS_V],
+                                  dv,
+                                  self.pos[_POS_V]+dv))
+        self.pos[_POS_V] += dv
+
+    def _dvi_y0(self, cmd, afile, fontmap):
+        self.flushtext(fontmap)
+        if self.debug:
+            self.debugfile.write("%d: y0 %d v:=%d%+d=%d, vv:=???\n" %
+                                 (self.filepos,
+                                  self.pos[_POS_Y],
+                                  self.pos[_POS_V],
+                                  self.pos[_POS_Y],
+                                  self.pos[_POS_V]+self.pos[_POS_Y]))
+        self.pos[_POS_V] += self.pos[_POS_Y]
+
+    def _dvi_y(self, cmd, afile, fontmap):
+        self.flushtext(fontmap)
+        self.pos[_POS_Y] = afile.readint(cmd - _DVI_Y1234 + 1, 1) * self.scale
+        if self.debug:
+            self.debugfile.write("%d: y%d %d v:=%d%+d=%d, vv:=???\n" %
+                                 (self.filepos,
+                                  cmd - _DVI_Y1234 + 1,
+                                  self.pos[_POS_Y],
+                                  self.pos[_POS_V],
+                                  self.pos[_POS_Y],
+                                  self.pos[_POS_V]+self.pos[_POS_Y]))
+        self.pos[_POS_V] += self.pos[_POS_Y]
+
+    def _dvi_z0(self, cmd, afile, fontmap):
+        self.flushtext(fontmap)
+        if self.debug:
+            self.debugfile.write("%d: z0 %d v:=%d%+d=%d, vv:=???\n" %
+                                 (self.filepos,
+                                  self.pos[_POS_Z],
+                                  self.pos[_POS_V],
+                                  self.pos[_POS_Z],
+                                  self.pos[_POS_V]+self.pos[_POS_Z]))
+        self.pos[_POS_V] += self.pos[_POS_Z]
+
+    def _dvi_z(self, cmd, afile, fontmap):
+        self.flushtext(fontmap)
+        self.pos[_POS_Z] = afile.readint(cmd - _DVI_Z1234 + 1, 1) * self.scale
+        if self.debug:
+            self.debugfile.write("%d: z%d %d v:=%d%+d=%d, vv:=???\n" %
+                                 (self.filepos,
+                                  cmd - _DVI_Z1234 + 1,
+                                  self.pos[_POS_Z],
+                                  self.pos[_POS_V],
+                                  self.pos[_POS_Z],
+                                  self.pos[_POS_V]+self.pos[_POS_Z]))
+        self.pos[_POS_V] += self.pos[_POS_Z]
+
+    def _dvi_fntnum(self, cmd, afile, fontmap):
+        self.usefont(cmd - _DVI_FNTNUMMIN, 0, fontmap)
+
+    def _dvi_fnt(self, cmd, afile, fontmap):
+        # note that according to the DVI docs, for four byte font numbers,
+        # the font number is signed. Don't ask why!
+        fntnum = afile.readint(cmd - _DVI_FNT1234 + 1, cmd == _DVI_FNT1234 + 3)
+        self.usefont(fntnum, cmd-_DVI_FNT1234+1, fontmap)
+
+    def _dvi_special(self, cmd, afile, fontmap):
+        self.special(afile.read(afile.readint(cmd - _DVI_SPECIAL1234 + 1)).decode("ascii"), fontmap)
+
+    def _dvi_fntdef(self, cmd, afile, fontmap):
+        # Cool, here we have according to docu a signed int for four byte font numbers. Why?
+        num = afile.readint(cmd - _DVI_FNTDEF1234 + 1, cmd == _DVI_FNTDEF1234 + 3)
+        self.definefont(cmd-_DVI_FNTDEF1234+1,
+                        num,
+                        afile.readint32(),
+                        afile.readint32(),
+                        afile.readint32(),
+                        afile.read(afile.readuchar()+afile.readuchar()).decode("ascii"))
+
+
+# run of characters typeset by consecutive set_char commands
+_DVI_CHARRUN = re.compile(b"[\\x%02x-\\x%02x]+" % (_DVI_CHARMIN, _DVI_CHARMAX))
+
+# dispatch table mapping the dvi commands to their handlers in readpage
+_dispatch = [DVIfile._dvi_invalid] * 256
+
+def _register(handler, first, last=None):
+    for cmd in range(first, (last if last is not None else first) + 1):
+        _dispatch[cmd] = handler
+
+_register(DVIfile._dvi_setchar, _DVI_CHARMIN, _DVI_CHARMAX)
+_register(DVIfile._dvi_set, _DVI_SET1234, _DVI_SET1234 + 3)
+_register(DVIfile._dvi_setrule, _DVI_SETRULE)
+_register(DVIfile._dvi_put, _DVI_PUT1234, _DVI_PUT1234 + 3)
+_register(DVIfile._dvi_putrule, _DVI_PUTRULE)
+_register(DVIfile._dvi_nop, _DVI_NOP)
+_register(DVIfile._dvi_eop, _DVI_EOP)
+_register(DVIfile._dvi_push, _DVI_PUSH)
+_register(DVIfile._dvi_pop, _DVI_POP)
+_register(DVIfile._dvi_right, _DVI_RIGHT1234, _DVI_RIGHT1234 + 3)
+_register(DVIfile._dvi_w0, _DVI_W0)
+_register(DVIfile._dvi_w, _DVI_W1234, _DVI_W1234 + 3)
+_register(DVIfile._dvi_x0, _DVI_X0)
+_register(DVIfile._dvi_x, _DVI_X1234, _DVI_X1234 + 3)
+_register(DVIfile._dvi_down, _DVI_DOWN1234, _DVI_DOWN1234 + 3)
+_register(DVIfile._dvi_y0, _DVI_Y0)
+_register(DVIfile._dvi_y, _DVI_Y1234, _DVI_Y1234 + 3)
+_register(DVIfile._dvi_z0, _DVI_Z0)
+_register(DVIfile._dvi_z, _DVI_Z1234, _DVI_Z1234 + 3)
+_register(DVIfile._dvi_fntnum, _DVI_FNTNUMMIN, _DVI_FNTNUMMAX)
+_register(DVIfile._dvi_fnt, _DVI_FNT1234, _DVI_FNT1234 + 3)
+_register(DVIfile._dvi_special, _DVI_SPECIAL1234, _DVI_SPECIAL1234 + 3)
+_register(DVIfile._dvi_fntdef, _DVI_FNTDEF1234, _DVI_FNTDEF1234 + 3)
@@ -23,6 +23,7 @@
 import io, logging, os.path, re
 from pyx import font, config
 from pyx.font import t1file, afmfile, pfmfile
+from pyx.font.fontcache import fontcache
 from pyx.dvi import encfile
 
 logger = logging.getLogger("pyx")
@@ -127,7 +128,7 @@ class MAPline:
         if self._font is None:
             if self.fontfilename is not None:
                 with config.open(self.fontfilename, [config.format.type1]) as fontfile:
-                    t1font = t1file.T1File.from_PF_bytes(fontfile.read())
+                    t1font = fontcache.get("type1", fontfile, lambda: t1file.T1File.from_PF_bytes(fontfile.read()))
                 assert self.basepsname == t1font.name, "corrupt MAP file"
                 try:
                     with config.open(os.path.splitext(self.fontfilename)[0], [config.format.afm], ascii=True) as metricfile:
@@ -152,7 +153,7 @@ class MAPline:
         if self._encoding is _marker:
             if self.encodingfilename is not None:
                 with config.open(self.encodingfilename, [config.format.tex_ps_header]) as encodingfile:
-                    ef = encfile.ENCfile(encodingfile.read().decode("ascii", errors="surrogateescape"))
+                    ef = fontcache.get("enc", encodingfile, lambda: encfile.ENCfile(encodingfile.read().decode("ascii", errors="surrogateescape")))
                 assert ef.name == "/%s" % self.reencodefont
                 self._encoding = ef.vector
 
@@ -169,6 +170,7 @@ class MAPline:
 def readfontmap(filenames):
     """ read font map from filename (without path) """
     fontmap = {}
+    config.prefetch(filenames, [config.format.fontmap, config.format.dvips_config])
     for filename in filenames:
         with config.open(filename, [config.format.fontmap, config.format.dvips_config], ascii=True) as mapfile:
             lineno = 0
@@ -22,6 +22,7 @@
 
 
 from pyx import bbox, font, config
+from pyx.font.fontcache import fontcache
 from . import tfmfile, vffile
 
 class TeXFontError(Exception): pass
@@ -35,7 +36,8 @@ class TeXfont:
         self.tfmconv = tfmconv      # conversion factor from tfm units to dvi units
         self.pyxconv = pyxconv      # conversion factor from dvi units to PostScript points
         with config.open(self.name, [config.format.tfm]) as file:
-            self.TFMfile = tfmfile.TFMfile(file, debug)
+            self.TFMfile = fontcache.get("tfm", file, lambda: tfmfile.TFMfile(file, debug), debug)
+        self._widths_dvi = None
 
         # We only check for equality of font checksums if none of them
         # is zero. The case c == 0 happend in some VF files and
@@ -103,6 +105,16 @@ class TeXfont:
     def getwidth_dvi(self, charcode):
         return self._convert_tfm_to_dvi(self.TFMfile.width[self.TFMfile.char_info[charcode].width_index])
 
+    def getwidths_dvi(self):
+        """ return list of the widths of all characters indexed by the char code
+
+        Non-existing characters have a width of None."""
+        if self._widths_dvi is None:
+            self._widths_dvi = [self.getwidth_dvi(charcode) if charinfo is not None else None
+                                for charcode, charinfo in enumerate(self.TFMfile.char_info)]
+            self._widths_dvi.extend([None] * (256 - len(self._widths_dvi)))
+        return self._widths_dvi
+
     def getheight_dvi(self, charcode):
         return self._convert_tfm_to_dvi(self.TFMfile.height[self.TFMfile.char_info[charcode].height_index])
 
@@ -139,7 +151,8 @@ class virtualfont(TeXfont):
 
     def __init__(self, name, file, c, q, d, tfmconv, pyxconv, debug=0):
         TeXfont.__init__(self, name, c, q, d, tfmconv, pyxconv, debug)
-        self.vffile = vffile.vffile(file, 1.0*q/d, tfmconv, pyxconv, debug > 1)
+        self.vffile = fontcache.get("vf", file, lambda: vffile.vffile(file, 1.0*q/d, tfmconv, pyxconv, debug > 1),
+                                    1.0*q/d, tfmconv, pyxconv, debug > 1)
 
     def getfonts(self):
         """ return fonts used in virtual font itself """
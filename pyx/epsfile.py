@@ -20,8 +20,8 @@
 # along with PyX; if not, write to the Free Software
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
 
-import logging, os, string, tempfile
-from . import baseclasses, bbox, config, unit, trafo, pswriter
+import collections, hashlib, logging, math, os, re, string, subprocess, tempfile, zlib
+from . import baseclasses, bbox, config, unit, trafo, pswriter, pdfwriter
 
 logger = logging.getLogger("pyx")
 
@@ -223,6 +223,448 @@ def _readbbox(file):
     return usebbox
 
 
+class PDFref:
+
+    """indirect object reference in a PDF file"""
+
+    def __init__(self, num):
+        self.num = num
+
+
+class PDFstream:
+
+    """stream object in a PDF file"""
+
+    def __init__(self, dict, data):
+        self.dict = dict
+        self.data = data
+
+
+class PDFreader:
+
+    """a minimal PDF reader to access the objects of a PDF file
+
+    PDF objects are represented by Python objects: dictionaries by dicts with
+    the names as keys, arrays by lists, references by PDFref instances,
+    streams by PDFstream instances, and all other objects by the bytes of
+    their PDF representation (including the leading slash of names and the
+    delimiters of strings). Only files having a cross-reference table can be
+    read, i.e. cross-reference streams and object streams of PDF 1.5 are not
+    supported."""
+
+    whitespace = b"\0\t\n\f\r "
+    token_pattern = re.compile(rb"[^\0\t\n\f\r ()<>\[\]{}/%]+")
+    int_pattern = re.compile(rb"[+-]?\d+$")
+    obj_pattern = re.compile(rb"\s*(\d+)\s+(\d+)\s+obj")
+    xrefsection_pattern = re.compile(rb"\s*(\d+)\s+(\d+)")
+    xrefentry_pattern = re.compile(rb"\s*(\d{10})\s(\d{5})\s([nf])")
+
+    def __init__(self, data):
+        self.data = data
+        self.offsets = {}
+        self.objects = {}
+        pos = data.rfind(b"startxref")
+        if pos == -1:
+            raise ValueError("startxref not found")
+        self.trailer = None
+        xrefpos = int(self.token(pos + 9)[0])
+        while xrefpos is not None:
+            trailer = self.readxref(xrefpos)
+            if self.trailer is None:
+                self.trailer = trailer
+            xrefpos = trailer.get(b"/Prev")
+            if xrefpos is not None:
+                xrefpos = int(xrefpos)
+
+    def skipwhitespace(self, pos):
+        data = self.data
+        while True:
+            while pos < len(data) and data[pos] in self.whitespace:
+                pos += 1
+            if data[pos:pos+1] != b"%":
+                return pos
+            while pos < len(data) and data[pos] not in b"\r\n":
+                pos += 1
+
+    def token(self, pos):
+        pos = self.skipwhitespace(pos)
+        match = self.token_pattern.match(self.data, pos)
+        if not match:
+            raise ValueError("token expected at position %i" % pos)
+        return match.group(), match.end()
+
+    def readxref(self, pos):
+        if self.data[self.skipwhitespace(pos):self.skipwhitespace(pos)+4] != b"xref":
+            raise ValueError("cross-reference table expected (cross-reference streams are not supported)")
+        pos = self.skipwhitespace(pos) + 4
+        while True:
+            match = self.xrefsection_pattern.match(self.data, pos)
+            if not match:
+                break
+            start, count = int(match.group(1)), int(match.group(2))
+            pos = match.end()
+            for num in range(start, start + count):
+                match = self.xrefentry_pattern.match(self.data, pos)
+                if not match:
+                    raise ValueError("invalid cross-reference entry")
+                if match.group(3) == b"n":
+                    self.offsets.setdefault(num, int(match.group(1)))
+                pos = match.end()
+        token, pos = self.token(pos)
+        if token != b"trailer":
+            raise ValueError("trailer expected")
+        return self.value(pos)[0]
+
+    def value(self, pos):
+        """returns the object starting at pos and the position after it"""
+        data = self.data
+        pos = self.skipwhitespace(pos)
+        c = data[pos:pos+1]
+        if c == b"<" and data[pos+1:pos+2] == b"<":
+            result = {}
+            pos += 2
+            while True:
+                pos = self.skipwhitespace(pos)
+                if data[pos:pos+2] == b">>":
+                    return result, pos + 2
+                key, pos = self.value(pos)
+                result[key], pos = self.value(pos)
+        elif c == b"[":
+            result = []
+            pos += 1
+            while True:
+                pos = self.skipwhitespace(pos)
+                if data[pos:pos+1] == b"]":
+                    return result, pos + 1
+                item, pos = self.value(pos)
+                result.append(item)
+        elif c == b"(":
+            start = pos
+            pos += 1
+            nesting = 1
+            while nesting:
+                c = data[pos:pos+1]
+                if not c:
+                    raise ValueError("unterminated string")
+                if c == b"\\":
+                    pos += 1
+                elif c == b"(":
+                    nesting += 1
+                elif c == b")":
+                    nesting -= 1
+                pos += 1
+            return data[start:pos], pos
+        elif c == b"<":
+            end = data.index(b">", pos) + 1
+            return data[pos:end], end
+        elif c == b"/":
+            match = self.token_pattern.match(data, pos + 1)
+            end = match.end() if match else pos + 1
+            return data[pos:end], end
+        token, pos = self.token(pos)
+        if self.int_pattern.match(token):
+            # check for an indirect reference "num gen R"
+            try:
+                gen, refpos = self.token(pos)
+                r, refpos = self.token(refpos)
+            except ValueError:
+                pass
+            else:
+                if r == b"R" and self.int_pattern.match(gen):
+                    return PDFref(int(token)), refpos
+        return token, pos
+
+    def getobject(self, num):
+        if num not in self.objects:
+            if num not in self.offsets:
+                self.objects[num] = b"null"
+                return b"null"
+            match = self.obj_pattern.match(self.data, self.offsets[num])
+            if not match or int(match.group(1)) != num:
+                raise ValueError("object %i not found" % num)
+            result, pos = self.value(match.end())
+            pos = self.skipwhitespace(pos)
+            if self.data[pos:pos+6] == b"stream":
+                pos += 6
+                if self.data[pos:pos+2] == b"\r\n":
+                    pos += 2
+                elif self.data[pos:pos+1] in b"\r\n":
+                    pos += 1
+                length = int(self.resolve(result[b"/Length"]))
+                result = PDFstream(result, self.data[pos:pos+length])
+            self.objects[num] = result
+        return self.objects[num]
+
+    def resolve(self, value):
+        if isinstance(value, PDFref):
+            return self.getobject(value.num)
+        return value
+
+    def references(self, value):
+        """returns the object numbers referenced by value including the
+        objects referenced by those objects and so on (in the order of their
+        first appearance)"""
+        result = {}
+        stack = [value]
+        while stack:
+            value = stack.pop()
+            if isinstance(value, PDFstream):
+                value = value.dict
+            if isinstance(value, PDFref):
+                if value.num not in result:
+                    result[value.num] = None
+                    stack.append(self.getobject(value.num))
+            elif isinstance(value, dict):
+                stack.extend(reversed(list(value.values())))
+            elif isinstance(value, list):
+                stack.extend(reversed(value))
+        return list(result)
+
+    def page(self, pagenumber=0):
+        """returns the page dictionary of the given page"""
+        pages = [self.resolve(self.resolve(self.trailer[b"/Root"])[b"/Pages"])]
+        while pages:
+            node = pages.pop(0)
+            if node.get(b"/Type") == b"/Page":
+                if not pagenumber:
+                    return node
+                pagenumber -= 1
+            else:
+                pages[0:0] = [self.resolve(kid) for kid in self.resolve(node[b"/Kids"])]
+        raise ValueError("page not found")
+
+    def inheritedpageattribute(self, page, name):
+        while name not in page:
+            if b"/Parent" not in page:
+                return None
+            page = self.resolve(page[b"/Parent"])
+        return self.resolve(page[name])
+
+    def content(self, page):
+        """returns the content of the page and the filter entries for the content
+        stream as a dict"""
+        contents = self.resolve(page.get(b"/Contents", []))
+        if isinstance(contents, PDFstream):
+            filters = dict((key, value) for key, value in contents.dict.items() if key in [b"/Filter", b"/DecodeParms"])
+            return contents.data, filters
+        datas = []
+        for stream in contents:
+            stream = self.resolve(stream)
+            filter = self.resolve(stream.dict.get(b"/Filter", []))
+            if not isinstance(filter, list):
+                filter = [filter]
+            data = stream.data
+            for f in filter:
+                if f != b"/FlateDecode" or b"/DecodeParms" in stream.dict:
+                    raise ValueError("unsupported filter for content streams")
+                data = zlib.decompress(data)
+            datas.append(data)
+        return b"\n".join(datas), {}
+
+
+def PDFserialize(value, getrefno):
+    """returns the bytes of the PDF representation of value, where getrefno
+    maps the object numbers of references"""
+    if isinstance(value, bytes):
+        return value
+    elif isinstance(value, PDFref):
+        return b"%i 0 R" % getrefno(value.num)
+    elif isinstance(value, list):
+        return b"[" + b" ".join(PDFserialize(item, getrefno) for item in value) + b"]"
+    elif isinstance(value, dict):
+        return b"<<\n" + b"".join(b"%s %s\n" % (key, PDFserialize(item, getrefno)) for key, item in value.items()) + b">>"
+    elif isinstance(value, PDFstream):
+        return (PDFserialize(value.dict, getrefno) +
+                b"\nstream\n" + value.data + b"\nendstream")
+    raise ValueError("unknown PDF object")
+
+
+class PDFimportedobject(pdfwriter.PDFobject):
+
+    def __init__(self, name, num, value):
+        pdfwriter.PDFobject.__init__(self, "epsfileobject", (name, num))
+        self.name = name
+        self.value = value
+
+    def write(self, file, writer, registry):
+        file.write_bytes(PDFserialize(self.value, lambda num: registry.getrefno(pdfwriter.PDFobject("epsfileobject", (self.name, num)))))
+        file.write("\n")
+
+
+class PDFepsfile(pdfwriter.PDFobject):
+
+    """the first page of a PDF file as a form XObject
+
+    The objects referenced by the page resources are imported as well."""
+
+    def __init__(self, name, pdfdata):
+        pdfwriter.PDFobject.__init__(self, "epsfile", name)
+        self.name = name
+        reader = PDFreader(pdfdata)
+        page = reader.page()
+        self.mediabox = [reader.resolve(value) for value in reader.inheritedpageattribute(page, b"/MediaBox")]
+        self.resources = reader.inheritedpageattribute(page, b"/Resources") or {}
+        self.content, self.filters = reader.content(page)
+        self.importedobjects = [PDFimportedobject(name, num, reader.getobject(num))
+                                for num in reader.references(self.resources)]
+
+    def register(self, registry):
+        registry.add(self)
+        registry.addresource("XObject", self.name, self)
+        for importedobject in self.importedobjects:
+            registry.add(importedobject)
+
+    def write(self, file, writer, registry):
+        content = self.content
+        filters = dict(self.filters)
+        if not filters and writer.compress:
+            content = zlib.compress(content)
+            filters[b"/Filter"] = b"/FlateDecode"
+        getrefno = lambda num: registry.getrefno(pdfwriter.PDFobject("epsfileobject", (self.name, num)))
+        file.write("<<\n"
+                   "/Type /XObject\n"
+                   "/Subtype /Form\n")
+        file.write_bytes(b"/BBox %s\n" % PDFserialize(self.mediabox, getrefno))
+        file.write_bytes(b"/Resources %s\n" % PDFserialize(self.resources, getrefno))
+        for key, value in filters.items():
+            file.write_bytes(b"%s %s\n" % (key, PDFserialize(value, getrefno)))
+        file.write("/Length %i\n" % len(content))
+        file.write(">>\n"
+                   "stream\n")
+        file.write_bytes(content)
+        file.write("\nendstream\n")
+
+
+def eps2pdf(epsdata, epsbbox, gs="gs"):
+    """returns the data of a PDF file created by Ghostscript from an EPS file
+
+    The EPS graphics is translated such that the lower left corner of epsbbox
+    becomes the origin of the PDF page."""
+    width_pt = epsbbox.urx_pt - epsbbox.llx_pt
+    height_pt = epsbbox.ury_pt - epsbbox.lly_pt
+    with tempfile.TemporaryDirectory() as tmpdir:
+        epsfilename = os.path.join(tmpdir, "input.eps")
+        pdffilename = os.path.join(tmpdir, "output.pdf")
+        with open(epsfilename, "wb") as f:
+            f.write(b"%!PS-Adobe-3.0 EPSF-3.0\n")
+            f.write(b"%%%%BoundingBox: 0 0 %i %i\n" % (math.ceil(width_pt), math.ceil(height_pt)))
+            f.write(b"%%%%HiResBoundingBox: 0 0 %f %f\n" % (width_pt, height_pt))
+            f.write(b"%%EndComments\n")
+            for definition in [_BeginEPSF, _EndEPSF]:
+                f.write(b"/%s %s def\n" % (definition.id.encode("ascii"), definition.body))
+            f.write(b"BeginEPSF\n")
+            f.write(b"%f %f translate\n" % (-epsbbox.llx_pt, -epsbbox.lly_pt))
+            f.write(b"%%BeginDocument: input.eps\n")
+            f.write(epsdata)
+            f.write(b"\n%%EndDocument\n")
+            f.write(b"EndEPSF\n")
+            f.write(b"showpage\n")
+            f.write(b"%%EOF\n")
+        p = config.Popen([gs, "-dEPSCrop", "-dNOPAUSE", "-dQUIET", "-dBATCH", "-dSAFER",
+                          "-sDEVICE=pdfwrite", "-dCompatibilityLevel=1.4",
+                          "-sOutputFile=%s" % pdffilename, epsfilename],
+                         stdout=subprocess.DEVNULL)
+        if p.wait():
+            raise ValueError("Ghostscript failed to convert the EPS file to PDF")
+        with open(pdffilename, "rb") as f:
+            return f.read()
+
+
+def formname(key):
+    """returns the name of the form of an EPS file identified by key"""
+    return "EPS%s" % hashlib.sha256(repr(key).encode("utf-8", errors="surrogateescape")).hexdigest()[:16]
+
+
+class PSepsform(pswriter.PSresource):
+
+    """an EPS file as a PostScript form
+
+    The EPS data is stored in a reusable stream, which is executed by the
+    PaintProc of the form (cf. Adobe Technical Note #5144)."""
+
+    def __init__(self, name, filename, data, epsbbox):
+        pswriter.PSresource.__init__(self, "epsform", name)
+        self.name = name
+        self.filename = filename
+        self.data = data
+        self.epsbbox = epsbbox
+
+    def output(self, file, writer, registry):
+        eod = "%sEOD" % self.name
+        file.write("%%%%BeginResource: %s\n" % self.name)
+        file.write("/%sData currentfile << /Filter /SubFileDecode /DecodeParms << /EODCount 0 /EODString (%s) >> >> /ReusableStreamDecode filter\n" % (self.name, eod))
+        file.write("%%%%BeginDocument: %s\n" % self.filename)
+        file.write_bytes(self.data)
+        if not self.data.endswith((b"\n", b"\r")):
+            file.write("\n")
+        file.write("%%EndDocument\n")
+        file.write("%s\n" % eod)
+        file.write("def\n")
+        file.write("/%s << /FormType 1 /BBox [%g %g %g %g] /Matrix [1 0 0 1 0 0]\n" % ((self.name,) + self.epsbbox.highrestuple_pt()))
+        file.write("/PaintProc { pop %sData 0 setfileposition %sData cvx exec } bind >> def\n" % (self.name, self.name))
+        file.write("%%EndResource\n")
+
+
+class PDFepsfilecache:
+
+    """cache of EPS files converted to PDF form XObjects
+
+    The conversion results are kept in memory. The least recently used
+    entries are removed when the total size of the PDF files exceeds maxsize
+    bytes. When cachedir is set, the PDF files created by Ghostscript are also
+    stored in this directory and reused by other processes."""
+
+    def __init__(self, cachedir=None, gs="gs", maxsize=100000000):
+        self.cachedir = cachedir
+        self.gs = gs
+        self.maxsize = maxsize
+        self.entries = collections.OrderedDict()
+        self.size = 0
+
+    def clear(self):
+        self.entries.clear()
+        self.size = 0
+
+    def get(self, key, readeps, epsbbox):
+        """returns the PDFepsfile for an EPS file
+
+        key identifies the EPS file including its modification state,
+        readeps returns its content, and epsbbox is its bounding box."""
+        key = key + (epsbbox.highrestuple_pt(),)
+        if key in self.entries:
+            self.entries.move_to_end(key)
+        else:
+            name = formname(key)
+            pdfdata = None
+            if self.cachedir is not None:
+                cachefilename = os.path.join(self.cachedir, "%s.pdf" % name)
+                try:
+                    with open(cachefilename, "rb") as f:
+                        pdfdata = f.read()
+                except IOError:
+                    pass
+            if pdfdata is None:
+                pdfdata = eps2pdf(readeps(), epsbbox, gs=self.gs)
+                if self.cachedir is not None:
+                    try:
+                        os.makedirs(self.cachedir, exist_ok=True)
+                        fd, tmpfilename = tempfile.mkstemp(prefix=".", dir=self.cachedir)
+                        with os.fdopen(fd, "wb") as f:
+                            f.write(pdfdata)
+                        os.replace(tmpfilename, cachefilename)
+                    except IOError as e:
+                        logger.warning("could not write PDF cache file '%s': %s" % (cachefilename, e))
+            self.entries[key] = len(pdfdata), PDFepsfile(name, pdfdata)
+            self.size += len(pdfdata)
+            while self.size > self.maxsize and len(self.entries) > 1:
+                self.size -= self.entries.popitem(last=False)[1][0]
+        return self.entries[key][1]
+
+pdfepsfilecache = PDFepsfilecache(cachedir=config.get("epsfile", "pdfcache", None),
+                                  gs=config.get("epsfile", "gs", "gs"),
+                                  maxsize=config.getint("epsfile", "pdfcachesize", 100000000))
+
+
 class epsfile(baseclasses.canvasitem):
 
     """class for epsfiles"""
@@ -332,15 +774,51 @@ class epsfile(baseclasses.canvasitem):
 
         self.trafo.processPS(file, writer, context, registry)
 
-        file.write("%%%%BeginDocument: %s\n" % self.filename)
+        if writer.epsfileforms:
+            name = formname(self.filekey() + (self.mybbox.highrestuple_pt(),))
+            if ("epsform", name) not in registry.resourceshash:
+                registry.add(PSepsform(name, self.filename, self.readeps(), self.mybbox))
+            file.write("%s execform\n" % name)
+        else:
+            file.write("%%%%BeginDocument: %s\n" % self.filename)
 
-        with self.open() as epsfile:
-            file.write_bytes(epsfile.read())
+            with self.open() as epsfile:
+                file.write_bytes(epsfile.read())
 
-        file.write("%%EndDocument\n")
+            file.write("%%EndDocument\n")
         file.write("EndEPSF\n")
 
+    def filekey(self):
+        """returns a key identifying the EPS file and its modification state"""
+        if self.kpsearch:
+            with self.open() as f:
+                return ("kpsearch", hashlib.sha256(f.read()).hexdigest())
+        stat = os.stat(self.filename)
+        return os.path.abspath(self.filename), stat.st_mtime_ns, stat.st_size
+
+    def readeps(self):
+        with self.open() as f:
+            return f.read()
+
     def processPDF(self, file, writer, context, registry, bbox):
+        try:
+            form = pdfepsfilecache.get(self.filekey(), self.readeps, self.mybbox)
+        except (EnvironmentError, ValueError, KeyError, zlib.error) as e:
+            logger.warning("conversion of EPS file '%s' to PDF failed: %s" % (self.filename, e))
+            self.processPDFbitmap(file, writer, context, registry, bbox)
+            return
+        form.register(registry)
+        bbox += self.bbox()
+
+        file.write("q\n")
+        if self.clip:
+            llx_pt, lly_pt, urx_pt, ury_pt = self.mybbox.transformed(self.trafo).highrestuple_pt()
+            file.write("%f %f %f %f re W n\n" % (llx_pt, lly_pt, urx_pt-llx_pt, ury_pt-lly_pt))
+        (self.trafo * trafo.translate_pt(self.mybbox.llx_pt, self.mybbox.lly_pt)).processPDF(file, writer, context, registry)
+        file.write("/%s Do\n" % form.name)
+        file.write("Q\n")
+
+    def processPDFbitmap(self, file, writer, context, registry, bbox):
         logger.warning("EPS file is included as a bitmap created using pipeGS")
         from pyx import bitmap, canvas
         from PIL import Image
@@ -21,8 +21,8 @@
 # along with PyX; if not, write to the Free Software
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
 
-import logging
-from pyx import bbox, baseclasses, deco, path, pswriter, pdfwriter, svgwriter, trafo, unit
+import hashlib, logging
+from pyx import bbox, baseclasses, deco, normpath, path, pswriter, pdfwriter, svgwriter, trafo, unit
 from . import t1file, afmfile
 
 logger = logging.getLogger("pyx")
@@ -393,6 +393,25 @@ class SVGT1file(svgwriter.SVGresource, SVGT1mapping):
         xml.endSVGElement("font")
 
 
+class SVGglyphoutline(svgwriter.SVGresource):
+
+    def __init__(self, t1file, glyphname):
+        """ outline of the glyph glyphname of the type 1 font t1file
+
+        The outline is given in character space units and placed by
+        use elements referencing it. The id depends on the font data, as
+        different fonts (like a subset of a font) might share their name."""
+        self.t1file = t1file
+        self.glyphname = glyphname
+        self.svgid = "glyph%s" % hashlib.sha256(("%s/%s/%s" % (t1file.name, t1file.fingerprint(), glyphname)).encode("utf-8")).hexdigest()[:16]
+        svgwriter.SVGresource.__init__(self, "glyphoutline", self.svgid)
+
+    def output(self, xml, writer, registry):
+        outline, wx, wy = self.t1file.getglyphoutline(self.glyphname)
+        xml.startSVGElement("path", {"id": self.svgid, "d": outline.returnSVGdata()})
+        xml.endSVGElement("path")
+
+
 ##############################################################################
 # basic PyX text output
 ##############################################################################
@@ -509,29 +528,40 @@ class T1text_pt(text_pt):
         encodings[encodingname] = dict([(glyphname, i) for i, glyphname in enumerate(glyphnames)])
         return encodingname
 
+    def glyphpositions_pt(self):
+        """ yield the glyph names and the positions of the glyphs in the font file """
+        t1file = self.font.t1file
+        if self.decode:
+            if self.kerning:
+                data = self.font.metric.resolvekernings(self.glyphnames, self.size_pt)
+            else:
+                data = self.glyphnames
+        else:
+            data = self.charcodes
+        t = t1file.fontmatrix.scaled(self.size_pt)
+        x_pt = self.x_pt
+        y_pt = self.y_pt
+        for i, value in enumerate(data):
+            if self.kerning and i % 2:
+                if value is not None:
+                    x_pt += value
+            else:
+                if i:
+                    x_pt += self.spaced_pt
+                glyphname = value if self.decode else t1file.getglyphname(value)
+                yield glyphname, x_pt, y_pt
+                outline, wx, wy = t1file.getglyphoutline(glyphname)
+                wx_pt, wy_pt = t.apply_pt(wx, wy)
+                x_pt += wx_pt
+                y_pt += wy_pt
+
     def textpath(self):
         if self._textpath is None:
-            if self.decode:
-                if self.kerning:
-                    data = self.font.metric.resolvekernings(self.glyphnames, self.size_pt)
-                else:
-                    data = self.glyphnames
-            else:
-                data = self.charcodes
-            self._textpath = path.path()
-            x_pt = self.x_pt
-            y_pt = self.y_pt
-            for i, value in enumerate(data):
-                if self.kerning and i % 2:
-                    if value is not None:
-                        x_pt += value
-                else:
-                    if i:
-                        x_pt += self.spaced_pt
-                    glyphpath = self.font.t1file.getglyphpath_pt(x_pt, y_pt, value, self.size_pt, convertcharcode=not self.decode)
-                    self._textpath += glyphpath.path
-                    x_pt += glyphpath.wx_pt
-                    y_pt += glyphpath.wy_pt
+            # the glyph outlines are cached by the font file and just transformed to their positions
+            self._textpath = normpath.normpath()
+            for glyphname, x_pt, y_pt in self.glyphpositions_pt():
+                glyphpath = self.font.t1file.getglyphpath_pt(x_pt, y_pt, glyphname, self.size_pt)
+                self._textpath.normsubpaths.extend(glyphpath.path.normsubpaths)
         return self._textpath
 
     def processPS(self, file, writer, context, registry, bbox):
@@ -699,7 +729,25 @@ class T1text_pt(text_pt):
         # if writer.textaspath and not self.font.t1file:
         #     logger.warning("Cannot output text as path when font not given by a font file (like for builtin fonts).")
 
-        if writer.textaspath and self.font.t1file:
+        if writer.textaspath and writer.reuseglyphs and self.font.t1file and xml.xlink_enabled:
+            # place the glyph outlines (shared by all occurrences of a glyph) by use elements
+            acontext = context()
+            attrs = {"fill": acontext.fillcolor}
+            if acontext.fillopacity != 1:
+                attrs["opacity"] = "%f" % acontext.fillopacity
+            xml.startSVGElement("g", attrs)
+            t = self.font.t1file.fontmatrix.scaled(self.size_pt)
+            for glyphname, x_pt, y_pt in self.glyphpositions_pt():
+                glyphoutline = SVGglyphoutline(self.font.t1file, glyphname)
+                registry.add(glyphoutline)
+                glyphtrafo = t.translated_pt(x_pt, y_pt)
+                attrs = {"xlink:href": "#%s" % glyphoutline.svgid}
+                glyphtrafo.processSVGattrs(attrs, writer, acontext, registry)
+                xml.startSVGElement("use", attrs)
+                xml.endSVGElement("use")
+                bbox += self.font.t1file.getglyphoutline(glyphname)[0].bbox().transformed(glyphtrafo)
+            xml.endSVGElement("g")
+        elif writer.textaspath and self.font.t1file:
             deco.decoratedpath(self.textpath(), fillstyles=[]).processSVG(xml, writer, context, registry, bbox)
         else:
             if self.font.t1file is not None:
@@ -0,0 +1,99 @@
+# -*- encoding: utf-8 -*-
+#
+#
+# This file is part of PyX (https://pyx-project.org/).
+#
+# PyX is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# PyX is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PyX; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
+
+import collections, hashlib, logging, os, pickle, tempfile
+from pyx import config
+
+logger = logging.getLogger("pyx")
+
+
+class FontCache:
+
+    """process-wide cache of parsed font files
+
+    Parsed font files (TFM, VF, encoding and Type1 files) are kept in memory
+    and shared. They are identified by the resolved filename, the modification
+    time and the size of the file as well as the parameters of the parsing.
+    The least recently used entries are removed when the total size of the
+    cached files exceeds maxsize bytes. When cachedir is set, the parsed
+    fonts are also stored pickled in this directory and reused by other
+    processes. Note that the pickled data is trusted, i.e. the directory must
+    not be writable by others."""
+
+    def __init__(self, maxsize=100000000, cachedir=None):
+        self.maxsize = maxsize
+        self.cachedir = cachedir
+        self.entries = collections.OrderedDict()
+        self.size = 0
+
+    def clear(self):
+        self.entries.clear()
+        self.size = 0
+
+    def get(self, kind, file, parse, *params):
+        """returns the parsed font
+
+        The font is read from the open file by calling parse (without
+        arguments) unless it is cached. kind and params are used in the key
+        of the cache in addition to the file. Files without a name, like
+        those provided by the PyX data tree, are not cached."""
+        try:
+            filename = os.path.abspath(file.name)
+            stat = os.stat(filename)
+        except (AttributeError, TypeError, EnvironmentError):
+            return parse()
+        key = kind, filename, stat.st_mtime_ns, stat.st_size, params
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            return self.entries[key][1]
+        result = self.getpickled(key, parse)
+        self.entries[key] = stat.st_size, result
+        self.size += stat.st_size
+        while self.size > self.maxsize and len(self.entries) > 1:
+            self.size -= self.entries.popitem(last=False)[1][0]
+        return result
+
+    def getpickled(self, key, compute):
+        """returns compute() (called without arguments), which is stored pickled
+        in the cache directory under key, when the cache directory is set"""
+        if self.cachedir is None:
+            return compute()
+        cachefilename = os.path.join(self.cachedir, hashlib.sha256(repr(key).encode("utf-8", errors="surrogateescape")).hexdigest())
+        try:
+            with open(cachefilename, "rb") as f:
+                cachedkey, result = pickle.load(f)
+            if cachedkey == key:
+                return result
+        except Exception:
+            pass
+        result = compute()
+        try:
+            data = pickle.dumps((key, result), pickle.HIGHEST_PROTOCOL)
+            os.makedirs(self.cachedir, exist_ok=True)
+            fd, tmpfilename = tempfile.mkstemp(prefix=".", dir=self.cachedir)
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmpfilename, cachefilename)
+        except (EnvironmentError, pickle.PicklingError) as e:
+            logger.warning("could not write font cache file '%s': %s" % (cachefilename, e))
+        return result
+
+
+fontcache = FontCache(maxsize=config.getint("text", "fontcachesize", 100000000),
+                      cachedir=config.get("text", "fontcache", None))
@@ -19,24 +19,57 @@
 # along with PyX; if not, write to the Free Software
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
 
-import array
+try:
+    import numpy
+    hasnumpy = True
+except ImportError:
+    hasnumpy = False
 
 c1 = 52845
-c1_16, c1_8 = divmod(c1, 0x100) # to avoid overflow (or conversion to the slow long integers)
 c2 = 22719
 
+# minimal length of the code to be decoded by numpy
+numpythreshold = 1024
+
+def _numpydecoder(code, r, n):
+    x = numpy.frombuffer(code, dtype=numpy.uint8).astype(numpy.uint32)
+    # The key after byte i is r_{i+1} = (r_i + x_i) * c1 + c2, which is an
+    # affine map in r_i. Starting with keys[i] = x_i * c1 + c2 (and r_1 in
+    # keys[0]), a doubling scan composes these maps to get keys[i] = r_{i+1}.
+    keys = x * c1 + c2
+    keys[0] += (r * c1) & 0xffff
+    keys &= 0xffff
+    shift = 1
+    factor = c1 # c1**shift modulo 0x10000
+    while shift < len(keys):
+        composed = keys[:-shift] * factor
+        composed += keys[shift:]
+        composed &= 0xffff
+        keys[shift:] = composed
+        shift *= 2
+        factor = (factor * factor) & 0xffff
+    keys[1:] = keys[:-1]
+    keys[0] = r
+    keys >>= 8
+    x ^= keys
+    return x.astype(numpy.uint8).tobytes()[n:]
+
 def decoder(code, r, n):
-    plain = array.array("B")
-    for x in array.array("B", code):
-        plain.append(x ^ (r >> 8))
-        # r = ((x + r) * c1 + c2) & 0xffff # this might overflow
-        r = ((((x + r) * c1_16) & 0xff) * 0x100 + (x + r) * c1_8 + c2) & 0xffff
-    return plain.tobytes()[n:]
+    if hasnumpy and len(code) >= numpythreshold:
+        return _numpydecoder(code, r, n)
+    plain = []
+    append = plain.append
+    for x in code:
+        append(x ^ (r >> 8))
+        r = ((x + r) * c1 + c2) & 0xffff
+    return bytes(plain[n:])
 
 def encoder(data, r, random):
-    code = array.array("B")
-    for x in array.array("B", random+data):
-        code.append(x ^ (r>>8))
-        # r = ((code[-1] + r) * c1 + c2) & 0xffff # this might overflow
-        r = ((((code[-1] + r) * c1_16) & 0xff) * 0x100 + (code[-1] + r) * c1_8 + c2) & 0xffff
-    return code.tobytes()
+    # the encoding cannot be vectorized as the key depends on the previous code byte
+    code = []
+    append = code.append
+    for x in random+data:
+        x ^= r >> 8
+        append(x)
+        r = ((x + r) * c1 + c2) & 0xffff
+    return bytes(code)
@@ -20,7 +20,7 @@
 # along with PyX; if not, write to the Free Software
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
 
-import array, binascii, io, logging, math, re
+import array, binascii, functools, hashlib, io, logging, math, re
 try:
     import zlib
     haszlib = True
@@ -31,6 +31,7 @@ logger = logging.getLogger("pyx")
 
 from pyx import trafo, reader, writer
 from pyx.path import path, moveto_pt, lineto_pt, curveto_pt, closepath
+from .fontcache import fontcache
 
 try:
     from ._t1code import *
@@ -38,6 +39,12 @@ except Exception:
     from .t1code import *
 
 
+@functools.lru_cache(maxsize=16)
+def _eexecdecoded(code, r):
+    # decoded eexec data of the fonts recently used in this process
+    return decoder(code, r, 4)
+
+
 adobestandardencoding = [None, None, None, None, None, None, None, None,
                          None, None, None, None, None, None, None, None,
                          None, None, None, None, None, None, None, None,
@@ -552,6 +559,7 @@ class _T1callothersubr(T1cmd):
             pass
         elif othersubrnumber == 2:
             path.pathitems.pop()
+            path.modified()
             context.psstack.append(context.x)
             context.psstack.append(context.y)
 
@@ -665,9 +673,35 @@ class T1File:
         m11, m12, m21, m22, v1, v2 = list(map(float, self.fontmatrixpattern.search(self.data1).groups()[:6]))
         self.fontmatrix = trafo.trafo_pt(matrix=((m11, m12), (m21, m22)), vector=(v1, v2))
 
+    # memoized results of getstrippedfont and getglyphoutline (not pickled)
+    maxstrippedfonts = 32
+    _strippedfonts = None
+    _fingerprint = None
+    _glyphoutlines = None
+
+    def __getstate__(self):
+        # pickle the decoded data2 to skip the eexec decoding when unpickling
+        if not self._data2:
+            self._data2decode()
+        state = dict(self.__dict__)
+        state.pop("_strippedfonts", None)
+        state.pop("_glyphoutlines", None)
+        return state
+
+    def fingerprint(self):
+        """returns a hash of the font data"""
+        if self._fingerprint is None:
+            self._fingerprint = hashlib.sha256(self.data1.encode("ascii", errors="surrogateescape") +
+                                               self.getdata2eexec() +
+                                               self.data3.encode("ascii", errors="surrogateescape")).hexdigest()
+        return self._fingerprint
+
     def _eexecdecode(self, code):
-        """eexec decoding of code"""
-        return decoder(code, self.eexecr, 4)
+        """eexec decoding of code
+
+        The result is cached, i.e. the data of a font is decoded once only,
+        even when the font is read several times."""
+        return _eexecdecoded(bytes(code), self.eexecr)
 
     def _charstringdecode(self, code):
         """charstring decoding of code"""
@@ -864,6 +898,7 @@ class T1File:
         if not self._data2:
             self._data2decode()
         self._data2eexec = None
+        self._strippedfonts = self._fingerprint = self._glyphoutlines = None
         self.subrs[subr] = self._code(cmds)
 
     def setglyphcmds(self, glyph, cmds):
@@ -871,6 +906,7 @@ class T1File:
         if not self._data2:
             self._data2decode()
         self._data2eexec = None
+        self._strippedfonts = self._fingerprint = self._glyphoutlines = None
         self.glyphs[glyph] = self._code(cmds)
 
     def updatepath(self, cmds, path, trafo, context):
@@ -899,23 +935,41 @@ class T1File:
     def gatherglyphcalls(self, glyph, seacglyphs, subrs, context):
         self.gathercalls(self.getglyphcmds(glyph), seacglyphs, subrs, context)
 
+    def getglyphoutline(self, glyph, flex=True):
+        """return the outline of the glyph named glyph
+
+        A tuple (normpath, wx, wy) is returned, where the normpath and the
+        advance width wx, wy are given in character space units, i.e. neither
+        the font matrix nor the font size are applied. The outlines are cached
+        for the repeated use of the glyphs."""
+        if self._glyphoutlines is None:
+            self._glyphoutlines = {}
+        key = glyph, flex
+        if key not in self._glyphoutlines:
+            context = T1context(self, flex=flex)
+            p = path()
+            self.updateglyphpath(glyph, p, trafo.trafo(), context)
+            self._glyphoutlines[key] = p.normpath(epsilon=None), context.wx, context.wy
+        return self._glyphoutlines[key]
+
+    def getglyphname(self, charcode):
+        """return the name of the glyph for charcode in the encoding of the font"""
+        if not self.encoding:
+            self._encoding()
+        return self.encoding[charcode]
+
     def getglyphpath_pt(self, x_pt, y_pt, glyph, size_pt, convertcharcode=False, flex=True):
         """return an object containing the PyX path, wx_pt and wy_pt for glyph named glyph"""
         if convertcharcode:
-            if not self.encoding:
-                self._encoding()
-            glyph = self.encoding[glyph]
+            glyph = self.getglyphname(glyph)
+        outline, wx, wy = self.getglyphoutline(glyph, flex=flex)
         t = self.fontmatrix.scaled(size_pt)
-        tpath = t.translated_pt(x_pt, y_pt)
-        context = T1context(self, flex=flex)
-        p = path()
-        self.updateglyphpath(glyph, p, tpath, context)
         class glyphpath:
             def __init__(self, p, wx_pt, wy_pt):
                 self.path = p
                 self.wx_pt = wx_pt
                 self.wy_pt = wy_pt
-        return glyphpath(p, *t.apply_pt(context.wx, context.wy))
+        return glyphpath(outline.transformed(t.translated_pt(x_pt, y_pt)), *t.apply_pt(wx, wy))
 
     def getdata2(self, subrs=None, glyphs=None):
         """makes a data2 string
@@ -1006,7 +1060,28 @@ class T1File:
         """create a T1File instance containing only certain glyphs
 
         glyphs is a set of the glyph names. It might be modified *in place*!
+
+        The results are memoized for the glyphs and charcodes and stored in
+        the directory of the font cache, when set. The returned instance
+        must not be modified.
         """
+        key = frozenset(glyphs), frozenset(charcodes)
+        if self._strippedfonts is None:
+            self._strippedfonts = {}
+        if key not in self._strippedfonts:
+            def strip():
+                strippedglyphs = set(glyphs)
+                strippedfont = self._getstrippedfont(strippedglyphs, charcodes)
+                return strippedglyphs, strippedfont.data1, strippedfont.getdata2eexec(), strippedfont.data3
+            strippedglyphs, data1, data2eexec, data3 = fontcache.getpickled(("strippedfont", self.fingerprint(), sorted(key[0]), sorted(key[1])), strip)
+            if len(self._strippedfonts) >= self.maxstrippedfonts:
+                del self._strippedfonts[next(iter(self._strippedfonts))]
+            self._strippedfonts[key] = strippedglyphs, T1File(data1, data2eexec, data3)
+        strippedglyphs, strippedfont = self._strippedfonts[key]
+        glyphs.update(strippedglyphs)
+        return strippedfont
+
+    def _getstrippedfont(self, glyphs, charcodes):
         if not self.encoding:
             self._encoding()
         for charcode in charcodes:
@@ -1081,11 +1156,9 @@ class T1File:
 
     def getglyphinfo(self, glyph, flex=True):
         logger.warning("We are about to extract font information for the Type 1 font '%s' from its pfb file. This is bad practice (and it's slow). You should use an afm file instead." % self.name)
-        context = T1context(self, flex=flex)
-        p = path()
-        self.updateglyphpath(glyph, p, trafo.trafo(), context)
-        bbox = p.bbox()
-        return context.wx, context.wy, bbox.llx_pt, bbox.lly_pt, bbox.urx_pt, bbox.ury_pt
+        outline, wx, wy = self.getglyphoutline(glyph, flex=flex)
+        bbox = outline.bbox()
+        return wx, wy, bbox.llx_pt, bbox.lly_pt, bbox.urx_pt, bbox.ury_pt
 
     def outputPFA(self, file, remove_UniqueID_lookup=False):
         """output the T1File in PFA format"""
@@ -1101,11 +1174,7 @@ class T1File:
                 data1 = data1[:m1.start()] + data1[m1.end():]
                 data3 = data3[:m3.start()] + data3[m3.end():]
         file.write(data1)
-        data2eexechex = binascii.b2a_hex(self.getdata2eexec())
-        linelength = 64
-        for i in range((len(data2eexechex)-1)//linelength + 1):
-            file.write_bytes(data2eexechex[i*linelength: i*linelength+linelength])
-            file.write("\n")
+        writer.asciihexstream(file, self.getdata2eexec())
         file.write(data3)
 
     def outputPFB(self, file):
@@ -44,6 +44,18 @@ class axisdata:
 class _axis:
     """axis"""
 
+    def convertcolumn(self, data, values):
+        """axis coordinates -> graph coordinates for a sequence of values
+
+        Values which cannot be converted result in None."""
+        result = []
+        for value in values:
+            try:
+                result.append(self.convert(data, value))
+            except (ArithmeticError, ValueError, TypeError):
+                result.append(None)
+        return result
+
     def createlinked(self, data, positioner, graphtextengine, errorname, linkpainter):
         canvas = painter.axiscanvas(self.painter, graphtextengine)
         if linkpainter is not None:
@@ -265,6 +277,19 @@ class linear(_regularaxis):
         else:
             return (float(value) - data.min) / (data.max - data.min)
 
+    def convertcolumn(self, data, values):
+        try:
+            if self.reverse:
+                max = data.max
+                delta = data.max - data.min
+                return [(max - float(value)) / delta for value in values]
+            else:
+                min = data.min
+                delta = data.max - data.min
+                return [(float(value) - min) / delta for value in values]
+        except (ArithmeticError, ValueError, TypeError):
+            return _regularaxis.convertcolumn(self, data, values)
+
     def create(self, data, positioner, graphtextengine, errorname):
         return _regularaxis._create(self, data, positioner, graphtextengine, self.parter, self.rater, errorname)
 
@@ -300,6 +325,17 @@ class logarithmic(_regularaxis):
         else:
             return (math.log(float(value)) - math.log(data.min)) / (math.log(data.max) - math.log(data.min))
 
+    def convertcolumn(self, data, values):
+        try:
+            logmin = math.log(data.min)
+            logmax = math.log(data.max)
+            if self.reverse:
+                return [(logmax - math.log(float(value))) / (logmax - logmin) for value in values]
+            else:
+                return [(math.log(float(value)) - logmin) / (logmax - logmin) for value in values]
+        except (ArithmeticError, ValueError, TypeError):
+            return _regularaxis.convertcolumn(self, data, values)
+
     def create(self, data, positioner, graphtextengine, errorname):
         try:
             return _regularaxis._create(self, data, positioner, graphtextengine, self.parter, self.rater, errorname)
@@ -585,6 +621,10 @@ class anchoredaxis:
         self.docreate()
         return self.axis.convert(self.data, x)
 
+    def convertcolumn(self, values):
+        self.docreate()
+        return self.axis.convertcolumn(self.data, values)
+
     def adjustaxis(self, columndata):
         if self.canvas is None:
             self.axis.adjustaxis(self.data, columndata, self.graphtextengine, self.errorname)
@@ -22,7 +22,7 @@
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
 
 
-import math
+import collections, math
 from pyx import canvas, color, attr, text, style, unit, box, path, utils
 from pyx import trafo as trafomodule
 from pyx.graph.axis import tick
@@ -47,6 +47,71 @@ class axiscanvas(canvas.canvas):
             self.settextengine(graphtextengine)
 
 
+def _valuekey(value):
+    # hashable representation of value comparing attributes by value
+    if isinstance(value, (list, tuple)):
+        return tuple(_valuekey(item) for item in value)
+    if isinstance(value, attr.attr):
+        return (type(value),) + tuple((name, _valuekey(item)) for name, item in sorted(vars(value).items()))
+    return value
+
+
+class labelcache:
+    """cache of typeset axis labels of a text engine
+
+    Each distinct label is typeset once (for the label text and the values of
+    its text attributes) and copied for further usage. Thus the labels are
+    shared among the variants of the axis partitioning, the axes, and the
+    graphs using the same text engine. The least recently used labels are
+    removed when more than maxentries labels are cached. Text engines not
+    providing copyable text output are called for each label."""
+
+    def __init__(self, maxentries=1000):
+        self.maxentries = maxentries
+        self.entries = collections.OrderedDict()
+
+    def text_pt(self, textengine, x_pt, y_pt, label, labelattrs):
+        labelattrs = attr.mergeattrs(labelattrs)
+        trafos = attr.getattrs(labelattrs, [trafomodule.trafo_pt])
+        fillstyles = attr.getattrs(labelattrs, [style.fillstyle])
+        textattrs = [a for a in labelattrs if not isinstance(a, (trafomodule.trafo_pt, style.fillstyle))]
+        key = label, _valuekey(textattrs)
+        try:
+            hash(key)
+        except TypeError:
+            return textengine.text_pt(x_pt, y_pt, label, labelattrs)
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            labelbox = self.entries[key]
+        else:
+            labelbox = textengine.text_pt(0, 0, label, textattrs)
+            if not hasattr(labelbox, "copy_pt"):
+                labelbox = None
+            self.entries[key] = labelbox
+            while len(self.entries) > self.maxentries:
+                self.entries.popitem(last=False)
+        if labelbox is None:
+            return textengine.text_pt(x_pt, y_pt, label, labelattrs)
+        return labelbox.copy_pt(x_pt, y_pt, trafos, fillstyles)
+
+
+def labeltext_pt(textengine, x_pt, y_pt, label, labelattrs):
+    """typeset an axis label using the label cache of the text engine
+
+    The cache is stored at the text engine, or at the current instance of a
+    :class:`text.MultiEngine`, as its labelcache attribute. Thus it is
+    released together with the engine and a reset starts a new cache."""
+    owner = getattr(textengine, "instance", textengine)
+    cache = getattr(owner, "labelcache", None)
+    if cache is None:
+        cache = labelcache()
+        try:
+            owner.labelcache = cache
+        except AttributeError:
+            return textengine.text_pt(x_pt, y_pt, label, labelattrs)
+    return cache.text_pt(textengine, x_pt, y_pt, label, labelattrs)
+
+
 class rotatetext:
     """create rotations accordingly to tick directions"""
 
@@ -196,7 +261,7 @@ class regular(_title):
                         labelattrs.append(self.labeldirection.trafo(t.temp_dx, t.temp_dy))
                     if t.labelattrs is not None:
                         labelattrs.extend(t.labelattrs)
-                    t.temp_labelbox = canvas.textengine.text_pt(t.temp_x_pt, t.temp_y_pt, t.label, labelattrs)
+                    t.temp_labelbox = labeltext_pt(canvas.textengine, t.temp_x_pt, t.temp_y_pt, t.label, labelattrs)
         if len(data.ticks) > 1:
             equaldirection = 1
             for t in data.ticks[1:]:
@@ -49,6 +49,8 @@ class timeaxis(axis.linear):
         # I prefer a different solution (not based on huge integers) for the
         # future
 
+    convertcolumn = axis._axis.convertcolumn
+
     zero = datetime.timedelta(0)
 
 
@@ -21,10 +21,18 @@
 # along with PyX; if not, write to the Free Software
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
 
-import math, re, configparser, struct
-from pyx import text
+import array, collections, hashlib, itertools, json, logging, math, mmap, os, re
+import configparser, struct, tempfile, warnings
+try:
+    import numpy
+    hasnumpy = True
+except ImportError:
+    hasnumpy = False
+
+from pyx import config, text
 from . import style
 builtinlist = list
+logger = logging.getLogger("pyx")
 
 
 def splitatvalue(value, *splitpoints):
@@ -147,6 +155,23 @@ class points(_data):
         self.title = title
 
 
+class _columns(_data):
+    "Graph data from a list of columns"
+
+    defaultstyles = defaultsymbols
+
+    def __init__(self, columndata, title, **columns):
+        # like points without any point, the columndata list is missing for
+        # empty columns
+        if columndata and len(columndata[0]):
+            self.columndata = columndata
+            self.columns = dict([(key, columndata[i]) for key, i in list(columns.items())])
+        else:
+            self.columns = dict([(key, []) for key, i in list(columns.items())])
+        self.columnnames = list(self.columns.keys())
+        self.title = title
+
+
 class _notitle:
     pass
 
@@ -226,7 +251,164 @@ class data(_data):
             return self.orgdata.columns[value][self.columncallbackcount]
 
 
-filecache = {}
+class _filecache:
+    """cache of data read from files
+
+    - entries are keyed by the filename and the parse options and are
+      invalidated when the modification time or the size of the file change
+    - the least recently used entries are removed when more than maxentries
+      entries are stored or when their estimated memory usage exceeds maxsize
+      bytes
+    - when sidecardir is set, columns read by the file class are also stored
+      in a binary columnar sidecar file in this directory; the sidecar files
+      are reused by other processes to skip the parsing of the file"""
+
+    #: struct of the header of a sidecar file (magic and metadata length)
+    header = struct.Struct(">4sI")
+    magic = b"PyXD"
+
+    def __init__(self, maxentries=100, maxsize=100000000, sidecardir=None):
+        self.maxentries = maxentries
+        self.maxsize = maxsize
+        self.sidecardir = sidecardir
+        self.entries = collections.OrderedDict()
+        self.size = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def clear(self):
+        self.entries.clear()
+        self.size = 0
+
+    def sizeof(self, data):
+        "returns an estimate of the memory used by the columns of data"
+        columns = dict([(id(column), column) for column in data.columns.values()])
+        columns.update([(id(column), column) for column in getattr(data, "columndata", [])])
+        size = 0
+        for column in columns.values():
+            if isinstance(column, array.array):
+                size += column.itemsize * len(column)
+            else:
+                # list entry plus a float or a short string
+                size += 40 * len(column)
+        return size
+
+    def get(self, filename, cachekey, readfile, sidecar=False):
+        """returns the data for filename and cachekey
+
+        readfile is called without arguments to read the data when the cache
+        does not contain a valid entry. The sidecar file is used when sidecar
+        is set, which is allowed only for readfile returning _columns."""
+        stat = os.stat(filename)
+        signature = stat.st_mtime_ns, stat.st_size
+        key = os.path.abspath(filename), cachekey
+        try:
+            entrysignature, size, result = self.entries[key]
+        except KeyError:
+            pass
+        else:
+            if entrysignature == signature:
+                self.entries.move_to_end(key)
+                return result
+            del self.entries[key]
+            self.size -= size
+        result = None
+        if sidecar and self.sidecardir is not None:
+            sidecarfilename = self.sidecarfilename(key)
+            result = self.readsidecar(sidecarfilename, key, signature)
+        if result is None:
+            result = readfile()
+            if sidecar and self.sidecardir is not None:
+                self.writesidecar(sidecarfilename, key, signature, result)
+        size = self.sizeof(result)
+        self.entries[key] = signature, size, result
+        self.size += size
+        while len(self.entries) > 1 and (len(self.entries) > self.maxentries or self.size > self.maxsize):
+            entrysignature, size, entry = self.entries.popitem(last=False)[1]
+            self.size -= size
+        return result
+
+    def sidecarfilename(self, key):
+        return os.path.join(self.sidecardir, hashlib.sha256(repr(key).encode("utf-8", errors="surrogateescape")).hexdigest())
+
+    def readsidecar(self, sidecarfilename, key, signature):
+        """returns _columns read from a sidecar file or None if the sidecar file
+        is not available or does not match key and signature"""
+        try:
+            with open(sidecarfilename, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                magic, length = self.header.unpack_from(m)
+                if magic != self.magic:
+                    return None
+                metadata = json.loads(m[self.header.size:self.header.size+length].decode("utf-8", errors="surrogateescape"))
+                if metadata["key"] != repr(key) or metadata["signature"] != builtinlist(signature):
+                    return None
+                columndata = []
+                for typecode, offset, length in metadata["columndata"]:
+                    if typecode:
+                        column = array.array(typecode)
+                        column.frombytes(m[offset:offset+length])
+                    else:
+                        column = json.loads(m[offset:offset+length].decode("utf-8", errors="surrogateescape"))
+                    columndata.append(column)
+        except (EnvironmentError, ValueError, KeyError, struct.error):
+            return None
+        return _columns(columndata, metadata["title"], **metadata["columns"])
+
+    def writesidecar(self, sidecarfilename, key, signature, data):
+        """writes the columns of data to a sidecar file
+
+        Columns stored as arrays are written as raw data aligned to 8 bytes
+        (i.e. the file can be memory mapped), other columns are stored as
+        JSON lists."""
+        columnindices = dict([(id(column), i) for i, column in enumerate(getattr(data, "columndata", []))])
+        columns = dict([(name, columnindices[id(column)]) for name, column in data.columns.items() if id(column) in columnindices])
+        if len(columns) != len(data.columns):
+            # no column data or additional columns not in the column data
+            return
+        chunks = []
+        for column in getattr(data, "columndata", []):
+            if isinstance(column, array.array):
+                chunks.append((column.typecode, column.tobytes()))
+            else:
+                chunks.append(("", json.dumps(column).encode("utf-8", errors="surrogateescape")))
+        offset = 0
+        # the metadata contains the offsets, whose length depend on the
+        # metadata length; iterate until the data offset is stable
+        while True:
+            columndata = []
+            position = offset
+            for typecode, chunk in chunks:
+                columndata.append((typecode, position, len(chunk)))
+                position += len(chunk) + (-len(chunk) % 8)
+            metadata = json.dumps({"key": repr(key), "signature": signature, "title": data.title,
+                                   "columns": columns, "columndata": columndata}).encode("utf-8", errors="surrogateescape")
+            dataoffset = self.header.size + len(metadata)
+            dataoffset += -dataoffset % 8
+            if dataoffset == offset:
+                break
+            offset = dataoffset
+        try:
+            os.makedirs(self.sidecardir, exist_ok=True)
+            fd, tmpfilename = tempfile.mkstemp(prefix=".", dir=self.sidecardir)
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(self.header.pack(self.magic, len(metadata)))
+                    f.write(metadata)
+                    for typecode, chunk in chunks:
+                        f.write(b"\0" * (-f.tell() % 8))
+                        f.write(chunk)
+                os.replace(tmpfilename, sidecarfilename)
+            finally:
+                if os.path.exists(tmpfilename):
+                    os.unlink(tmpfilename)
+        except EnvironmentError as e:
+            logger.warning("Could not write the data sidecar file: {}".format(e))
+
+
+filecache = _filecache(maxentries=config.getint("graph", "datacacheentries", 100),
+                       maxsize=config.getint("graph", "datacachesize", 100000000),
+                       sidecardir=config.get("graph", "datacache", None))
 
 class file(data):
 
@@ -276,6 +458,65 @@ class file(data):
                 return line.split()
         return result
 
+    # number of lines read and parsed at once
+    chunksize = 10000
+
+    def splitlines(self, lines):
+        """returns a numpy array of the float values in lines
+
+        None is returned when the lines contain comments, strings or values
+        which cannot be converted to floats or when the number of values per
+        line is not constant."""
+        for line in lines:
+            if "#" in line or "!" in line or "%" in line or '"' in line:
+                return None
+        try:
+            with warnings.catch_warnings():
+                # suppress the warning about empty input
+                warnings.simplefilter("ignore")
+                values = numpy.loadtxt(lines, dtype=float, comments=None, ndmin=2)
+        except ValueError:
+            return None
+        if len(values) != len([line for line in lines if line.strip()]):
+            return None
+        return values
+
+    def appendrow(self, columndata, rows, linenumber, values):
+        """appends a row of values to the columns in columndata, where rows
+        is the number of rows in columndata before appending"""
+        columndata[0].append(linenumber)
+        for i, value in enumerate(values, 1):
+            if i == len(columndata):
+                columndata.append([None]*rows if rows else array.array("d"))
+            try:
+                columndata[i].append(value)
+            except TypeError:
+                columndata[i] = builtinlist(columndata[i])
+                columndata[i].append(value)
+        for i in range(len(values)+1, len(columndata)):
+            if isinstance(columndata[i], array.array):
+                columndata[i] = builtinlist(columndata[i])
+            columndata[i].append(None)
+
+    def appendcolumns(self, columndata, rows, linenumbers, values):
+        """appends the rows of the two-dimensional numpy array values to the
+        columns in columndata, where rows is the number of rows in columndata
+        before appending"""
+        if not len(values):
+            return
+        columndata[0].extend(linenumbers)
+        for i in range(1, values.shape[1]+1):
+            if i == len(columndata):
+                columndata.append([None]*rows if rows else array.array("d"))
+            if isinstance(columndata[i], array.array):
+                columndata[i].frombytes(numpy.ascontiguousarray(values[:, i-1]).tobytes())
+            else:
+                columndata[i].extend(values[:, i-1].tolist())
+        for i in range(values.shape[1]+1, len(columndata)):
+            if isinstance(columndata[i], array.array):
+                columndata[i] = builtinlist(columndata[i])
+            columndata[i].extend([None]*len(values))
+
     def getcachekey(self, *args):
         return ":".join([str(x) for x in args])
 
@@ -288,49 +529,61 @@ class file(data):
 
         def readfile(file, title, self=self, commentpattern=commentpattern, stringpattern=stringpattern, columnpattern=columnpattern, skiphead=skiphead, skiptail=skiptail, every=every):
             columns = []
-            columndata = []
+            # the first column contains the line numbers, the other columns
+            # are kept in array("d") buffers as long as they contain floats only
+            columndata = [array.array("q")]
+            rows = 0
             linenumber = 0
-            maxcolumns = 0
-            for line in file.readlines():
-                line = line.strip()
-                match = commentpattern.match(line)
-                if match:
-                    if not len(columndata):
-                        columns = self.splitline(line[match.end():], stringpattern, columnpattern, tofloat=0)
-                else:
-                    linedata = []
-                    for value in self.splitline(line, stringpattern, columnpattern, tofloat=1):
-                        linedata.append(value)
-                    if len(linedata):
-                        if linenumber >= skiphead and not ((linenumber - skiphead) % every):
-                            linedata = [linenumber + 1] + linedata
-                            if len(linedata) > maxcolumns:
-                                maxcolumns = len(linedata)
-                            columndata.append(linedata)
-                        linenumber += 1
+            bulk = (hasnumpy and stringpattern is self.defaultstringpattern and
+                    columnpattern is self.defaultcolumnpattern and commentpattern is self.defaultcommentpattern)
+            for lines in iter(lambda: builtinlist(itertools.islice(file, self.chunksize)), []):
+                if bulk:
+                    values = self.splitlines(lines)
+                    if values is not None:
+                        # keep the rows according to skiphead and every
+                        start = max(0, skiphead - linenumber)
+                        start += -(linenumber + start - skiphead) % every
+                        kept = values[start::every]
+                        self.appendcolumns(columndata, rows, range(linenumber+start+1, linenumber+start+len(kept)*every+1, every), kept)
+                        rows += len(kept)
+                        linenumber += len(values)
+                        continue
+                for line in lines:
+                    line = line.strip()
+                    match = commentpattern.match(line)
+                    if match:
+                        if not rows:
+                            columns = self.splitline(line[match.end():], stringpattern, columnpattern, tofloat=0)
+                    else:
+                        values = self.splitline(line, stringpattern, columnpattern, tofloat=1)
+                        if len(values):
+                            if linenumber >= skiphead and not ((linenumber - skiphead) % every):
+                                self.appendrow(columndata, rows, linenumber + 1, values)
+                                rows += 1
+                            linenumber += 1
+            maxcolumns = len(columndata) if rows else 0
             if skiptail >= every:
                 skip, x = divmod(skiptail, every)
-                del columndata[-skip:]
-            for i in range(len(columndata)):
-                if len(columndata[i]) != maxcolumns:
-                    columndata[i].extend([None]*(maxcolumns-len(columndata[i])))
-            return points(columndata, title=title, addlinenumbers=0,
-                          **dict([(column, i+1) for i, column in enumerate(columns[:maxcolumns-1])]))
+                for column in columndata:
+                    del column[-skip:]
+            return _columns(columndata, title=title,
+                            **dict([(column, i+1) for i, column in enumerate(columns[:maxcolumns-1])]))
 
         try:
             filename.readlines
         except Exception:
             # not a file-like object -> open it
-            cachekey = self.getcachekey(filename, commentpattern, stringpattern, columnpattern, skiphead, skiptail, every)
-            if cachekey not in filecache:
+            def read():
                 with open(filename) as f:
-                    filecache[cachekey] = readfile(f, filename)
-            data.__init__(self, filecache[cachekey], **kwargs)
+                    return readfile(f, filename)
+            cachekey = self.getcachekey(filename, commentpattern, stringpattern, columnpattern, skiphead, skiptail, every)
+            data.__init__(self, filecache.get(filename, cachekey, read, sidecar=True), **kwargs)
         else:
             data.__init__(self, readfile(filename, "user provided file-like object"), **kwargs)
 
 
-conffilecache = {}
+conffilecache = _filecache(maxentries=config.getint("graph", "datacacheentries", 100),
+                           maxsize=config.getint("graph", "datacachesize", 100000000))
 
 class conffile(data):
 
@@ -380,14 +633,16 @@ class conffile(data):
             filename.readlines
         except Exception:
             # not a file-like object -> open it
-            if filename not in filecache:
-                filecache[filename] = readfile(open(filename), filename)
-            data.__init__(self, filecache[filename], **kwargs)
+            def read():
+                with open(filename) as f:
+                    return readfile(f, filename)
+            data.__init__(self, conffilecache.get(filename, None, read), **kwargs)
         else:
             data.__init__(self, readfile(filename, "user provided file-like object"), **kwargs)
 
 
-cbdfilecache = {}
+cbdfilecache = _filecache(maxentries=config.getint("graph", "datacacheentries", 100),
+                          maxsize=config.getint("graph", "datacachesize", 100000000))
 
 class cbdfile(data):
 
@@ -486,10 +741,11 @@ class cbdfile(data):
             filename.readlines
         except Exception:
             # not a file-like object -> open it
+            def read():
+                with open(filename, "rb") as f:
+                    return readfile(f, filename)
             cachekey = self.getcachekey(filename, minrank, maxrank)
-            if cachekey not in cbdfilecache:
-                cbdfilecache[cachekey] = readfile(open(filename, "rb"), filename)
-            data.__init__(self, cbdfilecache[cachekey], **kwargs)
+            data.__init__(self, cbdfilecache.get(filename, cachekey, read), **kwargs)
         else:
             data.__init__(self, readfile(filename, "user provided file-like object"), **kwargs)
 
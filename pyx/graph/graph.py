@@ -109,10 +109,52 @@ class plotitem:
             for privatedata, style in zip(self.privatedatalist, self.styles):
                 style.adjustaxis(privatedata, self.sharedata, graph, self, columnname, data)
 
+    def drawcolumnsavailable(self):
+        """check whether all styles provide the drawcolumns fast path
+
+        drawcolumns must be provided by the same class as drawpoint,
+        since a style overwriting drawpoint only still needs to be
+        called for each point"""
+        for style in self.styles:
+            if style.drawcolumns is None:
+                return False
+            for cls in type(style).__mro__:
+                if "drawpoint" in cls.__dict__ or "drawcolumns" in cls.__dict__:
+                    if "drawpoint" not in cls.__dict__ or "drawcolumns" not in cls.__dict__:
+                        return False
+                    break
+        return True
+
+    def drawcolumns(self, graph):
+        def draw(columns):
+            columns = dict(columns)
+            count = min([len(column) for column in columns.values()] or [0])
+            if count:
+                for columnname in self.usedcolumnnames:
+                    if columnname not in columns:
+                        columns[columnname] = [None]*count
+                for columnname, column in list(columns.items()):
+                    if len(column) != count:
+                        columns[columnname] = list(column)[:count]
+                for privatedata, style in zip(self.privatedatalist, self.styles):
+                    style.drawcolumns(privatedata, self.sharedata, graph, columns)
+
+        draw(self.data.columns)
+        # insert an empty point
+        if self.data.columns and self.dynamiccolumns:
+            draw(dict([(columnname, [None]) for columnname in self.usedcolumnnames]))
+        draw(self.dynamiccolumns)
+
     def draw(self, graph):
         for privatedata, style in zip(self.privatedatalist, self.styles):
             style.initdrawpoints(privatedata, self.sharedata, graph)
 
+        if self.drawcolumnsavailable():
+            self.drawcolumns(graph)
+            for privatedata, style in zip(self.privatedatalist, self.styles):
+                style.donedrawpoints(privatedata, self.sharedata, graph)
+            return
+
         point = dict([(columnname, None) for columnname in self.usedcolumnnames])
         # fill point with (static) column data first
         columns = list(self.data.columns.keys())
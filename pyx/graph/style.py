@@ -23,7 +23,7 @@
 
 
 import io, logging, math
-from pyx import attr, deco, bitmap, style, color, unit, canvas, path, mesh, trafo
+from pyx import attr, deco, bitmap, style, color, unit, canvas, path, mesh, stamp, trafo
 from pyx import text as textmodule
 from .graph import registerdefaultprovider, graphx
 from . import axis
@@ -103,6 +103,14 @@ class _style:
         keys are the column names."""
         pass
 
+    # Styles might provide a method drawcolumns(privatedata, sharedata,
+    # graph, columns) as a fast path for drawpoint. It is called with a
+    # dictionary mapping the column names to lists of equal length instead
+    # of the dictionary point for each data point. The fast path is taken
+    # only when all styles of a plot item provide drawcolumns in the same
+    # class as drawpoint.
+    drawcolumns = None
+
     def donedrawpoints(self, privatedata, sharedata, graph):
         """Finalize drawing of data
 
@@ -233,6 +241,18 @@ class pos(_style):
                     sharedata.vposvalid = 0
                 sharedata.vpos[index] = v
 
+    def drawcolumns(self, privatedata, sharedata, graph, columns):
+        count = len(next(iter(columns.values())))
+        sharedata.vposcolumns = [[None]*count for v in sharedata.vpos]
+        vposavailable = vposvalid = [1]*count
+        for columnname, index, axis in privatedata.pointpostmplist:
+            vcolumn = sharedata.vposcolumns[index] = axis.convertcolumn(columns[columnname])
+            vposavailable = [available and v is not None for available, v in zip(vposavailable, vcolumn)]
+            vposvalid = [valid and v is not None and not (v < -self.epsilon or v > 1+self.epsilon)
+                         for valid, v in zip(vposvalid, vcolumn)]
+        sharedata.vposavailablecolumn = vposavailable
+        sharedata.vposvalidcolumn = vposvalid
+
 
 registerdefaultprovider(pos(), pos.providesdata)
 
@@ -477,10 +497,11 @@ class symbol(_styleneedingpointpos):
 
     defaultsymbolattrs = [deco.stroked]
 
-    def __init__(self, symbol=changecross, size=0.2*unit.v_cm, symbolattrs=[]):
+    def __init__(self, symbol=changecross, size=0.2*unit.v_cm, symbolattrs=[], stamp=False):
         self.symbol = symbol
         self.size = size
         self.symbolattrs = symbolattrs
+        self.stamp = stamp
 
     def selectstyle(self, privatedata, sharedata, graph, selectindex, selecttotal):
         privatedata.symbol = attr.selectattr(self.symbol, selectindex, selecttotal)
@@ -492,11 +513,29 @@ class symbol(_styleneedingpointpos):
 
     def initdrawpoints(self, privatedata, sharedata, graph):
         privatedata.symbolcanvas = canvas.canvas()
+        privatedata.symbolstamp = None
+        if self.stamp and privatedata.symbolattrs is not None:
+            # the symbol is drawn once at the origin and placed at the data points
+            # by a stamp, i.e. the symbol function must not depend on the position
+            c = canvas.canvas()
+            privatedata.symbol(c, 0, 0, privatedata.size_pt, privatedata.symbolattrs)
+            privatedata.symbolstamp = privatedata.symbolcanvas.insert(stamp.stamp(c))
+
+    def drawsymbol_pt(self, privatedata, x_pt, y_pt):
+        if privatedata.symbolstamp is not None:
+            privatedata.symbolstamp.place_pt(x_pt, y_pt)
+        else:
+            privatedata.symbol(privatedata.symbolcanvas, x_pt, y_pt, privatedata.size_pt, privatedata.symbolattrs)
 
     def drawpoint(self, privatedata, sharedata, graph, point):
         if sharedata.vposvalid and privatedata.symbolattrs is not None:
-            x_pt, y_pt = graph.vpos_pt(*sharedata.vpos)
-            privatedata.symbol(privatedata.symbolcanvas, x_pt, y_pt, privatedata.size_pt, privatedata.symbolattrs)
+            self.drawsymbol_pt(privatedata, *graph.vpos_pt(*sharedata.vpos))
+
+    def drawcolumns(self, privatedata, sharedata, graph, columns):
+        if privatedata.symbolattrs is not None:
+            for vpos, vposvalid in zip(zip(*sharedata.vposcolumns), sharedata.vposvalidcolumn):
+                if vposvalid:
+                    self.drawsymbol_pt(privatedata, *graph.vpos_pt(*vpos))
 
     def donedrawpoints(self, privatedata, sharedata, graph):
         graph.layer("data").insert(privatedata.symbolcanvas)
@@ -618,6 +657,24 @@ class _line(_styleneedingpointpos):
                 self.addpointstopath(privatedata)
             privatedata.lastvpos = None
 
+    def addcolumns(self, privatedata, graphvpos_pt, vposavailablecolumn, vposvalidcolumn, vposcolumns):
+        # add columns of points by addpoint, but append runs of valid
+        # points following a point inside of the graph at once
+        vposs = list(zip(*vposcolumns))
+        i = 0
+        while i < len(vposs):
+            if vposvalidcolumn[i] and privatedata.linebasepoints:
+                try:
+                    j = vposvalidcolumn.index(0, i)
+                except ValueError:
+                    j = len(vposs)
+                privatedata.linebasepoints.extend([graphvpos_pt(*vpos) for vpos in vposs[i:j]])
+                privatedata.lastvpos = list(vposs[j-1])
+                i = j
+            else:
+                self.addpoint(privatedata, graphvpos_pt, vposavailablecolumn[i], vposvalidcolumn[i], list(vposs[i]))
+                i += 1
+
     def addinvalid(self, privatedata):
         if len(privatedata.linebasepoints) > 1:
             self.addpointstopath(privatedata)
@@ -656,6 +713,9 @@ class line(_line):
     def drawpoint(self, privatedata, sharedata, graph, point):
         self.addpoint(privatedata, graph.vpos_pt, sharedata.vposavailable, sharedata.vposvalid, sharedata.vpos)
 
+    def drawcolumns(self, privatedata, sharedata, graph, columns):
+        self.addcolumns(privatedata, graph.vpos_pt, sharedata.vposavailablecolumn, sharedata.vposvalidcolumn, sharedata.vposcolumns)
+
     def donedrawpoints(self, privatedata, sharedata, graph):
         path = self.donepointstopath(privatedata)
         if privatedata.lineattrs is not None and len(path):
@@ -21,7 +21,7 @@
 # along with PyX; if not, write to the Free Software
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
 
-import math, functools
+import array, math, functools
 from . import mathutils, trafo, unit
 from . import bbox as bboxmodule
 
@@ -780,6 +780,205 @@ class _rightnormcurve_pt(normcurve_pt):
         return 0.5+0.5*param
 
 
+################################################################################
+# normsubpathitemarray
+################################################################################
+
+class normsubpathitemarray:
+
+    """sequence of normsubpathitems stored in packed arrays
+
+    The coordinates of normline_pt and normcurve_pt instances are kept in
+    a single array of doubles, while a type array tags the entries as lines
+    or curves. The normsubpathitems are recreated on access only. Instances
+    of other normsubpathitem classes are stored as they are.
+    """
+
+    __slots__ = "types", "offsets", "coords", "others"
+
+    _line, _curve, _other = range(3)
+
+    def __init__(self, normsubpathitems=[]):
+        self.types = array.array("B")
+        self.offsets = array.array("L")
+        self.coords = array.array("d")
+        self.others = {}
+        self.extend(normsubpathitems)
+
+    def __len__(self):
+        return len(self.types)
+
+    def _item(self, i):
+        type = self.types[i]
+        offset = self.offsets[i]
+        if type == self._line:
+            coords = self.coords
+            return normline_pt(coords[offset], coords[offset+1], coords[offset+2], coords[offset+3])
+        elif type == self._curve:
+            return normcurve_pt(*self.coords[offset:offset+8])
+        return self.others[i]
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            start, stop, step = i.indices(len(self.types))
+            if step != 1:
+                return normsubpathitemarray([self._item(j) for j in range(start, stop, step)])
+            result = normsubpathitemarray()
+            if start < stop:
+                begin = self.offsets[start]
+                end = self.offsets[stop] if stop < len(self.types) else len(self.coords)
+                result.types = self.types[start:stop]
+                result.offsets = array.array("L", [offset-begin for offset in self.offsets[start:stop]])
+                result.coords = self.coords[begin:end]
+                result.others = dict((j-start, item) for j, item in self.others.items() if start <= j < stop)
+            return result
+        if i < 0:
+            i += len(self.types)
+        if not 0 <= i < len(self.types):
+            raise IndexError("normsubpathitemarray index out of range")
+        return self._item(i)
+
+    def _record(self, anormsubpathitem):
+        # type and coordinates of the record storing anormsubpathitem
+        if type(anormsubpathitem) is normline_pt:
+            return self._line, (anormsubpathitem.x0_pt, anormsubpathitem.y0_pt,
+                                anormsubpathitem.x1_pt, anormsubpathitem.y1_pt)
+        elif type(anormsubpathitem) is normcurve_pt:
+            return self._curve, (anormsubpathitem.x0_pt, anormsubpathitem.y0_pt,
+                                 anormsubpathitem.x1_pt, anormsubpathitem.y1_pt,
+                                 anormsubpathitem.x2_pt, anormsubpathitem.y2_pt,
+                                 anormsubpathitem.x3_pt, anormsubpathitem.y3_pt)
+        return self._other, ()
+
+    def __setitem__(self, i, anormsubpathitem):
+        """replace the normsubpathitem at index i
+
+        Replacing a normsubpathitem by one of the same kind (normline_pt,
+        normcurve_pt or any other class) updates its record in place.
+        Otherwise the coordinates and offsets of all following
+        normsubpathitems need to be moved, which is linear in their number.
+        """
+        if i < 0:
+            i += len(self.types)
+        if not 0 <= i < len(self.types):
+            raise IndexError("normsubpathitemarray assignment index out of range")
+        type, coords = self._record(anormsubpathitem)
+        offset = self.offsets[i]
+        end = self.offsets[i+1] if i+1 < len(self.types) else len(self.coords)
+        self.coords[offset:end] = array.array("d", coords)
+        if len(coords) != end - offset:
+            shift = offset + len(coords) - end
+            self.offsets[i+1:] = array.array("L", [nextoffset + shift for nextoffset in self.offsets[i+1:]])
+        self.types[i] = type
+        if type == self._other:
+            self.others[i] = anormsubpathitem
+        else:
+            self.others.pop(i, None)
+
+    def __iter__(self):
+        for i in range(len(self.types)):
+            yield self._item(i)
+
+    def append(self, anormsubpathitem):
+        type, coords = self._record(anormsubpathitem)
+        if type == self._other:
+            self.others[len(self.types)] = anormsubpathitem
+        self.offsets.append(len(self.coords))
+        self.types.append(type)
+        self.coords.extend(coords)
+
+    def extend(self, normsubpathitems):
+        for anormsubpathitem in normsubpathitems:
+            self.append(anormsubpathitem)
+
+    def pop(self):
+        i = len(self.types) - 1
+        if i < 0:
+            raise IndexError("pop from empty normsubpathitemarray")
+        anormsubpathitem = self._item(i)
+        del self.coords[self.offsets[i]:]
+        del self.offsets[i]
+        del self.types[i]
+        self.others.pop(i, None)
+        return anormsubpathitem
+
+    def arclen_pt(self, epsilon, upper=False):
+        """return arc length in pts"""
+        coords = self.coords
+        if not self.others and self._curve not in self.types:
+            # shortcut for polylines
+            return sum([math.hypot(x0_pt-x1_pt, y0_pt-y1_pt)
+                        for x0_pt, y0_pt, x1_pt, y1_pt in zip(coords[0::4], coords[1::4], coords[2::4], coords[3::4])])
+        return sum([math.hypot(coords[offset]-coords[offset+2], coords[offset+1]-coords[offset+3])
+                    if type == self._line else self._item(i).arclen_pt(epsilon, upper=upper)
+                    for i, (type, offset) in enumerate(zip(self.types, self.offsets))])
+
+    def bbox(self):
+        """return bounding box of the normsubpathitems"""
+        if not self.types:
+            return bboxmodule.empty()
+        if self.others or self._curve in self.types:
+            abbox = bboxmodule.empty()
+            for anormsubpathitem in self:
+                abbox += anormsubpathitem.bbox()
+            return abbox
+        xs_pt = self.coords[0::2]
+        ys_pt = self.coords[1::2]
+        return bboxmodule.bbox_pt(min(xs_pt), min(ys_pt), max(xs_pt), max(ys_pt))
+
+    def transformed(self, trafo):
+        """return transformed normsubpathitemarray"""
+        (a, b), (c, d) = trafo.matrix
+        e, f = trafo.vector
+        coords = self.coords
+        result = normsubpathitemarray()
+        result.types = self.types[:]
+        result.offsets = self.offsets[:]
+        result.coords = array.array("d", [0]) * len(coords)
+        result.coords[0::2] = array.array("d", [a*x_pt + b*y_pt + e for x_pt, y_pt in zip(coords[0::2], coords[1::2])])
+        result.coords[1::2] = array.array("d", [c*x_pt + d*y_pt + f for x_pt, y_pt in zip(coords[0::2], coords[1::2])])
+        result.others = dict((i, item.transformed(trafo)) for i, item in self.others.items())
+        return result
+
+    def minlinelength_pt(self):
+        """return the length of the shortest normline_pt
+
+        None is returned when there are other normsubpathitems than normline_pt
+        instances or no normsubpathitems at all.
+        """
+        if self.others or self._curve in self.types:
+            return None
+        coords = self.coords
+        return min([math.hypot(x1_pt-x0_pt, y1_pt-y0_pt)
+                    for x0_pt, y0_pt, x1_pt, y1_pt in zip(coords[0::4], coords[1::4], coords[2::4], coords[3::4])],
+                   default=None)
+
+    def _output(self, file, writer, stop, linefmt, curvefmt, outputmethod):
+        coords = self.coords
+        types = self.types[:stop]
+        # write runs of lines at once and all other normsubpathitems in between
+        start = 0
+        for i in [i for i, type in enumerate(types) if type != self._line] + [len(types)]:
+            if start < i:
+                begin = self.offsets[start]
+                end = begin + 4*(i-start)
+                file.write("".join([linefmt % point_pt for point_pt in zip(coords[begin+2:end:4], coords[begin+3:end:4])]))
+            if i < len(types):
+                if types[i] == self._curve:
+                    file.write(curvefmt % tuple(coords[self.offsets[i]+2:self.offsets[i]+8]))
+                else:
+                    getattr(self.others[i], outputmethod)(file, writer)
+            start = i + 1
+
+    def outputPS(self, file, writer, stop=None):
+        """write PS code of the normsubpathitems up to stop to file"""
+        self._output(file, writer, stop, "%g %g lineto\n", "%g %g %g %g %g %g curveto\n", "outputPS")
+
+    def outputPDF(self, file, writer, stop=None):
+        """write PDF code of the normsubpathitems up to stop to file"""
+        self._output(file, writer, stop, "%f %f l\n", "%f %f %f %f %f %f c\n", "outputPDF")
+
+
 ################################################################################
 # normsubpath
 ################################################################################
@@ -1063,7 +1262,7 @@ class normsubpath:
         # need to copy the normsubpathitems list. We do not pass the
         # normsubpathitems to the constructor to not repeat the checks
         # for minimal length of each normsubpathitem.
-        result = normsubpath(epsilon=self.epsilon)
+        result = self.__class__(epsilon=self.epsilon)
         result.normsubpathitems = self.normsubpathitems[:]
         result.closed = self.closed
 
@@ -1113,12 +1312,32 @@ class normsubpath:
         intersections_b = []
         epsilon = min(self.epsilon, other.epsilon)
         # Intersect all subpaths of self with the subpaths of other, possibly including
-        # one intersection point several times
-        for t_a, pitem_a  in enumerate(self.normsubpathitems):
-            for t_b, pitem_b in enumerate(other.normsubpathitems):
-                for intersection_a, intersection_b in pitem_a.intersect(pitem_b, epsilon):
-                    intersections_a.append(intersection_a + t_a)
-                    intersections_b.append(intersection_b + t_b)
+        # one intersection point several times. Only pairs of normsubpathitems
+        # with overlapping control boxes can intersect. We find them by a sweep
+        # in x direction over the control boxes of both normsubpaths, where the
+        # control boxes of self are enlarged by epsilon.
+        events = []
+        for t_a, pitem_a in enumerate(self.normsubpathitems):
+            cbox = pitem_a.cbox()
+            events.append((cbox.llx_pt-epsilon, cbox.urx_pt+epsilon, cbox.lly_pt-epsilon, cbox.ury_pt+epsilon, 0, t_a))
+        for t_b, pitem_b in enumerate(other.normsubpathitems):
+            cbox = pitem_b.cbox()
+            events.append((cbox.llx_pt, cbox.urx_pt, cbox.lly_pt, cbox.ury_pt, 1, t_b))
+        events.sort()
+        active = [], []
+        for llx_pt, urx_pt, lly_pt, ury_pt, side, t in events:
+            candidates = active[1-side]
+            candidates[:] = [candidate for candidate in candidates if candidate[1] >= llx_pt]
+            for candidate in candidates:
+                if candidate[2] <= ury_pt and candidate[3] >= lly_pt:
+                    if side:
+                        t_a, t_b = candidate[5], t
+                    else:
+                        t_a, t_b = t, candidate[5]
+                    for intersection_a, intersection_b in self.normsubpathitems[t_a].intersect(other.normsubpathitems[t_b], epsilon):
+                        intersections_a.append(intersection_a + t_a)
+                        intersections_b.append(intersection_b + t_b)
+            active[side].append((llx_pt, urx_pt, lly_pt, ury_pt, side, t))
 
         # although intersectipns_a are sorted for the different normsubpathitems,
         # within a normsubpathitem, the ordering has to be ensured separately:
@@ -1181,34 +1400,19 @@ class normsubpath:
         closepoints_a = closepoints(self, intersections_a)
         closepoints_b = closepoints(other, intersections_b)
 
-        # map intersection point to lowest point which is equivalent to the
-        # point
-        equivalentpoints = list(range(len(intersections_a)))
-
+        # determine the remaining intersection points, i.e. the lowest point of
+        # each set of equivalent points (note that the builtin set is hidden
+        # by the set function of this module)
+        intersectionpoints = dict.fromkeys(range(len(intersections_a)))
+        closepoints_b = dict.fromkeys(closepoints_b)
         for closepoint_a in closepoints_a:
-            for closepoint_b in closepoints_b:
-                if closepoint_a == closepoint_b:
-                    for i in range(closepoint_a[1], len(equivalentpoints)):
-                        if equivalentpoints[i] == closepoint_a[1]:
-                            equivalentpoints[i] = closepoint_a[0]
-
-        # determine the remaining intersection points
-        intersectionpoints = {}
-        for point in equivalentpoints:
-            intersectionpoints[point] = 1
+            if closepoint_a in closepoints_b and closepoint_a[1] in intersectionpoints:
+                del intersectionpoints[closepoint_a[1]]
+                intersectionpoints[closepoint_a[0]] = None
 
         # build result
-        result = []
-        intersectionpointskeys = list(intersectionpoints.keys())
-        intersectionpointskeys.sort()
-        for point in intersectionpointskeys:
-            for intersection_a, index_a in intersections_a:
-                if index_a == point:
-                    result_a = intersection_a
-            for intersection_b, index_b in intersections_b:
-                if index_b == point:
-                    result_b = intersection_b
-            result.append((result_a, result_b))
+        intersections_b = dict((index_b, intersection_b) for intersection_b, index_b in intersections_b)
+        result = [(intersections_a[point][0], intersections_b[point]) for point in sorted(intersectionpoints)]
         # note that the result is sorted in a, since we sorted
         # intersections_a in the very beginning
 
@@ -1260,6 +1464,14 @@ class normsubpath:
                 totalarclen_pt += self.normsubpathitems[normsubpathitemindex].arclen_pt(self.epsilon)
         return result, totalarclen_pt
 
+    def packed(self):
+        """return a packednormsubpath copy of the normsubpath"""
+        result = packednormsubpath(epsilon=self.epsilon)
+        result.normsubpathitems.extend(self.normsubpathitems)
+        result.closed = self.closed
+        result.skippedline = self.skippedline
+        return result
+
     def pathitems(self):
         """return list of pathitems"""
 
@@ -1385,7 +1597,7 @@ class normsubpath:
 
     def transformed(self, trafo):
         """return transformed path"""
-        nnormsubpath = normsubpath(epsilon=self.epsilon)
+        nnormsubpath = self.__class__(epsilon=self.epsilon)
         for pitem in self.normsubpathitems:
             nnormsubpath.append(pitem.transformed(trafo))
         if self.closed:
@@ -1448,6 +1660,91 @@ class normsubpath:
 
 
 
+class packednormsubpath(normsubpath):
+
+    """sub path of a normalized path with packed normsubpathitems
+
+    The normsubpathitems are stored in a normsubpathitemarray, which
+    considerably reduces the memory footprint of normsubpaths with many
+    normsubpathitems like long polylines. Arc lengths, bounding boxes,
+    transformations and the PostScript and PDF output are calculated
+    on the packed coordinates directly.
+    """
+
+    __slots__ = ()
+
+    def __init__(self, normsubpathitems=[], closed=0, epsilon=_marker):
+        normsubpath.__init__(self, epsilon=epsilon)
+        self.normsubpathitems = normsubpathitemarray()
+        self.extend(normsubpathitems)
+        if closed:
+            self.close()
+
+    def append(self, anormsubpathitem):
+        normsubpathitems = self.normsubpathitems
+        if (type(anormsubpathitem) is normline_pt and self.epsilon is not None and
+            self.skippedline is None and not self.closed and
+            normsubpathitems.types and normsubpathitems.types[-1] != normsubpathitems._other):
+            # shortcut for appending a line to a polyline
+            if math.hypot(anormsubpathitem.x1_pt-anormsubpathitem.x0_pt, anormsubpathitem.y1_pt-anormsubpathitem.y0_pt) >= self.epsilon:
+                coords = normsubpathitems.coords
+                assert math.hypot(coords[-2]-anormsubpathitem.x0_pt, coords[-1]-anormsubpathitem.y0_pt) < self.epsilon, "normsubpathitems do not match"
+                normsubpathitems.append(anormsubpathitem)
+                return
+        normsubpath.append(self, anormsubpathitem)
+
+    def arclen_pt(self, upper=False):
+        return self.normsubpathitems.arclen_pt(self.epsilon, upper=upper)
+
+    def bbox(self):
+        return self.normsubpathitems.bbox()
+
+    def packed(self):
+        return self.copy()
+
+    def transformed(self, trafo):
+        normsubpathitems = self.normsubpathitems.transformed(trafo)
+        # when appending to the new normsubpath, lines might become shorter
+        # than epsilon and curves might need to be split, see normsubpath.append
+        if self.epsilon is not None:
+            minlinelength_pt = normsubpathitems.minlinelength_pt()
+            if minlinelength_pt is None or minlinelength_pt < self.epsilon:
+                return normsubpath.transformed(self, trafo)
+        nnormsubpath = packednormsubpath(epsilon=self.epsilon)
+        nnormsubpath.normsubpathitems = normsubpathitems
+        if self.closed:
+            nnormsubpath.close()
+        elif self.skippedline is not None:
+            nnormsubpath.append(self.skippedline.transformed(trafo))
+        return nnormsubpath
+
+    def outputPS(self, file, writer):
+        if not self.normsubpathitems:
+            return
+        if self.closed and isinstance(self.normsubpathitems[-1], normline_pt):
+            assert len(self.normsubpathitems) > 1, "a closed normsubpath should contain more than a single normline_pt"
+            stop = -1
+        else:
+            stop = None
+        file.write("%g %g moveto\n" % self.atbegin_pt())
+        self.normsubpathitems.outputPS(file, writer, stop)
+        if self.closed:
+            file.write("closepath\n")
+
+    def outputPDF(self, file, writer):
+        if not self.normsubpathitems:
+            return
+        if self.closed and isinstance(self.normsubpathitems[-1], normline_pt):
+            assert len(self.normsubpathitems) > 1, "a closed normsubpath should contain more than a single normline_pt"
+            stop = -1
+        else:
+            stop = None
+        file.write("%f %f m\n" % self.atbegin_pt())
+        self.normsubpathitems.outputPDF(file, writer, stop)
+        if self.closed:
+            file.write("h\n")
+
+
 ################################################################################
 # normpath
 ################################################################################
@@ -1837,6 +2134,10 @@ class normpath:
         """return arc length(s) matching the given param(s)"""
         return [arclen_pt * unit.t_pt for arclen_pt in self._paramtoarclen_pt(params)]
 
+    def packed(self):
+        """return a normpath with packed normsubpaths, see packednormsubpath"""
+        return normpath([normsubpath.packed() for normsubpath in self.normsubpaths])
+
     def path(self):
         """return path corresponding to normpath"""
         from . import path
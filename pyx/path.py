@@ -23,8 +23,8 @@
 
 import math
 from math import cos, sin, tan, acos, pi, radians, degrees
-from . import trafo, unit
-from .normpath import NormpathException, normpath, normsubpath, normline_pt, normcurve_pt
+from . import baseclasses, trafo, unit
+from .normpath import NormpathException, normpath, normsubpath, packednormsubpath, normline_pt, normcurve_pt
 from . import bbox as bboxmodule
 
 # set is available as an external interface to the normpath.set method
@@ -38,6 +38,10 @@ class _marker: pass
 # specific exception for path-related problems
 class PathException(Exception): pass
 
+# minimal number of points of multilineto_pt and multicurveto_pt instances
+# to store the normsubpathitems in a packednormsubpath
+packthreshold = 1000
+
 ################################################################################
 # Bezier helper functions
 ################################################################################
@@ -1005,6 +1009,8 @@ class multilineto_pt(pathitem):
             context.x_pt, context.y_pt = self.points_pt[-1]
 
     def updatenormpath(self, normpath, context):
+        if len(self.points_pt) >= packthreshold and not isinstance(normpath.normsubpaths[-1], packednormsubpath):
+            normpath.normsubpaths[-1] = normpath.normsubpaths[-1].packed()
         x0_pt, y0_pt = context.x_pt, context.y_pt
         for point_pt in self.points_pt:
             normpath.normsubpaths[-1].append(normline_pt(x0_pt, y0_pt, *point_pt))
@@ -1047,6 +1053,8 @@ class multicurveto_pt(pathitem):
             context.x_pt, context.y_pt = point_pt[4:]
 
     def updatenormpath(self, normpath, context):
+        if len(self.points_pt) >= packthreshold and not isinstance(normpath.normsubpaths[-1], packednormsubpath):
+            normpath.normsubpaths[-1] = normpath.normsubpaths[-1].packed()
         x0_pt, y0_pt = context.x_pt, context.y_pt
         for point_pt in self.points_pt:
             normpath.normsubpaths[-1].append(normcurve_pt(x0_pt, y0_pt, *point_pt))
@@ -1070,11 +1078,15 @@ class multicurveto_pt(pathitem):
 # path: PS style path
 ################################################################################
 
-class path:
+class path(baseclasses.modifiable):
+
+    """PS style path
 
-    """PS style path"""
+    The path notifies its parents (like the decorated paths drawing it) when
+    it is modified by its methods. After modifying pathitems directly,
+    :meth:`modified` has to be called."""
 
-    __slots__ = "pathitems", "_normpath"
+    __slots__ = "pathitems", "_normpath", "_bbox", "_parents"
 
     def __init__(self, *pathitems):
         """construct a path from pathitems *args"""
@@ -1085,6 +1097,9 @@ class path:
         self.pathitems = list(pathitems)
         # normpath cache (when no epsilon is set)
         self._normpath = None
+        # bbox cache
+        self._bbox = None
+        self._parents = None
 
     def __add__(self, other):
         """create new path out of self and other"""
@@ -1097,7 +1112,7 @@ class path:
         being added.
         """
         self.pathitems += other.path().pathitems
-        self._normpath = None
+        self.modified()
         return self
 
     def __getitem__(self, i):
@@ -1116,7 +1131,7 @@ class path:
         """append a path item"""
         assert isinstance(apathitem, pathitem), "only pathitem instance allowed"
         self.pathitems.append(apathitem)
-        self._normpath = None
+        self.modified()
 
     def arclen_pt(self):
         """return arc length in pts"""
@@ -1160,14 +1175,15 @@ class path:
 
     def bbox(self):
         """return bbox of path"""
-        if self.pathitems:
-            bbox = self.pathitems[0].createbbox()
-            context = self.pathitems[0].createcontext()
-            for pathitem in self.pathitems[1:]:
-                pathitem.updatebbox(bbox, context)
-            return bbox
-        else:
-            return bboxmodule.empty()
+        if self._bbox is None:
+            if self.pathitems:
+                self._bbox = self.pathitems[0].createbbox()
+                context = self.pathitems[0].createcontext()
+                for pathitem in self.pathitems[1:]:
+                    pathitem.updatebbox(self._bbox, context)
+            else:
+                self._bbox = bboxmodule.empty()
+        return self._bbox.copy()
 
     def begin(self):
         """return param corresponding of the beginning of the path"""
@@ -1186,7 +1202,7 @@ class path:
         for apathitem in pathitems:
             assert isinstance(apathitem, pathitem), "only pathitem instance allowed"
         self.pathitems.extend(pathitems)
-        self._normpath = None
+        self.modified()
 
     def intersect(self, other):
         """intersect self with other path
@@ -1203,13 +1219,19 @@ class path:
         being joined.
         """
         self.pathitems = self.joined(other).path().pathitems
-        self._normpath = None
+        self.modified()
         return self
 
     def joined(self, other):
         """return path consisting of self and other joined together"""
         return self.normpath().joined(other).path()
 
+    def modified(self):
+        """invalidate the cached normpath and bbox and notify the parents"""
+        self._normpath = None
+        self._bbox = None
+        baseclasses.modifiable.modified(self)
+
     # << operator also designates joining
     __lshift__ = joined
 
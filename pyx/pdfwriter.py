@@ -21,7 +21,7 @@
 # along with PyX; if not, write to the Free Software
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
 
-import io, copy, logging, os, time
+import concurrent.futures, io, copy, logging, os, time
 logger = logging.getLogger("pyx")
 try:
     import zlib
@@ -42,6 +42,9 @@ class PDFregistry:
         self.resources = {}
         self.procsets = {"PDF": 1}
         self.merged = None
+        # object numbers by type and id, kept here as objects (like imported
+        # PDF objects) might be shared by several documents
+        self.refnos = {}
 
     def add(self, object):
         """ register object, merging it with an already registered object of the same type and id """
@@ -56,7 +59,7 @@ class PDFregistry:
         if self.merged:
             return self.merged.getrefno(object)
         else:
-            return self.types[object.type][object.id].refno
+            return self.refnos[object.type, object.id]
 
     def mergeregistry(self, registry):
         for object in registry.objects:
@@ -67,14 +70,14 @@ class PDFregistry:
         # first we set all refnos
         refno = 1
         for object in self.objects:
-            object.refno = refno
+            self.refnos[object.type, object.id] = refno
             refno += 1
 
         # second, all objects are written, keeping the positions in the output file
         fileposes = []
         for object in self.objects:
             fileposes.append(file.tell())
-            file.write("%i 0 obj\n" % object.refno)
+            file.write("%i 0 obj\n" % self.refnos[object.type, object.id])
             object.write(file, writer, self)
             file.write("endobj\n")
 
@@ -273,10 +276,16 @@ class PDFcontent(PDFobject):
         acontext = context()
         page.processPDF(contentfile, awriter, acontext, registry, self.bbox)
         self.content = contentfile.file.getvalue()
+        if awriter.executor is not None:
+            # compress in parallel to the processing of the following pages
+            self.compressedcontent = awriter.executor.submit(zlib.compress, self.content)
 
     def write(self, file, awriter, registry):
         if awriter.compress:
-            content = zlib.compress(self.content)
+            if awriter.executor is not None:
+                content = self.compressedcontent.result()
+            else:
+                content = zlib.compress(self.content)
         else:
             content = self.content
         file.write("<<\n"
@@ -295,7 +304,8 @@ class PDFwriter:
                        title=None, author=None, subject=None, keywords=None,
                        fullscreen=False, writebbox=False, compress=True, compresslevel=6,
                        stripfonts=True, textaspath=False, meshasbitmap=False, meshasbitmapresolution=300,
-                       strip_fonts=None, text_as_path=None, mesh_as_bitmap=None, mesh_as_bitmap_resolution=None):
+                       strip_fonts=None, text_as_path=None, mesh_as_bitmap=None, mesh_as_bitmap_resolution=None,
+                       workers=1):
         self._fontmap = None
 
         self.title = title
@@ -330,14 +340,27 @@ class PDFwriter:
         # encodings themselves are mappings from glyphnames to codepoints
         self.encodings = {}
 
-        # the PDFcatalog class automatically builds up the pdfobjects from a document
-        registry = PDFregistry()
-        catalog = PDFcatalog(document, self, registry)
-        registry.add(catalog)
-
-        file = writer.writer(file)
-        file.write_bytes(b"%PDF-1.4\n%\xc3\xb6\xc3\xa9\n")
-        registry.write(file, self, catalog)
+        # The content of the pages is processed sequentially, as the
+        # resources and the font encodings are shared between the pages and
+        # their numbering depends on the page order. Only the compression of
+        # the content streams is distributed to a pool of worker threads.
+        if workers > 1 and self.compress:
+            self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+        else:
+            self.executor = None
+
+        try:
+            # the PDFcatalog class automatically builds up the pdfobjects from a document
+            registry = PDFregistry()
+            catalog = PDFcatalog(document, self, registry)
+            registry.add(catalog)
+
+            file = writer.writer(file)
+            file.write_bytes(b"%PDF-1.4\n%\xc3\xb6\xc3\xa9\n")
+            registry.write(file, self, catalog)
+        finally:
+            if self.executor is not None:
+                self.executor.shutdown()
 
     def getfontmap(self):
         if self._fontmap is None:
@@ -97,6 +97,7 @@ class _PSwriter:
 
     def __init__(self, title=None, 
                  stripfonts=True, textaspath=False, meshasbitmap=False, meshasbitmapresolution=300,
+                 epsfileforms=False,
                  strip_fonts=None, text_as_path=None, mesh_as_bitmap=None, mesh_as_bitmap_resolution=None):
         self._fontmap = None
         self.title = title
@@ -115,6 +116,7 @@ class _PSwriter:
         if mesh_as_bitmap_resolution is not None:
             logger.warning("PSwriter: mesh_as_bitmap_resolution deprecated, use meshasbitmapresolution instead")
             meshasbitmapresolution = mash_as_bitmap_resolution
+        self.epsfileforms = epsfileforms
 
         # dictionary mapping font names to dictionaries mapping encoding names to encodings
         # encodings themselves are mappings from glyphnames to codepoints
@@ -21,78 +21,145 @@
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
 
 
-import io, struct
+import io, mmap, os, struct
+
+_int32 = struct.Struct(">l")
+_uint32 = struct.Struct(">L")
+_int16 = struct.Struct(">h")
+_uint16 = struct.Struct(">H")
+_char = struct.Struct("b")
+_uchar = struct.Struct("B")
 
 
 class reader:
 
+    """reader for binary files
+
+    The whole file is mapped into memory (or read at once when mapping is not
+    possible). The numbers are decoded from the buffer by precompiled structs
+    without copying the data. When a read goes beyond the end of the data,
+    the file is mapped again to take into account data appended to the file
+    in the meantime (like the pages of a DVI file written by TeX in texipc
+    mode). Reading beyond the end of the file raises a struct.error."""
+
     def __init__(self, filename):
         self.file = open(filename, "rb")
+        self.data = self._map()
+        self.pos = 0
+
+    def _map(self):
+        try:
+            return mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, EnvironmentError):
+            # empty files and files not supporting mmap
+            self.file.seek(0)
+            return self.file.read()
+
+    def _remap(self):
+        """map the file again when it has grown and return whether data was added"""
+        if self.file is None or os.fstat(self.file.fileno()).st_size <= len(self.data):
+            return False
+        # the old buffer is not closed explicitly as it might still be in use
+        self.data = self._map()
+        return True
 
     def tell(self):
-        return self.file.tell()
+        return self.pos
+
+    def seek(self, pos):
+        self.pos = pos
 
     def eof(self):
-        return self.file.eof()
+        if self.pos >= len(self.data):
+            self._remap()
+        return self.pos >= len(self.data)
 
     def read(self, bytes):
-        return self.file.read(bytes)
+        pos = self.pos
+        self.pos = pos + bytes
+        if self.pos > len(self.data):
+            self._remap()
+        return self.data[pos:self.pos]
+
+    def readmatch(self, pattern):
+        """read bytes matching the compiled regular expression pattern
+
+        An empty bytes instance is returned when the pattern does not match."""
+        if self.pos >= len(self.data):
+            self._remap()
+        m = pattern.match(self.data, self.pos)
+        if m is None:
+            return b""
+        self.pos = m.end()
+        return m.group()
 
     def readint(self, bytes=4, signed=0):
-        first = 1
-        result = 0
-        while bytes:
-            value = ord(self.file.read(1))
-            if first and signed and value > 127:
-                value -= 256
-            first = 0
-            result = 256 * result + value
-            bytes -= 1
+        pos = self.pos
+        if pos + bytes > len(self.data):
+            self._remap()
+            if pos + bytes > len(self.data):
+                raise struct.error("unpack requires a buffer of %d bytes" % bytes)
+        self.pos = pos + bytes
+        return int.from_bytes(self.data[pos:pos+bytes], "big", signed=bool(signed))
+
+    def _unpack(self, s):
+        try:
+            result, = s.unpack_from(self.data, self.pos)
+        except struct.error:
+            if not self._remap():
+                raise
+            result, = s.unpack_from(self.data, self.pos)
+        self.pos += s.size
         return result
 
     def readint32(self):
-        return struct.unpack(">l", self.file.read(4))[0]
+        return self._unpack(_int32)
 
     def readuint32(self):
-        return struct.unpack(">L", self.file.read(4))[0]
+        return self._unpack(_uint32)
 
     def readint24(self):
-        return struct.unpack(">l", b"\0"+self.file.read(3))[0]
+        return self.readint(3, 1)
 
     def readuint24(self):
-        return struct.unpack(">L", b"\0"+self.file.read(3))[0]
+        return self.readint(3)
 
     def readint16(self):
-        return struct.unpack(">h", self.file.read(2))[0]
+        return self._unpack(_int16)
 
     def readuint16(self):
-        return struct.unpack(">H", self.file.read(2))[0]
+        return self._unpack(_uint16)
 
     def readchar(self):
-        return struct.unpack("b", self.file.read(1))[0]
+        return self._unpack(_char)
 
     def readuchar(self):
-        return struct.unpack("B", self.file.read(1))[0]
+        return self._unpack(_uchar)
 
     def readstring(self, bytes):
         l = self.readuchar()
         assert l <= bytes-1, "inconsistency in file: string too long"
-        return self.file.read(bytes-1)[:l]
+        return self.read(bytes-1)[:l]
 
     def close(self):
-        self.file.close()
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        if self.file is not None:
+            self.file.close()
 
     def __enter__(self):
         return self
 
     def __exit__(self, exc_type, exc_value, traceback):
-        return self.file.__exit__(exc_type, exc_value, traceback)
+        self.close()
 
 
 class bytesreader(reader):
 
     def __init__(self, b):
-        self.file = io.BytesIO(b)
+        self.file = None
+        self.data = b
+        self.pos = 0
 
 
 class PStokenizer:
@@ -0,0 +1,175 @@
+# -*- encoding: utf-8 -*-
+#
+#
+# This file is part of PyX (https://pyx-project.org/).
+#
+# PyX is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# PyX is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PyX; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
+
+"""The stamp module provides a canvas item placing a canvas at several positions
+
+The canvas is written only once to the output, namely as a PostScript
+procedure, a PDF form XObject, or an SVG group within the definitions, which
+is then placed at the positions by translations. Canvases having the same
+output are shared within a document."""
+
+import hashlib, io
+try:
+    import zlib
+    haszlib = True
+except ImportError:
+    haszlib = False
+
+from . import baseclasses, pdfwriter, pswriter, svgwriter, unit
+from . import bbox as bboxmodule
+from . import writer as writermodule
+
+
+def _name(content):
+    return "stamp%s" % hashlib.sha256(content).hexdigest()[:16]
+
+
+class PDFstamp(pdfwriter.PDFobject):
+
+    def __init__(self, name, content, bbox, registry, stampregistry):
+        pdfwriter.PDFobject.__init__(self, "stamp", name)
+        registry.addresource("XObject", name, self)
+        self.name = name
+        self.content = content
+        self.bbox = bbox
+        self.stampregistry = stampregistry
+
+    def write(self, file, writer, registry):
+        if writer.compress:
+            content = zlib.compress(self.content)
+        else:
+            content = self.content
+        file.write("<<\n"
+                   "/Type /XObject\n"
+                   "/Subtype /Form\n")
+        file.write("/BBox [%f %f %f %f]\n" % self.bbox.highrestuple_pt())
+        file.write("/Resources ")
+        self.stampregistry.writeresources(file)
+        file.write("/Length %i\n" % len(content))
+        if writer.compress:
+            file.write("/Filter /FlateDecode\n")
+        file.write(">>\n"
+                   "stream\n")
+        file.write_bytes(content)
+        file.write("endstream\n")
+
+
+class SVGstamp(svgwriter.SVGresource):
+
+    def __init__(self, svgid, content):
+        super().__init__("stamp", svgid)
+        self.svgid = svgid
+        self.content = content
+
+    def output(self, xml, writer, registry):
+        xml.startSVGElement("g", {"id": self.svgid})
+        xml.newline_and_tell()
+        xml.svg.write(self.content)
+        xml.endSVGElement("g")
+
+
+class stamp(baseclasses.modifiablecanvasitem):
+
+    """a canvas placed at several positions
+
+    The content of the canvas must not depend on its position, as it is
+    written to the output only once."""
+
+    def __init__(self, canvas, positions_pt=None):
+        self.canvas = canvas
+        if positions_pt is None:
+            self.positions_pt = []
+        else:
+            self.positions_pt = list(positions_pt)
+        # modifications of the canvas modify the stamp as well
+        canvas.addparent(self)
+
+    def place_pt(self, x_pt, y_pt):
+        self.positions_pt.append((x_pt, y_pt))
+        self.modified()
+
+    def place(self, x, y):
+        self.place_pt(unit.topt(x), unit.topt(y))
+
+    def _bbox(self, cbbox):
+        # bbox of the canvas bbox cbbox placed at all positions
+        if not self.positions_pt or not cbbox:
+            return bboxmodule.empty()
+        xs_pt, ys_pt = list(zip(*self.positions_pt))
+        return bboxmodule.bbox_pt(cbbox.llx_pt + min(xs_pt), cbbox.lly_pt + min(ys_pt),
+                                  cbbox.urx_pt + max(xs_pt), cbbox.ury_pt + max(ys_pt))
+
+    def bbox(self):
+        return self._bbox(self.canvas.bbox())
+
+    def isvolatile(self):
+        return self.canvas.isvolatile()
+
+    def processPS(self, file, writer, context, registry, bbox):
+        if not self.positions_pt:
+            return
+        stampfile = writermodule.writer(io.BytesIO())
+        stampbbox = bboxmodule.empty()
+        self.canvas.processPS(stampfile, writer, context(), registry, stampbbox)
+        content = stampfile.file.getvalue()
+        name = _name(content)
+        registry.add(pswriter.PSdefinition(name, b"{\ngsave\ntranslate\n" + content + b"grestore\n} bind"))
+        for x_pt, y_pt in self.positions_pt:
+            file.write("%f %f %s\n" % (x_pt, y_pt, name))
+        bbox += self._bbox(stampbbox)
+
+    def processPDF(self, file, writer, context, registry, bbox):
+        if not self.positions_pt:
+            return
+        # we need to keep track of the resources used by the stamp, hence
+        # we create our own registry, which we merge immediately in the main registry
+        stampregistry = pdfwriter.PDFregistry()
+        stampfile = writermodule.writer(io.BytesIO())
+        stampbbox = bboxmodule.empty()
+        self.canvas.processPDF(stampfile, writer, context(), stampregistry, stampbbox)
+        content = stampfile.file.getvalue()
+        name = _name(content)
+        registry.add(PDFstamp(name, content, stampbbox, registry, stampregistry))
+        registry.mergeregistry(stampregistry)
+        for x_pt, y_pt in self.positions_pt:
+            file.write("q 1 0 0 1 %f %f cm /%s Do Q\n" % (x_pt, y_pt, name))
+        bbox += self._bbox(stampbbox)
+
+    def processSVG(self, xml, writer, context, registry, bbox):
+        if not self.positions_pt:
+            return
+        stampfile = io.BytesIO()
+        stampxml = svgwriter.SVGGenerator(stampfile, xlink=xml.xlink_enabled)
+        stampxml.startSVGDocument()
+        stampxml.startSVGElement("svg", {})
+        start = stampxml.newline_and_tell()
+        stampbbox = bboxmodule.empty()
+        self.canvas.processSVG(stampxml, writer, context(), registry, stampbbox)
+        end = stampxml.newline_and_tell()
+        stampxml.endSVGElement("svg")
+        stampxml.endSVGDocument()
+        if stampxml.xlink_used:
+            xml.xlink_used = True
+        content = stampfile.getvalue()[start:end]
+        name = _name(content)
+        registry.add(SVGstamp(name, content))
+        for x_pt, y_pt in self.positions_pt:
+            xml.startSVGElement("use", {"xlink:href": "#%s" % name, "x": "%g" % x_pt, "y": "%g" % -y_pt})
+            xml.endSVGElement("use")
+        bbox += self._bbox(stampbbox)
@@ -175,12 +175,13 @@ class SVGGenerator(xml.sax.saxutils.XMLGenerator):
 
 class SVGwriter:
 
-    def __init__(self, document, file, textaspath=True, meshasbitmapresolution=300, text_as_path=None, mesh_as_bitmap_resolution=None):
+    def __init__(self, document, file, textaspath=True, reuseglyphs=False, meshasbitmapresolution=300, text_as_path=None, mesh_as_bitmap_resolution=None):
         self._fontmap = None
         if text_as_path is not None:
             logger.warning("SVGwriter: text_as_path deprecated, use textaspath instead")
             textaspath = text_as_path
         self.textaspath = textaspath
+        self.reuseglyphs = reuseglyphs
         if mesh_as_bitmap_resolution is not None:
             logger.warning("SVGwriter: mesh_as_bitmap_resolution deprecated, use meshasbitmapresolution instead")
             meshasbitmapresolution = mash_as_bitmap_resolution
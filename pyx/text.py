@@ -19,10 +19,10 @@
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
 
 
-import atexit, errno, functools, glob, inspect, io, itertools, logging, os
-import queue, re, shutil, sys, tempfile, textwrap, threading
+import atexit, concurrent.futures, copy, errno, functools, glob, hashlib, inspect, io, itertools, logging, os
+import queue, re, shutil, struct, sys, tempfile, textwrap, threading
 
-from pyx import config, unit, box, baseclasses, trafo, version, attr, style, path, canvas
+from pyx import config, unit, box, baseclasses, trafo, version, attr, style, path, normpath, canvas
 from pyx import bbox as bboxmodule
 from pyx.dvi import dvifile
 
@@ -795,7 +795,11 @@ class MonitorOutput(threading.Thread):
             raise ValueError("{} finished unexpectedly".format(self.name))
 
 
-class textbox_pt(box.rect, baseclasses.canvasitem): pass
+class textbox_pt(box.rect, baseclasses.modifiablecanvasitem):
+
+    def transform(self, *trafos, keep_anchor=False):
+        box.rect.transform(self, *trafos, keep_anchor=keep_anchor)
+        self.modified()
 
 
 class textextbox_pt(textbox_pt):
@@ -833,6 +837,7 @@ class textextbox_pt(textbox_pt):
         self.height = height_pt*unit.x_pt   #: height of the text (PyX length)
         self.depth = depth_pt*unit.x_pt     #: height of the text (PyX length)
 
+        self.textextent_pt = left_pt, right_pt, height_pt, depth_pt
         self.do_finish = do_finish
         self.fontmap = fontmap
         self.singlecharmode = singlecharmode
@@ -847,7 +852,7 @@ class textextbox_pt(textbox_pt):
         self._dvicanvas = None
 
     def transform(self, *trafos, keep_anchor=False):
-        box.rect.transform(self, *trafos, keep_anchor=keep_anchor)
+        textbox_pt.transform(self, *trafos, keep_anchor=keep_anchor)
         for trafo in trafos:
             self.texttrafo = trafo * self.texttrafo
         if self._dvicanvas is not None:
@@ -858,6 +863,34 @@ class textextbox_pt(textbox_pt):
         self._dvicanvas = dvifile.readpage([ord("P"), ord("y"), ord("X"), page, 0, 0, 0, 0, 0, 0],
                                            fontmap=self.fontmap, singlecharmode=self.singlecharmode, attrs=[self.texttrafo] + self.fillstyles)
 
+    def copy_pt(self, x_pt, y_pt, trafos=[], fillstyles=[]):
+        """Return a copy of the text output at another position.
+
+        The copy shares the DVI output of this textbox, i.e. the text is not
+        typeset again. This textbox should not have been transformed.
+
+        :param float x_pt: x coordinate of the center in pts
+        :param float y_pt: y coordinate of the center in pts
+        :param trafos: transformations to be applied relative to the center
+        :type trafos: list of :class:`trafo.trafo_pt`
+        :param fillstyles: fill styles to be applied
+        :type fillstyles: list of fillstyles
+        :rtype: :class:`textextbox_pt`
+
+        """
+        box = textextbox_pt(x_pt, y_pt, *self.textextent_pt, None, self.fontmap, self.singlecharmode, fillstyles)
+        box.do_finish = lambda: box.copydvipage(self)
+        for t in trafos:
+            box.reltransform(t)
+        return box
+
+    def copydvipage(self, other):
+        """Use the DVI output of the textbox other."""
+        self._dvicanvas = canvas.canvas([self.texttrafo] + self.fillstyles)
+        self._dvicanvas.markers = other.dvicanvas.markers
+        for item in other.dvicanvas.items:
+            self._dvicanvas.insert(item)
+
     @property
     def dvicanvas(self):
         if self._dvicanvas is None:
@@ -885,7 +918,7 @@ class textextbox_pt(textbox_pt):
         return self.texttrafo.apply(*self.dvicanvas.markers[name])
 
     def textpath(self):
-        textpath = path.path()
+        textpath = normpath.normpath()
         for item in self.dvicanvas.items:
             textpath += item.textpath()
         return textpath.transformed(self.texttrafo)
@@ -944,6 +977,162 @@ class TexDoneError(Exception):
     pass
 
 
+_texversions = {}
+
+def texversion(cmd):
+    """Return the version information of a TeX interpreter.
+
+    :param cmd: command and arguments to start the TeX interpreter
+    :type cmd: list of str
+    :returns: first line of the output of the ``--version`` option
+    :rtype: str
+
+    """
+    if tuple(cmd) not in _texversions:
+        with config.Popen(cmd + ["--version"], stdout=config.PIPE) as popen:
+            _texversions[tuple(cmd)] = popen.stdout.readline().decode("ascii", errors="surrogateescape").rstrip()
+    return _texversions[tuple(cmd)]
+
+
+class TypesetCache:
+
+    #: struct of the header of a cache entry (magic and extents)
+    header = struct.Struct(">4s4d")
+    magic = b"PyXT"
+
+    def __init__(self, dir, maxsize=config.getint("text", "cachesize", 100000000)):
+        """Persistent cache of typeset texts.
+
+        The cache stores the extents and the DVI data of typeset texts in a
+        directory. Each entry is stored in a file of its own named by the hash
+        of all the input defining the typesetting result (see :meth:`key`).
+        New entries are written to temporary files and renamed afterwards, so
+        that several processes can share a cache directory.
+
+        :param str dir: cache directory (created on demand)
+        :param int maxsize: maximal total size of the cache entries in bytes;
+            when exceeded, the least recently used entries are removed
+
+        """
+        self.dir = dir
+        self.maxsize = maxsize
+        self.size = None
+
+    def key(self, *items):
+        """Return the key for a cache entry.
+
+        :param items: input defining the typesetting result like the command,
+            preambles, and the expression
+        :type items: str
+        :rtype: str
+
+        """
+        h = hashlib.sha256()
+        for item in items:
+            h.update(item.encode("utf-8", errors="surrogateescape"))
+            h.update(b"\0")
+        return h.hexdigest()
+
+    def filename(self, key):
+        return os.path.join(self.dir, key[:2], key)
+
+    def get(self, key):
+        """Fetch a cache entry.
+
+        :param str key: key of the entry
+        :returns: extents and DVI data of the entry or ``None`` if not
+            available
+        :rtype: tuple or None
+
+        """
+        filename = self.filename(key)
+        try:
+            with open(filename, "rb") as f:
+                data = f.read()
+        except EnvironmentError:
+            return None
+        if len(data) < self.header.size:
+            return None
+        magic, *extent_pt = self.header.unpack_from(data)
+        if magic != self.magic:
+            return None
+        try:
+            os.utime(filename) # mark as recently used
+        except EnvironmentError:
+            pass
+        return extent_pt, data[self.header.size:]
+
+    def put(self, key, extent_pt, dvidata):
+        """Store a cache entry.
+
+        :param str key: key of the entry
+        :param extent_pt: extents of the typeset box
+        :type extent_pt: list of four floats
+        :param bytes dvidata: DVI data containing the typeset box as its only page
+
+        """
+        filename = self.filename(key)
+        data = self.header.pack(self.magic, *extent_pt) + dvidata
+        try:
+            os.makedirs(os.path.dirname(filename), exist_ok=True)
+            fd, tmpfilename = tempfile.mkstemp(prefix=".", dir=os.path.dirname(filename))
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(tmpfilename, filename)
+            finally:
+                if os.path.exists(tmpfilename):
+                    os.unlink(tmpfilename)
+        except EnvironmentError as e:
+            logger.warning("Could not write to the typeset cache: {}".format(e))
+            return
+        if self.size is None:
+            self.size = sum(size for filename, mtime, size in self.entries())
+        else:
+            self.size += len(data)
+        if self.size > self.maxsize:
+            self.prune()
+
+    def entries(self):
+        """Iterate over the cache entries.
+
+        :returns: filename, modification time, and size of the entries
+        :rtype: iterator of tuples
+
+        """
+        try:
+            subdirs = list(os.scandir(self.dir))
+        except EnvironmentError:
+            return
+        for subdir in subdirs:
+            try:
+                files = list(os.scandir(subdir.path))
+            except EnvironmentError:
+                continue
+            for file in files:
+                if file.name.startswith("."): # skip temporary files
+                    continue
+                try:
+                    stat = file.stat()
+                except EnvironmentError:
+                    continue
+                yield file.path, stat.st_mtime, stat.st_size
+
+    def prune(self):
+        """Remove the least recently used entries until the total size of
+        the cache drops below 90% of its maximal size."""
+        entries = sorted(self.entries(), key=lambda entry: entry[1])
+        self.size = sum(size for filename, mtime, size in entries)
+        for filename, mtime, size in entries:
+            if self.size <= 0.9*self.maxsize:
+                break
+            try:
+                os.unlink(filename)
+            except EnvironmentError:
+                pass # already removed by a concurrent process
+            self.size -= size
+
+
 class SingleEngine:
 
     #: default :class:`texmessage` parsers at interpreter startup
@@ -966,7 +1155,9 @@ class SingleEngine:
                        texmessages_start=[],
                        texmessages_end=[],
                        texmessages_preamble=[],
-                       texmessages_run=[]):
+                       texmessages_run=[],
+                       cache=config.get("text", "cache", None),
+                       formatcache=config.get("text", "formatcache", None)):
         """Base class for the TeX interface.
 
         .. note:: This class cannot be used directly. It is the base class for
@@ -1001,6 +1192,12 @@ class SingleEngine:
         :type texmessages_preamble: list of :class:`texmessage` parsers
         :param texmessages_run: additional message parsers for typset output
         :type texmessages_run: list of :class:`texmessage` parsers
+        :param cache: persistent cache of typeset texts or the directory to be
+            used for it (see :ref:`typesetcache`)
+        :type cache: None or str or :class:`TypesetCache`
+        :param formatcache: directory to store format files dumped after the
+            execution of the preambles (see :ref:`formatcache`)
+        :type formatcache: None or str
 
         """
         self.cmd = cmd
@@ -1014,6 +1211,10 @@ class SingleEngine:
         self.texmessages_end = texmessages_end
         self.texmessages_preamble = texmessages_preamble
         self.texmessages_run = texmessages_run
+        if isinstance(cache, str):
+            cache = TypesetCache(cache)
+        self.cache = cache
+        self.formatcache = formatcache
 
         self.state = STATE_START
         self.executeid = 0
@@ -1022,6 +1223,15 @@ class SingleEngine:
         self.needdvitextboxes = [] # when texipc-mode off
         self.dvifile = None
 
+        self.preambles = [] # preambles postponed until the start of TeX (when caching)
+        self.cacheprefix = None # cache key prefix describing the engine setup
+        self.cachepages = {} # cache keys and extents of the pages still to be cached
+
+        self.fmt = None # format file to start TeX from
+        self.dumping = False # start TeX in ini mode to dump a format
+
+        self.labelcache = None # cache of typeset axis labels (see graph.axis.painter)
+
     def _cleanup(self):
         """Clean-up TeX interpreter and tmp directory.
 
@@ -1097,31 +1307,97 @@ class SingleEngine:
             wait_ok = self.texoutput.done()
         else:
             wait_ok = self.texoutput.wait()
+        return self._parse(expr, self.texoutput.read(), wait_ok, texmessages, oldstate, newstate, self.executeid, self.page)
+
+    def _execute_batch(self, exprs, texmessages):
+        """Typeset several TeX expressions at once.
+
+        All expressions are passed to TeX in a single write and the output is
+        collected after waiting for the input marker of the last expression
+        only. The output is then split at the input markers of the individual
+        expressions and parsed separately, so that message parsing and error
+        reporting works per expression as in :meth:`_execute`.
+
+        :param exprs: expressions to be typeset
+        :type exprs: list of str
+        :param texmessages: message parsers to analyse the textual output of
+            TeX for each of the expressions
+        :type texmessages: list of :class:`texmessage` parsers
+        :returns: extents of the typeset boxes
+        :rtype: list of lists of four floats
+
+        """
+        assert self.state == STATE_TYPESET
+        if not exprs:
+            return []
+        for expr in exprs:
+            expr.encode(self.texenc)
+        jobs = []
+        for expr in exprs:
+            self.page += 1
+            self.executeid += 1
+            jobs.append(("\\ProcessPyXBox{%s%%\n}{%i}%%\n\\PyXInput{%i}%%\n" % (expr, self.page, self.executeid), self.executeid, self.page))
+        self.texoutput.expect("PyXInputMarker:executeid=%i:" % self.executeid)
+        self.texinput.write("".join(expr for expr, executeid, page in jobs))
+        self.texinput.flush()
+        wait_ok = self.texoutput.wait()
+        output = self.texoutput.read()
+        extents_pt = []
+        for expr, executeid, page in jobs:
+            marker = "PyXInputMarker:executeid=%i:" % executeid
+            pos = output.find(marker)
+            if pos == -1:
+                chunk, output = output, ""
+            else:
+                pos += len(marker)
+                chunk, output = output[:pos], output[pos:]
+            extents_pt.append(self._parse(expr, chunk, wait_ok, texmessages, STATE_TYPESET, STATE_TYPESET, executeid, page))
+        return extents_pt
+
+    def _parse(self, expr, output, wait_ok, texmessages, oldstate, newstate, executeid, page):
+        """Parse the TeX output of an expression.
+
+        :param str expr: expression passed to TeX (used in error messages)
+        :param str output: output of TeX to be parsed
+        :param bool wait_ok: whether TeX responded within the timeout period
+        :param texmessages: message parsers to analyse the textual output of
+            TeX
+        :type texmessages: list of :class:`texmessage` parsers
+        :param int oldstate: state of the TeX interpreter prior to the
+            expression execution
+        :param int newstate: state of the TeX interpreter after to the
+            expression execution
+        :param int executeid: id of the input marker of the expression
+        :param int page: page number of the typeset box
+        :returns: extents of the typeset box in typeset mode, otherwise ``None``
+        :raises TexResultError: when the output could not be parsed completely
+
+        """
         try:
-            parsed = unparsed = self.texoutput.read()
+            parsed = unparsed = output
             if not wait_ok:
                 raise TexResultError("TeX didn't respond as expected within the timeout period.")
             if newstate != STATE_DONE:
-                parsed, m = remove_string("PyXInputMarker:executeid=%s:" % self.executeid, parsed)
+                parsed, m = remove_string("PyXInputMarker:executeid=%s:" % executeid, parsed)
                 if not m:
                     raise TexResultError("PyXInputMarker expected")
                 if oldstate == newstate == STATE_TYPESET:
                     parsed, m = remove_pattern(PyXBoxPattern, parsed, ignore_nl=False)
                     if not m:
                         raise TexResultError("PyXBox expected")
-                    if m.group("page") != str(self.page):
+                    if m.group("page") != str(page):
                         raise TexResultError("Wrong page number in PyXBox")
                     extent_pt = [float(x)*72/72.27 for x in m.group("lt", "rt", "ht", "dp")]
-                    parsed, m = remove_string("[80.121.88.%s]" % self.page, parsed)
+                    parsed, m = remove_string("[80.121.88.%s]" % page, parsed)
                     if not m:
                         raise TexResultError("PyXPageOutMarker expected")
             else:
                 # check for "Output written on ...dvi (1 page, 220 bytes)."
-                if self.page:
+                if page:
                     parsed, m = remove_pattern(dvi_pattern, parsed)
                     if not m:
                         raise TexResultError("TeX dvifile messages expected")
-                    if m.group("page") != str(self.page):
+                    if m.group("page") != str(page):
                         raise TexResultError("wrong number of pages reported")
                 else:
                     parsed, m = remove_string("No pages of output.", parsed)
@@ -1172,7 +1448,13 @@ class SingleEngine:
         cmd = self.cmd + ['--output-directory', tex_tmpdir]
         if self.texipc:
             cmd.append("--ipc")
-        self.popen = config.Popen(cmd, stdin=config.PIPE, stdout=config.PIPE, stderr=config.STDOUT, bufsize=0)
+        env = None
+        if self.dumping:
+            cmd.append("-ini")
+        elif self.fmt is not None:
+            cmd.append("-fmt=%s" % os.path.splitext(os.path.basename(self.fmt))[0])
+            env = dict(os.environ, TEXFORMATS=os.path.dirname(self.fmt) + os.pathsep)
+        self.popen = config.Popen(cmd, stdin=config.PIPE, stdout=config.PIPE, stderr=config.STDOUT, bufsize=0, env=env)
         self.texinput = io.TextIOWrapper(self.popen.stdin, encoding=self.texenc)
         if self.copyinput:
             try:
@@ -1184,6 +1466,13 @@ class SingleEngine:
         self.texoutput = MonitorOutput(self.name, io.TextIOWrapper(self.popen.stdout, encoding=self.texenc, errors="surrogateescape"))
 
         self.state = STATE_PREAMBLE
+        if self.fmt is not None:
+            # all definitions are contained in the format already
+            self._execute("\\scrollmode\n\\raiseerror%\n", self.texmessages_start_default + self.texmessages_start, STATE_PREAMBLE, STATE_PREAMBLE)
+            return
+        if self.dumping:
+            # load the format of the TeX command in ini mode
+            self.texinput.write("&%s " % os.path.splitext(os.path.basename(self.cmd[0]))[0])
         self._execute("\\scrollmode\n\\raiseerror%\n" # switch to and check scrollmode
                       "\\def\\PyX{P\\kern-.3em\\lower.5ex\\hbox{Y}\\kern-.18em X}%\n" # just the PyX Logo
                       "\\gdef\\PyXBoxHAlign{0}%\n" # global PyXBoxHAlign (0.0-1.0) for the horizontal alignment, default to 0
@@ -1210,20 +1499,102 @@ class SingleEngine:
                       "\\def\\PyXMarker#1{\\hskip0pt\\special{PyX:marker #1}}%", # write PyXMarker special into the dvi-file
                       self.texmessages_start_default + self.texmessages_start, STATE_PREAMBLE, STATE_PREAMBLE)
 
+    def do_startpreambles(self):
+        """Start TeX interpreter and execute the postponed preambles."""
+        if self.formatcache is not None:
+            self.fmt = self.getformat()
+        self.do_start()
+        if self.fmt is None:
+            for expr, texmessages in self.preambles:
+                self._execute(expr, texmessages, STATE_PREAMBLE, STATE_PREAMBLE)
+
+    def do_dump(self):
+        """Dump a format and terminate the TeX interpreter.
+
+        :returns: name of the format file
+        :rtype: str
+
+        """
+        assert self.state == STATE_PREAMBLE
+        self.texoutput.expect(None)
+        self.texinput.write("\\expandafter\\ifx\\csname @@dump\\endcsname\\relax\\expandafter\\dump\\else\\csname @@dump\\expandafter\\endcsname\\fi\n")
+        self.texinput.close()
+        self.state = STATE_DONE
+        wait_ok = self.texoutput.done()
+        output = self.texoutput.read()
+        self.popen.wait()
+        fmt = os.path.join(self.tmpdir, "texput.fmt")
+        if not wait_ok or not os.path.isfile(fmt):
+            raise TexResultError("dumping the format failed:\n{}".format(indent_text(output.rstrip())))
+        return fmt
+
+    def getformat(self):
+        """Get the format for the engine setup and the preambles.
+
+        The format is taken from the format cache directory when available,
+        otherwise it is dumped by a TeX interpreter started in ini mode and
+        stored in the format cache directory.
+
+        :returns: name of the format file or ``None`` when dumping the format
+            failed
+        :rtype: str or None
+
+        """
+        key = hashlib.sha256("\0".join(self.cachesetup() + [texversion(self.cmd)]).encode("utf-8", errors="surrogateescape")).hexdigest()
+        fmt = os.path.join(self.formatcache, "pyx%s.fmt" % key)
+        if os.path.isfile(fmt):
+            return fmt
+        dumper = copy.copy(self)
+        dumper.preambles = list(self.preambles)
+        dumper.needdvitextboxes = list(self.needdvitextboxes)
+        dumper.cachepages = dict(self.cachepages)
+        dumper.cache = dumper.formatcache = dumper.copyinput = None
+        dumper.usefiles = []
+        dumper.texipc = False
+        dumper.dumping = True
+        try:
+            dumper.do_startpreambles()
+            dumpfmt = dumper.do_dump()
+            os.makedirs(self.formatcache, exist_ok=True)
+            fd, tmpfmt = tempfile.mkstemp(prefix=".", dir=self.formatcache)
+            os.close(fd)
+            try:
+                shutil.copyfile(dumpfmt, tmpfmt)
+                os.replace(tmpfmt, fmt)
+            finally:
+                if os.path.exists(tmpfmt):
+                    os.unlink(tmpfmt)
+        except (EnvironmentError, TexResultError) as e:
+            logger.warning("Could not dump a format for {}, starting without it: {}".format(self.name, e))
+            return None
+        finally:
+            if hasattr(dumper, "tmpdir"): # the interpreter might not have been started at all
+                atexit.unregister(dumper._cleanup)
+                dumper._cleanup()
+        return fmt
+
     def do_preamble(self, expr, texmessages):
         """Ensure preamble mode and execute expr."""
         if self.state < STATE_PREAMBLE:
-            self.do_start()
+            self.do_startpreambles()
         self._execute(expr, texmessages, STATE_PREAMBLE, STATE_PREAMBLE)
 
     def do_typeset(self, expr, texmessages):
         """Ensure typeset mode and typeset expr."""
         if self.state < STATE_PREAMBLE:
-            self.do_start()
+            self.do_startpreambles()
         if self.state < STATE_TYPESET:
             self.go_typeset()
         return self._execute(expr, texmessages, STATE_TYPESET, STATE_TYPESET)
 
+    def do_typeset_batch(self, exprs, texmessages):
+        """Ensure typeset mode and typeset several exprs at once."""
+        if self.state < STATE_PREAMBLE:
+            self.do_startpreambles()
+        if self.state < STATE_TYPESET:
+            self.go_typeset()
+        return self._execute_batch(exprs, texmessages)
+
     def do_finish(self, cleanup=True):
         """Teardown TeX interpreter and cleanup environment.
 
@@ -1243,7 +1614,7 @@ class SingleEngine:
             self.dvifile = dvifile.DVIfile(dvifilename, debug=self.dvitype)
             page = 1
             for box in self.needdvitextboxes:
-                box.readdvipage(self.dvifile, page)
+                self._readdvipage(box, page)
                 page += 1
         if self.dvifile is not None and self.dvifile.readpage(None) is not None:
             raise ValueError("end of dvifile expected but further pages follow")
@@ -1264,9 +1635,17 @@ class SingleEngine:
         but only prior to :meth:`SingleEngine.text` and
         :meth:`SingleEngine.text_pt`.
 
+        When a :class:`TypesetCache` or a format cache is used, the execution
+        of the preambles is postponed until the TeX interpreter is needed to
+        typeset the first text.
+
         """
         texmessages = self.texmessages_preamble_default + self.texmessages_preamble + texmessages
-        self.do_preamble(expr, texmessages)
+        if (self.cache is not None or self.formatcache is not None) and self.state == STATE_START:
+            assert self.cacheprefix is None, "preamble after text"
+            self.preambles.append((expr, texmessages))
+        else:
+            self.do_preamble(expr, texmessages)
 
     def text_pt(self, x_pt, y_pt, expr, textattrs=[], texmessages=[], fontmap=None, singlecharmode=False):
         """Typeset text.
@@ -1292,6 +1671,92 @@ class SingleEngine:
         """
         if self.state == STATE_DONE:
             raise TexDoneError("typesetting process was terminated already")
+        expr, trafos, fillstyles = self._applyattrs(expr, textattrs)
+        if self.cache is not None:
+            key = self._cachekey(expr)
+            cached = self.cache.get(key)
+            if cached is not None:
+                extent_pt, dvidata = cached
+                return self._textbox(x_pt, y_pt, extent_pt, None, trafos, fillstyles, fontmap, singlecharmode, dvidata=dvidata)
+        first = self.state < STATE_TYPESET
+        extent_pt = self.do_typeset(expr, self.texmessages_run_default + self.texmessages_run + texmessages)
+        if self.texipc and first:
+            self.dvifile = dvifile.DVIfile(os.path.join(self.tmpdir, "texput.dvi"), debug=self.dvitype)
+        if self.cache is not None:
+            self.cachepages[self.page] = key, extent_pt
+        return self._textbox(x_pt, y_pt, extent_pt, self.page, trafos, fillstyles, fontmap, singlecharmode)
+
+    def text_batch_pt(self, items, texmessages=[], fontmap=None, singlecharmode=False):
+        """Typeset several texts at once.
+
+        :param items: texts to be typeset
+        :type items: list of tuples ``(x_pt, y_pt, expr)`` or
+            ``(x_pt, y_pt, expr, textattrs)`` with the meaning of the
+            parameters as in :meth:`text_pt`
+        :param texmessages: additional message parsers applied to the output
+            of each of the texts
+        :type texmessages: list of :class:`texmessage` parsers
+        :param fontmap: force a fontmap to be used (instead of the default
+            depending on the output format)
+        :type fontmap: None or fontmap
+        :param bool singlecharmode: position each character separately
+        :returns: text outputs insertable into a canvas in the order of the
+            items
+        :rtype: list of :class:`textextbox_pt`
+        :raises: :exc:`TexDoneError`: when the TeX interpreter has been
+            terminated already.
+
+        In contrast to calling :meth:`text_pt` for each of the items, all
+        texts are passed to the TeX interpreter at once and only a single
+        round trip to the TeX interpreter is needed.
+
+        """
+        if self.state == STATE_DONE:
+            raise TexDoneError("typesetting process was terminated already")
+        boxes = []
+        missing = [] # indices in boxes still to be typeset
+        exprs = []
+        keys = []
+        for item in items:
+            if len(item) == 3:
+                x_pt, y_pt, expr = item
+                textattrs = []
+            else:
+                x_pt, y_pt, expr, textattrs = item
+            expr, trafos, fillstyles = self._applyattrs(expr, textattrs)
+            if self.cache is not None:
+                key = self._cachekey(expr)
+                cached = self.cache.get(key)
+                if cached is not None:
+                    extent_pt, dvidata = cached
+                    boxes.append(self._textbox(x_pt, y_pt, extent_pt, None, trafos, fillstyles, fontmap, singlecharmode, dvidata=dvidata))
+                    continue
+                keys.append(key)
+            missing.append(len(boxes))
+            boxes.append((x_pt, y_pt, trafos, fillstyles))
+            exprs.append(expr)
+        if exprs:
+            first = self.state < STATE_TYPESET
+            extents_pt = self.do_typeset_batch(exprs, self.texmessages_run_default + self.texmessages_run + texmessages)
+            if self.texipc and first:
+                self.dvifile = dvifile.DVIfile(os.path.join(self.tmpdir, "texput.dvi"), debug=self.dvitype)
+            page = self.page - len(exprs)
+            for i, extent_pt in zip(missing, extents_pt):
+                page += 1
+                if self.cache is not None:
+                    self.cachepages[page] = keys.pop(0), extent_pt
+                x_pt, y_pt, trafos, fillstyles = boxes[i]
+                boxes[i] = self._textbox(x_pt, y_pt, extent_pt, page, trafos, fillstyles, fontmap, singlecharmode)
+        return boxes
+
+    def _applyattrs(self, expr, textattrs):
+        """Apply textattrs to expr.
+
+        :returns: the modified expression, the trafos and the fillstyles to be
+            applied to the textbox
+        :rtype: tuple
+
+        """
         textattrs = attr.mergeattrs(textattrs) # perform cleans
         attr.checkattrs(textattrs, [textattr, trafo.trafo_pt, style.fillstyle])
         trafos = attr.getattrs(textattrs, [trafo.trafo_pt])
@@ -1301,21 +1766,50 @@ class SingleEngine:
             expr = expr.tex
         for ta in textattrs[::-1]:
             expr = ta.apply(expr)
-        first = self.state < STATE_TYPESET
-        left_pt, right_pt, height_pt, depth_pt = self.do_typeset(expr, self.texmessages_run_default + self.texmessages_run + texmessages)
-        if self.texipc and first:
-            self.dvifile = dvifile.DVIfile(os.path.join(self.tmpdir, "texput.dvi"), debug=self.dvitype)
+        return expr, trafos, fillstyles
+
+    def _textbox(self, x_pt, y_pt, extent_pt, page, trafos, fillstyles, fontmap, singlecharmode, dvidata=None):
+        """Create the textbox for a typeset page.
+
+        When *page* is ``None``, the page is read from *dvidata* as taken
+        from the :class:`TypesetCache`.
+
+        """
+        left_pt, right_pt, height_pt, depth_pt = extent_pt
         box = textextbox_pt(x_pt, y_pt, left_pt, right_pt, height_pt, depth_pt, self.do_finish, fontmap, singlecharmode, fillstyles)
         for t in trafos:
             box.reltransform(t) # TODO: should trafos really use reltransform???
                                 #       this is quite different from what we do elsewhere!!!
                                 #       see https://sourceforge.net/mailarchive/forum.php?thread_id=9137692&forum_id=23700
-        if self.texipc:
-            box.readdvipage(self.dvifile, self.page)
+        if page is None:
+            box.readdvipage(dvifile.DVIfile(None, debug=self.dvitype, data=dvidata), 1)
+        elif self.texipc:
+            self._readdvipage(box, page)
         else:
             self.needdvitextboxes.append(box)
         return box
 
+    def _readdvipage(self, box, page):
+        """Read a page of the DVI output into box and store it in the cache."""
+        box.readdvipage(self.dvifile, page)
+        if page in self.cachepages:
+            key, extent_pt = self.cachepages.pop(page)
+            self.cache.put(key, extent_pt, self.dvifile.pagedata([ord("P"), ord("y"), ord("X"), 1, 0, 0, 0, 0, 0, 0]))
+
+    def cachesetup(self):
+        """Describe the engine setup for the :class:`TypesetCache`.
+
+        :returns: all parameters of the engine affecting the typesetting result
+        :rtype: list of str
+
+        """
+        return [version.version, self.__class__.__name__, " ".join(self.cmd), self.texenc] + [expr for expr, texmessages in self.preambles]
+
+    def _cachekey(self, expr):
+        if self.cacheprefix is None:
+            self.cacheprefix = self.cache.key(*self.cachesetup())
+        return self.cache.key(self.cacheprefix, expr)
+
     def text(self, x, y, *args, **kwargs):
         """Typeset text.
 
@@ -1330,6 +1824,19 @@ class SingleEngine:
         """
         return self.text_pt(unit.topt(x), unit.topt(y), *args, **kwargs)
 
+    def text_batch(self, items, *args, **kwargs):
+        """Typeset several texts at once.
+
+        This method is identical to :meth:`text_batch_pt` with the only
+        difference of using PyX lengths to position the output.
+
+        :param items: texts to be typeset
+        :type items: list of tuples ``(x, y, expr)`` or
+            ``(x, y, expr, textattrs)`` with PyX lengths *x* and *y*
+
+        """
+        return self.text_batch_pt([(unit.topt(item[0]), unit.topt(item[1])) + tuple(item[2:]) for item in items], *args, **kwargs)
+
 
 class SingleTexEngine(SingleEngine):
 
@@ -1357,6 +1864,9 @@ class SingleTexEngine(SingleEngine):
         self.lfs = lfs
         self.name = "TeX"
 
+    def cachesetup(self):
+        return super().cachesetup() + [str(self.lfs)]
+
     def go_typeset(self):
         assert self.state == STATE_PREAMBLE
         self.state = STATE_TYPESET
@@ -1369,6 +1879,8 @@ class SingleTexEngine(SingleEngine):
 
     def do_start(self):
         super().do_start()
+        if self.fmt is not None:
+            return
         if self.lfs:
             if not self.lfs.endswith(".lfs"):
                 self.lfs = "%s.lfs" % self.lfs
@@ -1418,6 +1930,9 @@ class SingleLatexEngine(SingleEngine):
         self.texmessages_begindoc = texmessages_begindoc
         self.name = "LaTeX"
 
+    def cachesetup(self):
+        return super().cachesetup() + [self.docclass, str(self.docopt), str(self.pyxgraphics)]
+
     def go_typeset(self):
         self._execute("\\begin{document}", self.texmessages_begindoc_default + self.texmessages_begindoc, STATE_PREAMBLE, STATE_TYPESET)
 
@@ -1429,6 +1944,8 @@ class SingleLatexEngine(SingleEngine):
 
     def do_start(self):
         super().do_start()
+        if self.fmt is not None:
+            return
         if self.pyxgraphics:
             with config.open("pyx.def", [config.format.pyx]) as source, open(os.path.join(self.tmpdir, "pyx.def"), "wb") as dest:
                 dest.write(source.read())
@@ -1490,6 +2007,16 @@ class MultiEngine:
         "resembles :meth:`SingleEngine.text`"
         return self.instance.text(*args, **kwargs)
 
+    @reset_for_tex_done
+    def text_batch_pt(self, *args, **kwargs):
+        "resembles :meth:`SingleEngine.text_batch_pt`"
+        return self.instance.text_batch_pt(*args, **kwargs)
+
+    @reset_for_tex_done
+    def text_batch(self, *args, **kwargs):
+        "resembles :meth:`SingleEngine.text_batch`"
+        return self.instance.text_batch(*args, **kwargs)
+
     def reset(self, reinit=False):
         """Start a new :class:`SingleEngine` instance
 
@@ -1532,9 +2059,121 @@ class LatexEngine(MultiEngine):
         super().__init__(SingleLatexEngine, *args, **kwargs)
 
 
+class PooledEngine:
+
+    def __init__(self, *, cls=SingleLatexEngine, size=None, **kwargs):
+        """A pool of restartable :class:`SingleEngine` instances
+
+        :param cls: the class being pooled
+        :type cls: :class:`SingleEngine` class
+        :param size: number of instances, defaults to the number of CPUs
+        :type size: int or None
+        :param dict kwargs: keyword args at class instantiation
+
+        All arguments must be passed as keyword arguments.
+
+        All instances execute the same preambles. Only :meth:`text_batch_pt`
+        typesets in parallel: it splits the texts into consecutive chunks
+        typeset by the instances concurrently. :meth:`text_pt` distributes the
+        texts among the instances in turn, but blocks until the text is
+        typeset, thus single texts are not typeset faster than by a
+        :class:`MultiEngine`. As the typesetting result of a text does not
+        depend on the instance typesetting it, the output is independent of
+        the pool size.
+
+        The instances are finished by :meth:`reset` and :meth:`finish`.
+
+        """
+        self.cls = cls
+        self.size = size or os.cpu_count() or 1
+        self.kwargs = kwargs
+        self.executor = concurrent.futures.ThreadPoolExecutor(self.size, thread_name_prefix="PyXPooledEngine")
+        self.instances = []
+        self.reset()
+
+    def _newinstance(self):
+        instance = self.cls(**self.kwargs)
+        for expr, texmessages in self.preambles:
+            instance.preamble(expr, texmessages)
+        return instance
+
+    def _text_pt(self, i, *args, **kwargs):
+        try:
+            return self.instances[i].text_pt(*args, **kwargs)
+        except TexDoneError:
+            self.instances[i] = self._newinstance()
+            return self.instances[i].text_pt(*args, **kwargs)
+
+    def _text_batch_pt(self, i, *args, **kwargs):
+        try:
+            return self.instances[i].text_batch_pt(*args, **kwargs)
+        except TexDoneError:
+            self.instances[i] = self._newinstance()
+            return self.instances[i].text_batch_pt(*args, **kwargs)
+
+    def preamble(self, expr, texmessages=[]):
+        "resembles :meth:`SingleEngine.preamble`"
+        self.preambles.append((expr, texmessages))
+        list(self.executor.map(lambda instance: instance.preamble(expr, texmessages), self.instances))
+
+    def text_pt(self, *args, **kwargs):
+        "resembles :meth:`SingleEngine.text_pt` (blocking, use :meth:`text_batch_pt` to typeset in parallel)"
+        i = self.next
+        self.next = (i + 1) % self.size
+        return self._text_pt(i, *args, **kwargs)
+
+    def text(self, x, y, *args, **kwargs):
+        "resembles :meth:`SingleEngine.text`"
+        return self.text_pt(unit.topt(x), unit.topt(y), *args, **kwargs)
+
+    def text_batch_pt(self, items, *args, **kwargs):
+        "resembles :meth:`SingleEngine.text_batch_pt`"
+        items = list(items)
+        if not items:
+            return []
+        chunksize = -(-len(items) // self.size)
+        chunks = [items[j:j+chunksize] for j in range(0, len(items), chunksize)]
+        results = self.executor.map(lambda i: self._text_batch_pt(i, chunks[i], *args, **kwargs), range(len(chunks)))
+        return [box for boxes in results for box in boxes]
+
+    def text_batch(self, items, *args, **kwargs):
+        "resembles :meth:`SingleEngine.text_batch`"
+        return self.text_batch_pt([(unit.topt(item[0]), unit.topt(item[1])) + tuple(item[2:]) for item in items], *args, **kwargs)
+
+    def reset(self, reinit=False):
+        """Finish the instances and start new :class:`SingleEngine` instances
+
+        :param bool reinit: replay :meth:`preamble` calls on the new instances
+
+        """
+        if not reinit:
+            self.preambles = []
+        self._finishinstances()
+        self.labelcache = None
+        self.instances = list(self.executor.map(lambda i: self._newinstance(), range(self.size)))
+        self.next = 0
+
+    def _finishinstances(self):
+        def finish(instance):
+            if STATE_START < instance.state < STATE_DONE:
+                instance.do_finish()
+        list(self.executor.map(finish, self.instances))
+
+    def finish(self):
+        """Finish all instances and shut down the thread pool
+
+        The engine cannot be used afterwards. The text boxes created by the
+        instances remain valid.
+
+        """
+        self._finishinstances()
+        self.executor.shutdown()
+
+
 from pyx import deco
 from pyx.font import T1font
 from pyx.font.t1file import T1File
+from pyx.font.fontcache import fontcache
 from pyx.font.afmfile import AFMfile
 from pyx.font.pfmfile import PFMfile
 
@@ -1669,7 +2308,7 @@ class unicodetextbox_pt(textbox_pt):
         return self.font.minusthickness_pt*self.size
 
     def transform(self, *trafos, keep_anchor=False):
-        box.rect.transform(self, *trafos, keep_anchor=keep_anchor)
+        textbox_pt.transform(self, *trafos, keep_anchor=keep_anchor)
         for trafo in trafos:
             self.texttrafo = trafo * self.texttrafo
 
@@ -1677,7 +2316,7 @@ class unicodetextbox_pt(textbox_pt):
         return self.canvas.bbox().transformed(self.texttrafo)
 
     def textpath(self):
-        r = path.path()
+        r = normpath.normpath()
         for item in self.canvas.items:
             if isinstance(item, canvas.canvas):
                 for subitem in item.items:
@@ -1721,7 +2360,7 @@ class UnicodeEngine:
 
     def __init__(self, fontname="cmr10", size=10, font_metric_type=FontMetricType.afm):
         with config.open(fontname, [config.format.type1]) as f:
-            t1file = T1File.from_PF_bytes(f.read())
+            t1file = fontcache.get("type1", f, lambda: T1File.from_PF_bytes(f.read()))
         if font_metric_type == FontMetricType.afm:
             with config.open(fontname, [config.format.afm], ascii=True) as f:
                 metric_file = AFMfile(f)
@@ -1759,6 +2398,12 @@ class UnicodeEngine:
     def text(self, x, y, *args, **kwargs):
         return self.text_pt(unit.topt(x), unit.topt(y), *args, **kwargs)
 
+    def text_batch_pt(self, items, texmessages=[], fontmap=None, singlecharmode=False):
+        return [self.text_pt(*item, texmessages=texmessages, fontmap=fontmap, singlecharmode=singlecharmode) for item in items]
+
+    def text_batch(self, items, *args, **kwargs):
+        return self.text_batch_pt([(unit.topt(item[0]), unit.topt(item[1])) + tuple(item[2:]) for item in items], *args, **kwargs)
+
 
 # from pyx.font.otffile import OpenTypeFont
 # 
@@ -20,6 +20,14 @@
 # along with PyX; if not, write to the Free Software
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
 
+import base64, binascii
+try:
+    import numpy
+    hasnumpy = True
+except ImportError:
+    hasnumpy = False
+
+
 class writer:
 
     def __init__(self, file, encoding="ascii", errors="surrogateescape"):
@@ -41,3 +49,61 @@ class writer:
 
     def __exit__(self, exc_type, exc_value, traceback):
         return self.file.__exit__(exc_type, exc_value, traceback)
+
+
+# ASCII85 and ASCIIHex encoding of binary data in PostScript streams
+#
+# The data is encoded in large chunks. The number of lines written
+# for a given length of the data is returned by ascii85lines and
+# asciihexlines, respectively, as needed for DSC comments like
+# %%BeginData.
+
+_ascii85linelength = 60 # bytes encoded in a line of 75 characters
+_asciihexlinelength = 32 # bytes encoded in a line of 64 characters
+_chunklength = 3840 * 64 # bytes encoded at once (a multiple of the line lengths)
+
+def ascii85lines(datalen):
+    if datalen < 4:
+        return 1
+    return (datalen + 56) // 60
+
+def _ascii85encode(data):
+    # encodes data with a length being a multiple of 4 without "z" abbreviations
+    if hasnumpy:
+        words = numpy.frombuffer(data, dtype=">u4").astype(numpy.uint32)
+        encoded = numpy.empty((len(words), 5), dtype=numpy.uint8)
+        for i in range(4, -1, -1):
+            encoded[:, i] = words % 85 + 33
+            words //= 85
+        return encoded.tobytes()
+    return base64.a85encode(data).replace(b"z", b"!!!!!")
+
+def ascii85stream(file, data):
+    """Encodes the bytes data in ASCII85 and writes it to the
+    writer file. The number of lines written to the stream
+    is known just from the length of the data by means of the
+    ascii85lines function. Note that the tailing newline character
+    of the last line is not added by this function, but it is taken
+    into account in the ascii85lines function. The "z" abbreviation
+    for groups of zeros is not used (to keep the line lengths fixed)
+    and a final incomplete group is appended to the last line."""
+    data = memoryview(data).cast("B")
+    fulllen = len(data) - len(data) % 4
+    for start in range(0, fulllen, _chunklength):
+        if start:
+            file.write("\n")
+        encoded = _ascii85encode(data[start:min(start+_chunklength, fulllen)])
+        file.write_bytes(b"\n".join([encoded[i:i+75] for i in range(0, len(encoded), 75)]))
+    if fulllen != len(data):
+        file.write_bytes(base64.a85encode(data[fulllen:]))
+
+def asciihexlines(datalen):
+    return (datalen + _asciihexlinelength - 1) // _asciihexlinelength
+
+def asciihexstream(file, data):
+    """Encodes the bytes data in ASCIIHex and writes it to the writer file
+    in lines of 64 characters, each terminated by a newline character."""
+    data = memoryview(data).cast("B")
+    for start in range(0, len(data), _chunklength):
+        encoded = binascii.b2a_hex(data[start:start+_chunklength])
+        file.write_bytes(b"".join([encoded[i:i+64] + b"\n" for i in range(0, len(encoded), 64)]))
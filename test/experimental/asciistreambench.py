@@ -0,0 +1,41 @@
+#!/usr/bin/env python
+# throughput of the ASCII85 and ASCIIHex stream encoders of pyx.writer
+# compared to the former per-group ASCII85 encoder
+import sys; sys.path.insert(0, "../..")
+
+import io, os, struct, timeit
+from pyx import writer
+
+
+def referenceascii85stream(file, data):
+    # the per-group encoder formerly used in pyx.bitmap
+    i = 3
+    l = [None, None, None, None]
+    for i in range(len(data)):
+        l[i%4] = data[i]
+        if i%4 == 3:
+            if i%60 == 3 and i != 3:
+                file.write("\n")
+            l[3], c5 = divmod(256*256*l[0]+256*256*l[1]+256*l[2]+l[3], 85)
+            l[2], c4 = divmod(256*256*3*l[0]+l[3], 85)
+            l[1], c3 = divmod(l[2], 85)
+            c1  , c2 = divmod(l[1], 85)
+            file.write_bytes(struct.pack("BBBBB", c1+33, c2+33, c3+33, c4+33, c5+33))
+    if i%4 != 3:
+        for j in range((i%4) + 1, 4):
+            l[j] = 0
+        l[3], c5 = divmod(256*256*l[0]+256*256*l[1]+256*l[2]+l[3], 85)
+        l[2], c4 = divmod(256*256*3*l[0]+l[3], 85)
+        l[1], c3 = divmod(l[2], 85)
+        c1  , c2 = divmod(l[1], 85)
+        file.write_bytes(struct.pack("BBBB", c1+33, c2+33, c3+33, c4+33)[:(i%4)+2])
+
+def bench(name, stream, data, number=3):
+    seconds = min(timeit.repeat(lambda: stream(writer.writer(io.BytesIO()), data), number=1, repeat=number))
+    print("%-24s %10.1f MB/s" % (name, len(data)/seconds/1e6))
+
+data = os.urandom(1000000)
+bench("reference ascii85", referenceascii85stream, data)
+data = os.urandom(60000000) # a 20 megapixel RGB image
+bench("ascii85stream", writer.ascii85stream, data)
+bench("asciihexstream", writer.asciihexstream, data)
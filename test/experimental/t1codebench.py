@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+# compares the timings of the Type 1 eexec/charstring codecs:
+# - the original per-byte loop (as a reference)
+# - the pure Python and the numpy path of pyx.font.t1code
+# - the C extension pyx.font._t1code (when it is built)
+import sys; sys.path.insert(0, "../..")
+
+import os, timeit
+from pyx.font import t1code
+
+try:
+    from pyx.font import _t1code
+except ImportError:
+    _t1code = None
+
+
+def referencedecoder(code, r, n):
+    plain = []
+    for x in code:
+        plain.append(x ^ (r >> 8))
+        r = ((x + r) * 52845 + 22719) & 0xffff
+    return bytes(plain[n:])
+
+def purepythondecoder(code, r, n):
+    hasnumpy = t1code.hasnumpy
+    t1code.hasnumpy = False
+    try:
+        return t1code.decoder(code, r, n)
+    finally:
+        t1code.hasnumpy = hasnumpy
+
+def bench(name, f, *args, number=5):
+    print("%-24s %8.2f ms" % (name, 1000*min(timeit.repeat(lambda: f(*args), number=1, repeat=number))))
+
+for size in [1000, 100000, 1000000]:
+    code = os.urandom(size)
+    print("decoding %i bytes:" % size)
+    bench("reference", referencedecoder, code, 55665, 4)
+    bench("t1code (pure Python)", purepythondecoder, code, 55665, 4)
+    if t1code.hasnumpy:
+        bench("t1code (numpy)", t1code._numpydecoder, code, 55665, 4)
+    if _t1code is not None:
+        bench("_t1code", _t1code.decoder, code, 55665, 4)
+    print("encoding %i bytes:" % size)
+    bench("t1code", t1code.encoder, code, 55665, b"PyX!")
+    if _t1code is not None:
+        bench("_t1code", _t1code.encoder, code, 55665, b"PyX!")
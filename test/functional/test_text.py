@@ -111,6 +111,10 @@ sc.stroke(p, [deco.curvedtext(r"\PyX{} is fun!", textattrs=[trafo.mirror(), traf
               deco.curvedtext(r"r{\color[rgb]{1,0,0}igh}t", textattrs=[text.halign.right, text.vshift.mathaxis, trafo.mirror(), trafo.scale(1.2)], arclenfromend=0.5, exclude=0.1)])
 c.insert(sc, [trafo.translate(12, 12)])
 
+# batch typesetting
+for t in text.defaulttextengine.text_batch([(0, 14, r"batch"), (1.5, 14, r"test", [color.rgb.blue]), (2.5, 14, r"$x^2$", [text.halign.center])]):
+    c.insert(t)
+
 # UnicodeEngine output with afm and pfm
 ue_afm = text.UnicodeEngine()
 c.insert(ue_afm.text(10, 9, "UnicodeEngine output (AFM)"))
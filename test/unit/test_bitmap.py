@@ -0,0 +1,146 @@
+import sys
+if sys.path[0] != "../..":
+    sys.path.insert(0, "../..")
+
+import unittest
+
+import io, random, struct, zlib
+from pyx import bitmap, canvas
+
+
+def png(width, height, colortype, rows, chunks=()):
+    def chunk(name, data):
+        return struct.pack("!I", len(data)) + name + data + struct.pack("!I", zlib.crc32(name + data))
+    return (b"\x89PNG\r\n\x1a\n" +
+            chunk(b"IHDR", struct.pack("!2I5B", width, height, 8, colortype, 0, 0, 0)) +
+            b"".join(chunk(name, data) for name, data in chunks) +
+            chunk(b"IDAT", zlib.compress(b"".join(rows))) +
+            chunk(b"IEND", b""))
+
+
+class BitmapTestCase(unittest.TestCase):
+
+    def testSelectBands(self):
+        self.assertEqual(bitmap.selectbands(b"rgbaRGBA", 4, [3, 0, 1, 2]), b"argbARGB")
+        self.assertEqual(bitmap.selectbands(b"rgbaRGBA", 4, range(3)), b"rgbRGB")
+        self.assertEqual(bitmap.selectbands(b"", 2, [1]), b"")
+
+    def testAlpha(self):
+        rgba = bitmap.image(2, 1, "RGBA", b"rgbaRGBA")
+        b = bitmap.bitmap_pt(0, 0, rgba, 1, compressmode=None)
+        mode, data, alpha, palettemode, palettedata, imagehash = b.imagedata(True)
+        self.assertEqual((mode, data, alpha), ("RGB", b"argbARGB", True))
+        mode, data, alpha, palettemode, palettedata, imagehash = b.imagedata(False)
+        self.assertEqual((mode, data, alpha), ("RGB", b"rgbRGB", b"aA"))
+
+        argb = bitmap.image(2, 1, "ARGB", b"argbARGB")
+        b = bitmap.bitmap_pt(0, 0, argb, 1, compressmode=None)
+        self.assertEqual(b.imagedata(True)[:3], ("RGB", b"argbARGB", True))
+        self.assertEqual(b.imagedata(False)[:3], ("RGB", b"rgbRGB", b"aA"))
+
+    def testCache(self):
+        im = bitmap.image(2, 1, "RGBA", b"rgbaRGBA")
+        b1 = bitmap.bitmap_pt(0, 0, im, 1)
+        b2 = bitmap.bitmap_pt(1, 1, im, 1)
+        self.assertIs(b1.imagedata(False), b2.imagedata(False))
+        self.assertEqual(zlib.decompress(b1.imagedata(False)[1]), b"rgbRGB")
+        self.assertIsNot(b1.imagedata(False), b1.imagedata(True))
+        self.assertIsNot(b1.imagedata(False), bitmap.bitmap_pt(0, 0, im, 1, flatecompresslevel=9).imagedata(False))
+
+        # modifications of the image invalidate the cache entries
+        encoded = b1.imagedata(False)
+        im.data = b"RGBArgba"
+        self.assertIsNot(b1.imagedata(False), encoded)
+        self.assertEqual(zlib.decompress(b1.imagedata(False)[1]), b"RGBrgb")
+
+        # the cache entries are removed with the image
+        self.assertIn(id(im), bitmap._encodedimagecache.entries)
+        imid = id(im)
+        del im, b1, b2
+        self.assertNotIn(imid, bitmap._encodedimagecache.entries)
+
+    def testPNGUnfilter(self):
+        self.assertEqual(bitmap.pngunfilter(b"\0\1\2\2\2\2\1\1\1\1\1\1\3\0\0\0\4\1\0\0", 3, 5, 1),
+                         b"\1\2\2\3\3\3\1\2\3\0\1\2\1\1\2")
+        self.assertEqual(bitmap.pngunfilter(b"\0\1\2\3\4\4\1\1\1\1", 2, 2, 2), b"\1\2\3\4\2\3\4\5")
+        self.assertRaises(ValueError, bitmap.pngunfilter, b"\5\0", 1, 1, 1)
+
+    def testPNGUnfilterRows(self):
+        def reference(data, width, height, bpp):
+            # unfilter byte by byte as described in the PNG specification
+            rowlength = width*bpp
+            result = []
+            prior = [0]*rowlength
+            for y in range(height):
+                filtertype, row = data[y*(rowlength+1)], list(data[y*(rowlength+1)+1:(y+1)*(rowlength+1)])
+                for i in range(rowlength):
+                    a = row[i-bpp] if i >= bpp else 0
+                    b = prior[i]
+                    c = prior[i-bpp] if i >= bpp else 0
+                    p = a + b - c
+                    paeth = min([(abs(p-a), 0, a), (abs(p-b), 1, b), (abs(p-c), 2, c)])[2]
+                    row[i] = (row[i] + [0, a, b, (a+b)//2, paeth][filtertype]) % 256
+                result.extend(row)
+                prior = row
+            return bytes(result)
+        rnd = random.Random(0)
+        for bpp in [1, 2, 4]:
+            for filtertypes in [[0, 1, 2, 3, 4], [4, 2, 1, 1, 3], [2, 4, 4, 3, 0]]:
+                data = b"".join(bytes([filtertype] + [rnd.randrange(256) for i in range(7*bpp)]) for filtertype in filtertypes)
+                self.assertEqual(bitmap.pngunfilter(data, 7, 5, bpp), reference(data, 7, 5, bpp))
+
+    def testPNGNoIHDR(self):
+        data = png(1, 1, 0, [b"\0\0"])
+        data = data[:8] + data[33:]
+        self.assertRaises(ValueError, bitmap.pngimage, io.BytesIO(data))
+
+    def testPNGPassThrough(self):
+        rows = [b"\0rgbRGB", b"\2\0\0\0\0\0\0"]
+        im = bitmap.pngimage(io.BytesIO(png(2, 2, 2, rows, [(b"pHYs", struct.pack("!2IB", 3937, 3937, 1))])))
+        self.assertEqual((im.size, im.mode, im.compressed), ((2, 2), "RGB", "Flate"))
+        self.assertEqual(zlib.decompress(im.data), b"".join(rows))
+        self.assertAlmostEqual(im.info["dpi"][0], 100, 1)
+        b = bitmap.bitmap_pt(0, 0, im, 1)
+        self.assertEqual(b.compressmode, None)
+        self.assertIs(b.imagedata(False)[1], im.data)
+
+        c = canvas.canvas()
+        c.insert(b)
+        pdf = io.BytesIO()
+        c.writePDFfile(pdf)
+        self.assertIn(b"/Filter /FlateDecode\n/DecodeParms << /Predictor 15 /Colors 3 /BitsPerComponent 8 /Columns 2 >>\n", pdf.getvalue())
+        self.assertIn(im.data, pdf.getvalue())
+        self.assertNotIn(b"/SMask", pdf.getvalue())
+        ps = io.BytesIO()
+        c.writeEPSfile(ps)
+        self.assertIn(b"<< /Predictor 15 /Colors 3 /BitsPerComponent 8 /Columns 2 >> /FlateDecode filter", ps.getvalue())
+        svg = io.BytesIO()
+        c.writeSVGfile(svg)
+        self.assertIn(b"data:image/png;base64,", svg.getvalue())
+
+    def testFlateSVG(self):
+        im = bitmap.image(2, 1, "RGB", zlib.compress(b"rgbRGB"), compressed="Flate")
+        b = bitmap.bitmap_pt(0, 0, im, 1)
+        c = canvas.canvas()
+        c.insert(b)
+        pdf = io.BytesIO()
+        c.writePDFfile(pdf)
+        self.assertIn(im.data, pdf.getvalue())
+        self.assertRaises(ValueError, c.writeSVGfile, io.BytesIO())
+
+    def testPNGPalette(self):
+        im = bitmap.pngimage(io.BytesIO(png(2, 1, 3, [b"\0\0\1"], [(b"PLTE", b"\0\0\0\377\377\377")])))
+        self.assertEqual((im.mode, im.compressed), ("P", "Flate"))
+        self.assertEqual(im.palette.getdata(), ("RGB", b"\0\0\0\377\377\377"))
+        self.assertEqual(im.decodeparms["Colors"], 1)
+
+    def testPNGAlpha(self):
+        im = bitmap.pngimage(io.BytesIO(png(2, 1, 6, [b"\1rgbaRGBA"])))
+        self.assertEqual((im.mode, im.compressed), ("RGBA", None))
+        self.assertEqual(im.data, bitmap.pngunfilter(b"\1rgbaRGBA", 2, 1, 4))
+        b = bitmap.bitmap_pt(0, 0, im, 1, compressmode=None)
+        self.assertEqual(b.imagedata(False)[2], im.data[3::4])
+
+
+if __name__ == "__main__":
+    unittest.main()
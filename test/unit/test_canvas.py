@@ -0,0 +1,115 @@
+import sys
+if sys.path[0] != "../..":
+    sys.path.insert(0, "../..")
+
+import unittest
+
+from pyx import baseclasses, bbox, canvas, path, trafo
+
+
+class movableitem(baseclasses.modifiablecanvasitem):
+
+    def __init__(self, x_pt, y_pt):
+        self.x_pt = x_pt
+        self.y_pt = y_pt
+
+    def move_pt(self, x_pt, y_pt):
+        self.x_pt = x_pt
+        self.y_pt = y_pt
+        self.modified()
+
+    def bbox(self):
+        return bbox.bbox_pt(self.x_pt, self.y_pt, self.x_pt+1, self.y_pt+1)
+
+
+class CanvasBboxTestCase(unittest.TestCase):
+
+    def assertBbox(self, bb, expected):
+        self.assertEqual(bb.highrestuple_pt(), expected)
+
+    def testInsert(self):
+        c = canvas.canvas()
+        self.assertFalse(c.bbox())
+        c.stroke(path.line_pt(0, 0, 10, 10))
+        self.assertBbox(c.bbox(), (0, 0, 10, 10))
+        c.stroke(path.line_pt(-5, 0, 5, 20))
+        self.assertBbox(c.bbox(), (-5, 0, 10, 20))
+        c.bbox().enlarge_pt(100)
+        self.assertBbox(c.bbox(), (-5, 0, 10, 20))
+
+    def testTrafoAndClip(self):
+        c = canvas.canvas([trafo.translate_pt(1, 2)])
+        c.stroke(path.line_pt(0, 0, 10, 10))
+        self.assertBbox(c.bbox(), (1, 2, 11, 12))
+        c = canvas.canvas([canvas.clip(path.rect_pt(0, 0, 5, 5))])
+        c.stroke(path.line_pt(0, 0, 10, 10))
+        self.assertBbox(c.bbox(), (0, 0, 5, 5))
+
+    def testNested(self):
+        c = canvas.canvas()
+        sc = c.insert(canvas.canvas([trafo.translate_pt(10, 0)]))
+        l = c.layer("top")
+        self.assertFalse(c.bbox())
+        sc.stroke(path.line_pt(0, 0, 1, 1))
+        self.assertBbox(c.bbox(), (10, 0, 11, 1))
+        l.stroke(path.line_pt(0, 0, 1, -1))
+        self.assertBbox(c.bbox(), (0, -1, 11, 1))
+        sc.clear()
+        self.assertBbox(c.bbox(), (0, -1, 1, 0))
+        c.clear()
+        self.assertFalse(c.bbox())
+
+    def testModified(self):
+        c = canvas.canvas()
+        sc = c.insert(canvas.canvas())
+        item = sc.insert(movableitem(0, 0))
+        c.insert(movableitem(5, 5))
+        self.assertBbox(c.bbox(), (0, 0, 6, 6))
+        item.move_pt(10, 10)
+        self.assertBbox(sc.bbox(), (10, 10, 11, 11))
+        self.assertBbox(c.bbox(), (5, 5, 11, 11))
+        item.move_pt(-1, -1)
+        self.assertBbox(c.bbox(), (-1, -1, 6, 6))
+
+    def testModifiedPath(self):
+        c = canvas.canvas()
+        p = path.line_pt(0, 0, 1, 1)
+        c.stroke(p)
+        self.assertBbox(c.bbox(), (0, 0, 1, 1))
+        p.append(path.lineto_pt(50, 50))
+        self.assertBbox(c.bbox(), (0, 0, 50, 50))
+
+    def testModifiedNestedPath(self):
+        c = canvas.canvas()
+        sc = canvas.canvas()
+        p = path.line_pt(0, 0, 1, 1)
+        sc.stroke(p)
+        c.insert(sc)
+        self.assertBbox(c.bbox(), (0, 0, 1, 1))
+        self.assertEqual((c.volatileitems, sc.volatileitems), ([], []))
+        p.append(path.lineto_pt(50, 50))
+        self.assertBbox(sc.bbox(), (0, 0, 50, 50))
+        self.assertBbox(c.bbox(), (0, 0, 50, 50))
+        p.pathitems.pop()
+        p.modified()
+        self.assertBbox(c.bbox(), (0, 0, 1, 1))
+
+    def testModifiedNestedNormpath(self):
+        c = canvas.canvas()
+        sc = canvas.canvas()
+        np = path.line_pt(0, 0, 1, 1).normpath()
+        sc.stroke(np)
+        c.insert(sc)
+        self.assertBbox(c.bbox(), (0, 0, 1, 1))
+        self.assertEqual(c.volatileitems, [sc])
+        np.append(path.lineto_pt(50, 50))
+        self.assertBbox(c.bbox(), (0, 0, 50, 50))
+
+    def testParents(self):
+        item = movableitem(0, 0)
+        for i in range(10):
+            canvas.canvas().insert(item)
+        self.assertEqual(len(item._parents), 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+import sys
+if sys.path[0] != "../..":
+    sys.path.insert(0, "../..")
+
+import unittest
+
+import atexit, os, stat, tempfile
+from pyx import config
+
+
+fakekpsewhich = """#!/bin/sh
+echo "$@" >> %(dir)s/calls
+if [ "$1" = "--all" ]; then
+    echo %(dir)s/ls-R
+    exit
+fi
+extension=$2
+shift 2
+for name in "$@"; do
+    if [ -f %(dir)s/texmf/$name.$extension ]; then
+        echo %(dir)s/texmf/$name.$extension
+    elif [ -f %(dir)s/texmf/$name.alias ]; then
+        cat %(dir)s/texmf/$name.alias
+    fi
+done
+"""
+
+
+class KpsewhichTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.dir = self.tmpdir.name
+        os.mkdir(os.path.join(self.dir, "texmf"))
+        for name in ["a.tfm", "c.tfm", "c.vf", "x.tfm"]:
+            with open(os.path.join(self.dir, "texmf", name), "w") as f:
+                f.write(name)
+        os.mkdir(os.path.join(self.dir, "texmf", "sub"))
+        with open(os.path.join(self.dir, "texmf", "sub", "d.tfm"), "w") as f:
+            f.write("d.tfm")
+        with open(os.path.join(self.dir, "texmf", "e.alias"), "w") as f:
+            f.write(os.path.join(self.dir, "texmf", "x.tfm") + "\n")
+        with open(os.path.join(self.dir, "ls-R"), "w") as f:
+            f.write("% ls-R\n")
+        self.kpsewhichfilename = os.path.join(self.dir, "kpsewhich")
+        with open(self.kpsewhichfilename, "w") as f:
+            f.write(fakekpsewhich % {"dir": self.dir})
+        os.chmod(self.kpsewhichfilename, stat.S_IRWXU)
+
+        self.locators = []
+
+    def tearDown(self):
+        for locator in self.locators:
+            atexit.unregister(locator.writecache)
+        self.tmpdir.cleanup()
+
+    def locator(self):
+        locator = config.kpsewhich()
+        locator.kpsewhich = self.kpsewhichfilename
+        locator.cachefilename = os.path.join(self.dir, "cache")
+        self.locators.append(locator)
+        return locator
+
+    def calls(self):
+        try:
+            with open(os.path.join(self.dir, "calls")) as f:
+                calls = f.read().splitlines()
+        except IOError:
+            return []
+        os.unlink(os.path.join(self.dir, "calls"))
+        return calls
+
+    def read(self, locator, filename, formats):
+        openers = locator.openers(filename, formats)
+        if not openers:
+            return None
+        with openers[0]() as f:
+            return f.read()
+
+    def testKpsewhich(self):
+        locator = self.locator()
+        locator.prefetch(["a", "b", "c"], [config.format.vf, config.format.tfm])
+        self.assertEqual(self.calls(), ["--format vf a b c", "--format tfm a b"])
+        self.assertEqual(self.read(locator, "a", [config.format.vf, config.format.tfm]), b"a.tfm")
+        self.assertEqual(self.read(locator, "b", [config.format.vf, config.format.tfm]), None)
+        self.assertEqual(self.read(locator, "c", [config.format.vf, config.format.tfm]), b"c.vf")
+        self.assertEqual(self.read(locator, "c", [config.format.tfm]), b"c.tfm")
+        self.assertEqual(self.calls(), ["--format tfm c"])
+        locator.writecache()
+        self.assertEqual(self.calls(), ["--all --format ls-R ls-R"])
+
+        # the cache file is used by another locator (for the files found)
+        locator = self.locator()
+        self.assertEqual(self.read(locator, "a", [config.format.vf, config.format.tfm]), b"a.tfm")
+        self.assertEqual(self.calls(), ["--format vf a"])
+        self.assertEqual(self.read(locator, "b", [config.format.vf, config.format.tfm]), None)
+        self.assertEqual(self.calls(), ["--format vf b", "--format tfm b"])
+
+        # outdated locations are located again
+        os.unlink(os.path.join(self.dir, "texmf", "a.tfm"))
+        self.assertEqual(self.read(locator, "a", [config.format.vf, config.format.tfm]), None)
+        self.assertEqual(self.calls(), ["--format tfm a"])
+
+        # the cache file is not used after a modification of the ls-R database
+        with open(os.path.join(self.dir, "ls-R"), "a") as f:
+            f.write("./texmf:\n")
+        locator = self.locator()
+        self.assertEqual(self.read(locator, "c", [config.format.tfm]), b"c.tfm")
+        self.assertEqual(self.calls(), ["--format tfm c"])
+
+    def testUnmatched(self):
+        locator = self.locator()
+        locator.prefetch(["sub/d", "e", "a"], [config.format.tfm])
+        self.assertEqual(self.calls(), ["--format tfm sub/d e a", "--format tfm e", "--format tfm a"])
+        self.assertEqual(self.read(locator, "sub/d", [config.format.tfm]), b"d.tfm")
+        self.assertEqual(self.read(locator, "e", [config.format.tfm]), b"x.tfm")
+        self.assertEqual(self.read(locator, "a", [config.format.tfm]), b"a.tfm")
+        self.assertEqual(self.calls(), [])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,7 +4,7 @@ if sys.path[0] != "../..":
 
 import unittest
 
-import io
+import io, os, shutil, tempfile
 from pyx.graph import data
 
 class DataTestCase(unittest.TestCase):
@@ -56,7 +56,7 @@ class DataTestCase(unittest.TestCase):
 2 "2"
 3 x"x""")
         mydata = data.file(testfile, row=0, a="a", b=2)
-        self.assertEqual(mydata.columns["row"], [1, 2, 3, 4])
+        self.assertEqual(list(mydata.columns["row"]), [1, 2, 3, 4])
         self.assertAlmostEqual(mydata.columns["a"][0], 0.0)
         self.assertAlmostEqual(mydata.columns["a"][1], 1.0)
         self.assertAlmostEqual(mydata.columns["a"][2], 2.0)
@@ -77,9 +77,95 @@ class DataTestCase(unittest.TestCase):
 8
 9""")
         mydata = data.file(testfile, title="title", skiphead=3, skiptail=2, every=2, row=0)
-        self.assertEqual(mydata.columns["row"], [4, 6, 8])
+        self.assertEqual(list(mydata.columns["row"]), [4, 6, 8])
         self.assertEqual(mydata.title, "title")
 
+    def testFileChunks(self):
+        lines = ["# a b c"]
+        for i in range(50):
+            if i % 7 == 3:
+                lines.append("")
+            if i % 11 == 5:
+                lines.append("%d x" % i)
+            elif i % 13 == 6:
+                lines.append("%d %d %d %d" % (i, i, i, i))
+            else:
+                lines.append("%d %g" % (i, 0.5*i))
+        testfile = "\n".join(lines)
+        for skiphead, skiptail, every in [(0, 0, 1), (3, 2, 1), (4, 5, 3), (45, 0, 1), (0, 40, 2)]:
+            for chunksize in [1, 4, 1000]:
+                rows = [line.split() for line in lines[1:] if line]
+                rows = [[i+1] + row for i, row in enumerate(rows)][skiphead::every]
+                if skiptail >= every:
+                    del rows[-(skiptail//every):]
+                data.file.chunksize = chunksize
+                try:
+                    mydata = data.file(io.StringIO(testfile), skiphead=skiphead, skiptail=skiptail, every=every, row=0, a="a", b="b", c="c")
+                finally:
+                    del data.file.chunksize
+                for name, i in [("row", 0), ("a", 1), ("b", 2), ("c", 3)]:
+                    expected = []
+                    for row in rows:
+                        try:
+                            expected.append(float(row[i]))
+                        except ValueError:
+                            expected.append(row[i])
+                        except IndexError:
+                            expected.append(None)
+                    self.assertEqual(list(mydata.columns[name]), expected)
+
+    def testFileCache(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(tmpdir, "test.dat")
+            with open(filename, "w") as f:
+                f.write("# x y\n1 2\n3 x\n")
+            cache = data._filecache(maxentries=2, sidecardir=os.path.join(tmpdir, "sidecar"))
+            reads = []
+            def read():
+                with open(filename) as f:
+                    reads.append(filename)
+                    return data.file(f).orgdata
+            mydata = cache.get(filename, "key", read, sidecar=True)
+            self.assertIs(cache.get(filename, "key", read, sidecar=True), mydata)
+            self.assertEqual(len(reads), 1)
+
+            # the sidecar file is used by a new cache
+            cache2 = data._filecache(sidecardir=os.path.join(tmpdir, "sidecar"))
+            mydata2 = cache2.get(filename, "key", read, sidecar=True)
+            self.assertEqual(len(reads), 1)
+            self.assertEqual(mydata2.title, "user provided file-like object")
+            self.assertEqual(sorted(mydata2.columns), ["x", "y"])
+            self.assertEqual(mydata2.columns["x"], mydata.columns["x"])
+            self.assertEqual(mydata2.columns["y"], [2.0, "x"])
+            self.assertEqual(list(mydata2.columndata[0]), [1, 2])
+
+            # a modification of the file invalidates the cache and the sidecar file
+            with open(filename, "w") as f:
+                f.write("# x y\n1 2\n3 4\n5 6\n")
+            mydata = cache.get(filename, "key", read, sidecar=True)
+            self.assertEqual(len(reads), 2)
+            self.assertEqual(list(mydata.columns["y"]), [2, 4, 6])
+            mydata2 = cache2.get(filename, "key", read, sidecar=True)
+            self.assertEqual(len(reads), 2)
+            self.assertEqual(mydata2.columns["y"], mydata.columns["y"])
+
+            # least recently used entries are removed
+            cache.get(filename, "key2", read)
+            cache.get(filename, "key", read)
+            cache.get(filename, "key3", read)
+            self.assertEqual(len(cache), 2)
+            self.assertEqual(len(reads), 4)
+            cache.get(filename, "key", read)
+            self.assertEqual(len(reads), 4)
+            cache.get(filename, "key2", read)
+            self.assertEqual(len(reads), 5)
+            cache.maxsize = 0
+            cache.get(filename, "key4", read)
+            self.assertEqual(len(cache), 1)
+        finally:
+            shutil.rmtree(tmpdir)
+
     def testSec(self):
         testfile = io.StringIO("""[sec1]
 opt1=a1
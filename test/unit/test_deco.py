@@ -4,6 +4,8 @@ if sys.path[0] != "../..":
 
 import unittest
 
+import math
+
 from pyx import *
 from pyx.deco import *
 
@@ -71,6 +73,33 @@ class DecoTestCase(unittest.TestCase):
         self.assertAlmostEqual(d.nostrokeranges[0][0], 0.05)
         self.assertAlmostEqual(d.nostrokeranges[0][1], 0.65)
 
+    def hatchlines(self, p, hatch):
+        d = decoratedpath(p)
+        d.ensurenormpath()
+        c = hatch._decocanvas(hatch.angle, d, None)
+        self.assertEqual(len(c.items), 1)
+        return [[round(x, 5) for x in nsp.atbegin_pt() + nsp.atend_pt()] for nsp in c.items[0].path.normpath().normsubpaths]
+
+    def testLinehatched(self):
+        hatch = linehatched(5*unit.t_pt, 0)
+        # a square with a hole (the inner square runs in opposite direction)
+        p = path.rect_pt(0, 0, 20, 20) + path.rect_pt(15, 5, -10, 10)
+        x0 = 10 - 10*math.sqrt(2) - 5
+        x = [round(x0 + i*5, 5) for i in range(2, 6)]
+        self.assertEqual(self.hatchlines(p, hatch),
+                         [[x[0], 0, x[0], 20],
+                          [x[1], 0, x[1], 5], [x[1], 15, x[1], 20],
+                          [x[2], 0, x[2], 5], [x[2], 15, x[2], 20],
+                          [x[3], 0, x[3], 20]])
+        # both squares in the same direction
+        p = path.rect_pt(0, 0, 20, 20) + path.rect_pt(5, 5, 10, 10)
+        self.assertEqual(len(self.hatchlines(p, hatch)), 4)
+
+        for x0, y0, x1, y1 in self.hatchlines(path.circle_pt(1, 2, 10), hatch(angle=30)):
+            self.assertAlmostEqual(math.hypot(x0-1, y0-2), 10, 4)
+            self.assertAlmostEqual(math.hypot(x1-1, y1-2), 10, 4)
+            self.assertAlmostEqual(math.atan2(y1-y0, x1-x0), math.radians(120), 4)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,38 @@
+import sys
+if sys.path[0] != "../..":
+    sys.path.insert(0, "../..")
+
+import unittest
+
+import io, os
+from pyx import canvas, color, document, path
+
+
+class DocumentTestCase(unittest.TestCase):
+
+    def PDF(self, **kwargs):
+        d = document.document()
+        for i in range(20):
+            c = canvas.canvas()
+            for j in range(200):
+                c.stroke(path.line(i, j, i+j, 0), [color.gray(j/200)])
+            d.append(document.page(c))
+        f = io.BytesIO()
+        sourcedateepoch = os.environ.get("SOURCE_DATE_EPOCH")
+        os.environ["SOURCE_DATE_EPOCH"] = "0"
+        try:
+            d.writePDFfile(f, **kwargs)
+        finally:
+            if sourcedateepoch is None:
+                del os.environ["SOURCE_DATE_EPOCH"]
+            else:
+                os.environ["SOURCE_DATE_EPOCH"] = sourcedateepoch
+        return f.getvalue()
+
+    def testPDFworkers(self):
+        self.assertEqual(self.PDF(workers=4), self.PDF())
+        self.assertEqual(self.PDF(workers=4, compress=False), self.PDF(compress=False))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,11 +2,21 @@ import sys
 if sys.path[0] != "../..":
     sys.path.insert(0, "../..")
 
-import io, os, re, unittest
+import io, os, re, struct, tempfile, unittest
+from unittest import mock
 
 from pyx.dvi import dvifile
 
 
+dvipre = struct.pack(">BBLLLB", 247, 2, 25400000, 473628672, 1000, 0)
+
+def dvipage(count, height, width):
+    return (struct.pack(">B10Ll", 139, count, 0, 0, 0, 0, 0, 0, 0, 0, 0, -1) +
+            struct.pack(">BBll", 141, 132, height, width) + # push, setrule
+            struct.pack(">BBll", 142, 137, width, height) + # pop, putrule
+            bytes([140])) # eop
+
+
 class DvifileTestCase(unittest.TestCase):
 
     def dvitypetester(self, advifile):
@@ -75,6 +85,66 @@ class DvifileTestCase(unittest.TestCase):
         self.dvitypetester("bigscale.dvi")
         os.system("rm bigscale.*")
 
+    def testPagedata(self):
+        data = (dvipre + dvipage(1, 100000, 200000) + dvipage(2, 300000, 400000) + bytes([248]))
+        df = dvifile.DVIfile(None, data=data)
+        df.readpage([1, 0, 0, 0, 0, 0, 0, 0, 0, 0])
+        c2 = df.readpage([2, 0, 0, 0, 0, 0, 0, 0, 0, 0])
+        pagedata = df.pagedata([5, 0, 0, 0, 0, 0, 0, 0, 0, 0])
+        self.assertEqual(df.readpage(), None)
+        c5 = dvifile.DVIfile(None, data=pagedata).readpage([5, 0, 0, 0, 0, 0, 0, 0, 0, 0])
+        self.assertEqual(len(c5.items), 2)
+        for item2, item5 in zip(c2.items, c5.items):
+            self.assertEqual(str(item2.path), str(item5.path))
+
+    def testGrowingFile(self):
+        # in texipc mode the DVI file is read while TeX appends further pages
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = os.path.join(tmpdir, "texput.dvi")
+            with open(filename, "wb") as f:
+                f.write(dvipre + dvipage(1, 100000, 200000))
+            df = dvifile.DVIfile(filename)
+            self.assertEqual(len(df.readpage([1, 0, 0, 0, 0, 0, 0, 0, 0, 0]).items), 2)
+            with open(filename, "ab") as f:
+                f.write(dvipage(2, 300000, 400000))
+            self.assertEqual(len(df.readpage([2, 0, 0, 0, 0, 0, 0, 0, 0, 0]).items), 2)
+            with open(filename, "ab") as f:
+                f.write(bytes([248]))
+            self.assertEqual(df.readpage(), None)
+
+    def testCharRuns(self):
+        class font:
+            name = "test"
+            widths = [1000*charcode for charcode in range(100)]
+            def getwidth_dvi(self, charcode):
+                return self.widths[charcode]
+            def getwidths_dvi(self):
+                return self.widths + [None]*156
+            def text_pt(self, x_pt, y_pt, charcodes, fontmap=None):
+                return x_pt, y_pt, charcodes
+        class canvas(list):
+            def __init__(self, attrs):
+                pass
+            insert = list.append
+        data = (struct.pack(">BBLLLB", 247, 2, 25400000, 473628672, 1000, 0) +
+                struct.pack(">B10Ll", 139, 1, 0, 0, 0, 0, 0, 0, 0, 0, 0, -1) +
+                bytes([171, 1, 2, 3, 138, 4, 5, 143, 100, 6, 128, 7, 140, 248]))
+        def read(singlecharmode):
+            df = dvifile.DVIfile(None, data=data)
+            df.fonts[0] = font()
+            with mock.patch.object(dvifile.canvas, "canvas", canvas):
+                return df.readpage(singlecharmode=singlecharmode)
+        conv = 25400000/473628672*72/254000
+        self.assertEqual([(round(x_pt/conv), charcodes) for x_pt, y_pt, charcodes in read(False)],
+                         [(0, [1, 2, 3, 4, 5]), (15100, [6, 7])])
+        self.assertEqual([(round(x_pt/conv), charcodes) for x_pt, y_pt, charcodes in read(True)],
+                         [(0, [1]), (1000, [2]), (3000, [3]), (6000, [4]), (10000, [5]),
+                          (15100, [6]), (21100, [7])])
+
+        # invalid characters raise an error
+        data = data.replace(bytes([4, 5]), bytes([4, 105]))
+        self.assertRaises(IndexError, read, False)
+
 
 if __name__ == "__main__":
     unittest.main()
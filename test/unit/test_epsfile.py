@@ -0,0 +1,136 @@
+import sys
+if sys.path[0] != "../..":
+    sys.path.insert(0, "../..")
+
+import unittest
+
+import io, os, tempfile
+from pyx import bbox, canvas, color, document, epsfile, path, style
+
+
+eps = b"""%!PS-Adobe-3.0 EPSF-3.0
+%%BoundingBox: 10 20 30 40
+%%EndComments
+10 20 moveto 30 40 lineto stroke
+%%EOF
+"""
+
+
+class EpsfileTestCase(unittest.TestCase):
+
+    def PDF(self, c):
+        f = io.BytesIO()
+        c.writePDFfile(f, write_compress=False)
+        return f.getvalue()
+
+    def testPDFreader(self):
+        c = canvas.canvas()
+        c.fill(path.rect(0, 0, 1, 1), [color.rgb.red, color.transparency(0.5)])
+        c.stroke(path.line(0, 0, 1, 1), [style.linewidth.THICK])
+        reader = epsfile.PDFreader(self.PDF(c))
+        page = reader.page()
+        self.assertEqual(reader.inheritedpageattribute(page, b"/Type"), b"/Page")
+        self.assertEqual(len(reader.inheritedpageattribute(page, b"/MediaBox")), 4)
+        resources = reader.inheritedpageattribute(page, b"/Resources")
+        self.assertIn(b"/ExtGState", resources)
+        self.assertEqual(len(reader.references(resources)), 1)
+        content, filters = reader.content(page)
+        self.assertEqual(filters, {})
+        self.assertIn(b"re", content)
+
+    def testSerialize(self):
+        obj = b"1 0 obj\n<< /A [1 2 0 R (a\\)b) <00ff> /N] /B 3 0 R >>\nendobj\n"
+        reader = epsfile.PDFreader(obj +
+                                   b"xref\n0 2\n0000000000 65535 f \n0000000000 00000 n \ntrailer\n<< /Size 2 >>\n"
+                                   b"startxref\n%i\n%%%%EOF\n" % len(obj))
+        value = reader.getobject(1)
+        self.assertEqual(epsfile.PDFserialize(value, lambda num: num + 10),
+                         b"<<\n/A [1 12 0 R (a\\)b) <00ff> /N]\n/B 13 0 R\n>>")
+
+    def testPSforms(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            epsfilename = os.path.join(tmpdir, "test.eps")
+            with open(epsfilename, "wb") as f:
+                f.write(eps)
+            d = document.document()
+            for i in range(3):
+                c = canvas.canvas()
+                c.insert(epsfile.epsfile(i, 0, epsfilename))
+                c.insert(epsfile.epsfile(0, i, epsfilename, scale=2))
+                d.append(document.page(c))
+            f = io.BytesIO()
+            d.writePSfile(f)
+            self.assertEqual(f.getvalue().count(b"30 40 lineto"), 6)
+            f = io.BytesIO()
+            d.writePSfile(f, epsfileforms=True)
+            ps = f.getvalue()
+            self.assertEqual(ps.count(b"30 40 lineto"), 1)
+            self.assertEqual(ps.count(b" execform"), 6)
+            self.assertEqual(ps.count(b"/FormType 1 /BBox [10 20 30 40]"), 1)
+
+    def testPDFcache(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            epsfilename = os.path.join(tmpdir, "test.eps")
+            with open(epsfilename, "wb") as f:
+                f.write(eps)
+            c = canvas.canvas()
+            c.insert(epsfile.epsfile(0, 0, epsfilename))
+            c.insert(epsfile.epsfile(1, 1, epsfilename, scale=2))
+
+            # provide the conversion result in the cache directory, as
+            # Ghostscript might not be available
+            form = canvas.canvas()
+            form.stroke(path.line_pt(0, 0, 20, 20))
+            cache = epsfile.PDFepsfilecache(cachedir=tmpdir, gs="nonexistentgs")
+            key = c.items[0].filekey() + (c.items[0].mybbox.highrestuple_pt(),)
+            with open(os.path.join(tmpdir, "%s.pdf" % epsfile.formname(key)), "wb") as f:
+                f.write(self.PDF(form))
+
+            pdfepsfilecache = epsfile.pdfepsfilecache
+            epsfile.pdfepsfilecache = cache
+            try:
+                # the shared form gets different object numbers in another document
+                first = canvas.canvas()
+                first.stroke(path.line(0, 0, 1, 1))
+                d = document.document([document.page(first), document.page(c)])
+                f = io.BytesIO()
+                d.writePDFfile(f, compress=False)
+                pdf = self.PDF(c)
+            finally:
+                epsfile.pdfepsfilecache = pdfepsfilecache
+            self.assertFalse(hasattr(cache.get(c.items[0].filekey(), None, c.items[0].mybbox), "refno"))
+            reader = epsfile.PDFreader(f.getvalue())
+            resources = reader.inheritedpageattribute(reader.page(1), b"/Resources")
+            form = reader.resolve(reader.resolve(resources[b"/XObject"])[b"/" + epsfile.formname(key).encode("ascii")])
+            self.assertIn(b"20.000000 20.000000 l", form.data)
+            self.assertEqual(pdf.count(b"/Subtype /Form"), 1)
+            self.assertEqual(pdf.count(b"/%s Do" % epsfile.formname(key).encode("ascii")), 2)
+            reader = epsfile.PDFreader(pdf)
+            resources = reader.inheritedpageattribute(reader.page(), b"/Resources")
+            form = reader.resolve(reader.resolve(resources[b"/XObject"])[b"/" + epsfile.formname(key).encode("ascii")])
+            self.assertEqual(form.dict[b"/Subtype"], b"/Form")
+            self.assertIn(b"20.000000 20.000000 l", form.data)
+
+    def testPDFcacheSize(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            form = canvas.canvas()
+            form.stroke(path.line_pt(0, 0, 20, 20))
+            pdfdata = self.PDF(form)
+            epsbbox = bbox.bbox_pt(10, 20, 30, 40)
+            keys = [("test%i.eps" % i,) for i in range(3)]
+            for key in keys:
+                with open(os.path.join(tmpdir, "%s.pdf" % epsfile.formname(key + (epsbbox.highrestuple_pt(),))), "wb") as f:
+                    f.write(pdfdata)
+            cache = epsfile.PDFepsfilecache(cachedir=tmpdir, gs="nonexistentgs", maxsize=2*len(pdfdata))
+            form = cache.get(keys[0], None, epsbbox)
+            cache.get(keys[1], None, epsbbox)
+            self.assertIs(cache.get(keys[0], None, epsbbox), form)
+            cache.get(keys[2], None, epsbbox)
+            self.assertEqual([key[:1] for key in cache.entries], [keys[0], keys[2]])
+            self.assertEqual(cache.size, 2*len(pdfdata))
+            cache.clear()
+            self.assertEqual((len(cache.entries), cache.size), (0, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import sys
+if sys.path[0] != "../..":
+    sys.path.insert(0, "../..")
+
+import unittest
+
+import io, os, tempfile
+from pyx.dvi import encfile
+from pyx.font import fontcache
+
+
+enc = "/TestEncoding [\n%s\n] def\n" % "\n".join("/g%i" % i for i in range(256))
+
+
+class FontCacheTestCase(unittest.TestCase):
+
+    def get(self, cache, filename):
+        def parse():
+            self.parsed += 1
+            return encfile.ENCfile(f.read().decode("ascii"))
+        with open(filename, "rb") as f:
+            return cache.get("enc", f, parse)
+
+    def testFontCache(self):
+        self.parsed = 0
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filenames = [os.path.join(tmpdir, "test%i.enc" % i) for i in range(3)]
+            for filename in filenames:
+                with open(filename, "w") as f:
+                    f.write(enc)
+            size = len(enc)
+            cache = fontcache.FontCache(maxsize=2*size, cachedir=os.path.join(tmpdir, "cache"))
+            ef = self.get(cache, filenames[0])
+            self.assertEqual(ef.name, "/TestEncoding")
+            self.assertEqual(ef.vector[255], "g255")
+            self.assertIs(self.get(cache, filenames[0]), ef)
+            self.assertEqual(self.parsed, 1)
+
+            # bytes streams cannot be cached
+            self.assertEqual(cache.get("enc", io.BytesIO(enc.encode("ascii")), lambda: 42), 42)
+
+            # size limitation
+            self.get(cache, filenames[1])
+            self.get(cache, filenames[2])
+            self.assertEqual(len(cache.entries), 2)
+            self.assertEqual(cache.size, 2*size)
+            self.assertEqual(self.parsed, 3)
+
+            # the pickled fonts are used by other caches
+            cache = fontcache.FontCache(cachedir=os.path.join(tmpdir, "cache"))
+            ef = self.get(cache, filenames[0])
+            self.assertEqual(ef.vector[0], "g0")
+            self.assertEqual(self.parsed, 3)
+
+            # modified files are parsed again
+            with open(filenames[0], "w") as f:
+                f.write(enc.replace("/g0\n", "/x\n"))
+            cache.clear()
+            self.assertEqual(self.get(cache, filenames[0]).vector[0], "x")
+            self.assertEqual(self.parsed, 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
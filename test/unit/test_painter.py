@@ -0,0 +1,107 @@
+import sys
+if sys.path[0] != "../..":
+    sys.path.insert(0, "../..")
+
+import unittest
+
+from pyx import canvas, color, path, text, trafo
+from pyx.graph.axis import painter
+
+
+class engine:
+
+    def __init__(self, copyable=True):
+        self.copyable = copyable
+        self.typeset = []
+        self.state = text.STATE_START
+
+    def text_pt(self, x_pt, y_pt, expr, textattrs=[]):
+        self.typeset.append((x_pt, y_pt, expr, textattrs))
+        if not self.copyable:
+            return None
+        box = text.textextbox_pt(x_pt, y_pt, 1, 2, 3, 4, None, None, False, [])
+        box._dvicanvas = canvas.canvas()
+        box._dvicanvas.markers = {}
+        box._dvicanvas.stroke(path.line_pt(0, 0, 1, 0))
+        return box
+
+
+class LabelCacheTestCase(unittest.TestCase):
+
+    def testLabelCache(self):
+        cache = painter.labelcache()
+        e = engine()
+        box1 = cache.text_pt(e, 10, 20, "$2$", [text.halign.center, color.rgb.red])
+        box2 = cache.text_pt(e, 30, 40, "$2$", [text.halign.center, trafo.rotate(90)])
+        self.assertEqual(e.typeset, [(0, 0, "$2$", [text.halign.center])])
+        self.assertEqual(box1.bbox().highrestuple_pt(), (9, 16, 12, 23))
+        self.assertEqual([round(x, 10) for x in box2.bbox().highrestuple_pt()], [27, 39, 34, 42])
+        self.assertEqual(box1.fillstyles, [color.rgb.red])
+        self.assertIs(box1.dvicanvas.items[0], box2.dvicanvas.items[0])
+
+        cache.text_pt(e, 0, 0, "$4$", [text.halign.center])
+        cache.text_pt(e, 0, 0, "$2$", [text.halign.left])
+        self.assertEqual(len(e.typeset), 3)
+
+    def testAttrValues(self):
+        cache = painter.labelcache()
+        e = engine()
+        cache.text_pt(e, 0, 0, "$2$", [text.size(2)])
+        cache.text_pt(e, 0, 0, "$2$", [text.size(2)])
+        cache.text_pt(e, 0, 0, "$2$", [text.size(3)])
+        self.assertEqual(len(e.typeset), 2)
+
+    def testEngineCache(self):
+        e = engine()
+        painter.labeltext_pt(e, 0, 0, "$2$", [])
+        painter.labeltext_pt(e, 0, 0, "$2$", [])
+        self.assertEqual(len(e.typeset), 1)
+        self.assertEqual(len(e.labelcache.entries), 1)
+        painter.labeltext_pt(engine(), 0, 0, "$2$", [])
+        self.assertEqual(len(e.typeset), 1)
+
+    def testReset(self):
+        class multiengine:
+            def __init__(self):
+                self.instance = engine()
+            def text_pt(self, *args):
+                return self.instance.text_pt(*args)
+        e = multiengine()
+        oldinstance = e.instance
+        painter.labeltext_pt(e, 0, 0, "$2$", [])
+        painter.labeltext_pt(e, 0, 0, "$2$", [])
+        self.assertEqual(len(oldinstance.typeset), 1)
+        self.assertEqual(len(oldinstance.labelcache.entries), 1)
+        # a reset starts a new instance, which might use other preambles
+        e.instance = engine()
+        painter.labeltext_pt(e, 0, 0, "$2$", [])
+        self.assertEqual(len(oldinstance.typeset), 1)
+        self.assertEqual(len(e.instance.typeset), 1)
+        self.assertFalse(hasattr(e, "labelcache"))
+
+    def testPooledEngineReset(self):
+        pooled = text.PooledEngine(cls=engine, size=1)
+        painter.labeltext_pt(pooled, 0, 0, "$2$", [])
+        self.assertEqual(len(pooled.labelcache.entries), 1)
+        pooled.reset()
+        self.assertIsNone(pooled.labelcache)
+        pooled.finish()
+
+    def testMaxEntries(self):
+        cache = painter.labelcache(maxentries=2)
+        e = engine()
+        for label in ["$1$", "$2$", "$1$", "$3$", "$1$", "$2$"]:
+            cache.text_pt(e, 0, 0, label, [])
+        self.assertEqual([expr for x_pt, y_pt, expr, textattrs in e.typeset], ["$1$", "$2$", "$3$", "$2$"])
+        self.assertEqual(len(cache.entries), 2)
+
+    def testNotCopyable(self):
+        cache = painter.labelcache()
+        e = engine(copyable=False)
+        cache.text_pt(e, 10, 20, "$2$", [])
+        cache.text_pt(e, 10, 20, "$2$", [])
+        self.assertEqual(e.typeset, [(0, 0, "$2$", []), (10, 20, "$2$", []), (10, 20, "$2$", [])])
+
+
+if __name__ == "__main__":
+    unittest.main()
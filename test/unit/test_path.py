@@ -6,8 +6,8 @@ import unittest
 
 from pyx import *
 from pyx.path import *
-from pyx.normpath import normpathparam
-import math
+from pyx.normpath import normpathparam, normsubpathitemarray
+import io, math
 set(epsilon=1e-7)
 
 class NormpathTestCase(unittest.TestCase):
@@ -378,6 +378,82 @@ class NormpathTestCase(unittest.TestCase):
         self.assertAlmostEqual(intersect[0][2], 2.9)
         self.assertAlmostEqual(intersect[0][3], 3.5)
 
+    def testintersectnormsubpathmany(self):
+        p1 = normsubpath([normline_pt(i, (-1)**i, i+1, -(-1)**i) for i in range(400)])
+        p2 = normsubpath([normline_pt(-1, 0, 401, 0)])
+        p3 = normsubpath([normcurve_pt(i, 0, i+0.25, 1, i+0.75, -1, i+1, 0) for i in range(400)])
+        intersect = p1.intersect(p2)
+        self.assertEqual(len(intersect[0]), 400)
+        for i, (a, b) in enumerate(zip(*intersect)):
+            self.assertAlmostEqual(a, i+0.5)
+            self.assertAlmostEqual(b, (i+1.5)/402)
+        intersect = p3.intersect(p2)
+        self.assertEqual(len(intersect[0]), 801)
+        for i, (a, b) in enumerate(zip(*intersect)):
+            self.assertAlmostEqual(a, 0.5*i)
+            self.assertAlmostEqual(b, (0.5*i+1)/402)
+
+    def testpacked(self):
+        items = [normline_pt(i, math.sin(i), i+1, math.sin(i+1)) for i in range(50)]
+        items.append(normcurve_pt(50, math.sin(50), 51, 2, 52, 3, 53, 4))
+        items.append(normline_pt(53, 4, 54, 5))
+        for closed in [0, 1]:
+            nsp = normsubpath(items, closed=closed)
+            pnsp = packednormsubpath(items, closed=closed)
+            self.assertTrue(isinstance(pnsp.normsubpathitems, normsubpathitemarray))
+            self.assertEqual(str(pnsp), str(nsp))
+            self.assertEqual(str(nsp.packed()), str(nsp))
+            self.assertEqual(str(pnsp.copy()), str(nsp))
+            self.assertEqual(str(pnsp.reversed()), str(nsp.reversed()))
+            self.assertEqual(pnsp.arclen_pt(), nsp.arclen_pt())
+            self.assertEqual(pnsp.bbox().highrestuple_pt(), nsp.bbox().highrestuple_pt())
+            self.assertEqual(pnsp.at_pt([0.5, 50.5]), nsp.at_pt([0.5, 50.5]))
+            for t in [trafo.rotate(30), trafo.scale(1e-7)]:
+                self.assertEqual(str(pnsp.transformed(t)), str(nsp.transformed(t)))
+            for method in ["outputPS", "outputPDF"]:
+                file1, file2 = io.StringIO(), io.StringIO()
+                getattr(nsp, method)(file1, None)
+                getattr(pnsp, method)(file2, None)
+                self.assertEqual(file1.getvalue(), file2.getvalue())
+
+        pnsp = packednormsubpath(items[:50])
+        self.assertEqual(str(pnsp.transformed(trafo.rotate(30))), str(normsubpath(items[:50]).transformed(trafo.rotate(30))))
+        self.assertEqual(pnsp.bbox().highrestuple_pt(), normsubpath(items[:50]).bbox().highrestuple_pt())
+
+        array = normsubpathitemarray(items)
+        self.assertEqual(len(array), 52)
+        self.assertEqual(str(array[-2]), str(items[-2]))
+        self.assertEqual(list(map(str, array[48:51])), list(map(str, items[48:51])))
+        self.assertEqual(list(map(str, array[::10])), list(map(str, items[::10])))
+        array[-1] = normline_pt(53, 4, 55, 5)
+        array[0] = normcurve_pt(0, 0, 0, 1, 1, 1, 1, math.sin(1))
+        self.assertEqual(str(array.pop()), str(normline_pt(53, 4, 55, 5)))
+        self.assertEqual(str(array[0]), str(normcurve_pt(0, 0, 0, 1, 1, 1, 1, math.sin(1))))
+        self.assertEqual(list(map(str, array[1:])), list(map(str, items[1:-1])))
+        self.assertRaises(IndexError, array.__getitem__, 51)
+
+        # replacing items in the middle, keeping or changing their kind
+        items = items[:-1]
+        array = normsubpathitemarray(items)
+        for i, item in [(10, normline_pt(10, 0, 11, 1)),
+                        (20, normcurve_pt(20, 0, 20, 1, 21, 1, 21, 0)),
+                        (20, normline_pt(20, 0, 21, 0)),
+                        (30, normcurve_pt(30, 0, 30, 1, 31, 1, 31, 0)),
+                        (30, normcurve_pt(30, 1, 30, 2, 31, 2, 31, 1))]:
+            array[i] = item
+            items[i] = item
+            self.assertEqual(list(map(str, array)), list(map(str, items)))
+        self.assertRaises(IndexError, array.__setitem__, len(items), items[0])
+
+    def testpackedpath(self):
+        points = [(i, math.sin(i)) for i in range(1, 2000)]
+        p = path(moveto_pt(0, 0), multilineto_pt(points), closepath())
+        np = p.normpath()
+        self.assertTrue(isinstance(np[0], packednormsubpath))
+        self.assertEqual(len(np[0]), 2000)
+        self.assertTrue(np[0].closed)
+        self.assertEqual(str(np), str(path(moveto_pt(0, 0), *[lineto_pt(*point) for point in points] + [closepath()]).normpath()))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,67 @@
+import sys
+if sys.path[0] != "../..":
+    sys.path.insert(0, "../..")
+
+import unittest
+
+import io, math
+from pyx import canvas, graph
+
+
+class line(graph.style.line):
+
+    def drawpoint(self, privatedata, sharedata, graph, point):
+        super().drawpoint(privatedata, sharedata, graph, point)
+
+
+class PlotitemTestCase(unittest.TestCase):
+
+    def testConvertColumn(self):
+        for axis in [graph.axis.linear(min=-1, max=3), graph.axis.linear(min=-1, max=3, reverse=1),
+                     graph.axis.log(min=0.1, max=10), graph.axis.log(min=0.1, max=10, reverse=1)]:
+            anchoredaxis = graph.axis.anchoredaxis(axis, None, "test")
+            anchoredaxis.setcreatecall(lambda: None)
+            values = [-2, 0.5, 1, "2", 4, None, "x"]
+            expected = []
+            for value in values:
+                try:
+                    expected.append(anchoredaxis.convert(value))
+                except (ValueError, TypeError):
+                    expected.append(None)
+            self.assertEqual(anchoredaxis.convertcolumn(values), expected)
+            self.assertEqual(anchoredaxis.convertcolumn(values[1:5]), expected[1:5])
+
+    def PS(self, drawcolumns):
+        g = graph.graphxy(width=8, x=graph.axis.linear(min=0, max=10, painter=None), y=graph.axis.log(min=0.1, max=10, painter=None), key=None)
+        xs = [i*0.01 - 1 for i in range(1200)]
+        ys = [math.exp(3*math.sin(3*x)) if i % 97 else None for i, x in enumerate(xs)]
+        plotitems = [g.plot(graph.data.values(x=xs, y=ys), [graph.style.line(), graph.style.symbol(size=0.05)]),
+                     g.plot(graph.data.points([[0, 1], [5, 20], [11, 5]], x=1, y=2), [line()])]
+        self.assertEqual([plotitem.drawcolumnsavailable() for plotitem in plotitems], [True, False])
+        if not drawcolumns:
+            plotitems[0].drawcolumnsavailable = lambda: False
+        g.finish()
+        c = canvas.canvas()
+        c.insert(g)
+        f = io.BytesIO()
+        c.writeEPSfile(f)
+        return [line for line in f.getvalue().split(b"\n")[3:] if not line.startswith(b"%%CreationDate:")]
+
+    def testDrawColumns(self):
+        self.assertEqual(self.PS(True), self.PS(False))
+
+    def testSymbolStamp(self):
+        eps = []
+        for stamp in [False, True]:
+            g = graph.graphxy(width=8, x=graph.axis.linear(min=0, max=10, painter=None), y=graph.axis.linear(min=0, max=10, painter=None), key=None)
+            g.plot(graph.data.values(x=list(range(10)), y=list(range(10))), [graph.style.symbol(graph.style.symbol.circle, stamp=stamp)])
+            f = io.BytesIO()
+            g.writeEPSfile(f)
+            eps.append(f.getvalue())
+        self.assertEqual([e.count(b"%%BeginResource: stamp") for e in eps], [0, 1])
+        self.assertEqual([e.count(b"arc\n") for e in eps], [10, 1])
+        self.assertEqual(eps[0].split(b"\n")[1:3], eps[1].split(b"\n")[1:3]) # bounding boxes
+
+
+if __name__ == "__main__":
+    unittest.main()
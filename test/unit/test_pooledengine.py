@@ -0,0 +1,116 @@
+import sys
+if sys.path[0] != "../..":
+    sys.path.insert(0, "../..")
+
+import shutil, struct, tempfile, unittest
+
+from pyx import canvas, text
+
+
+def dvidata(width):
+    return (struct.pack(">BBLLLB", 247, 2, 25400000, 473628672, 1000, 0) +
+            struct.pack(">B10Ll", 139, 80, 121, 88, 1, 0, 0, 0, 0, 0, 0, -1) +
+            struct.pack(">Bll", 132, 100000, width) + # setrule
+            bytes([140, 248])) # eop, post
+
+
+class DummyEngine:
+
+    def __init__(self, log):
+        self.log = log
+        self.preambles = []
+        self.done = False
+        self.state = text.STATE_START
+
+    def preamble(self, expr, texmessages=[]):
+        self.preambles.append(expr)
+
+    def text_pt(self, x_pt, y_pt, expr, *args, **kwargs):
+        if self.done:
+            raise text.TexDoneError
+        self.log.append(self)
+        self.state = text.STATE_TYPESET
+        return (x_pt, y_pt, expr, tuple(self.preambles))
+
+    def do_finish(self):
+        self.state = text.STATE_DONE
+
+    def text_batch_pt(self, items, *args, **kwargs):
+        return [self.text_pt(*item) for item in items]
+
+
+class PooledEngineTestCase(unittest.TestCase):
+
+    def testTextPt(self):
+        log = []
+        engine = text.PooledEngine(cls=DummyEngine, size=3, log=log)
+        engine.preamble("a")
+        self.assertEqual([instance.preambles for instance in engine.instances], [["a"], ["a"], ["a"]])
+        self.assertEqual([engine.text_pt(i, 0, "x") for i in range(4)], [(i, 0, "x", ("a",)) for i in range(4)])
+        self.assertEqual([engine.instances.index(instance) for instance in log], [0, 1, 2, 0])
+
+    def testTextBatchPt(self):
+        for size in range(1, 5):
+            log = []
+            engine = text.PooledEngine(cls=DummyEngine, size=size, log=log)
+            engine.preamble("a")
+            items = [(i, 0, "x") for i in range(7)]
+            self.assertEqual(engine.text_batch_pt(items), [item + (("a",),) for item in items])
+            self.assertEqual(len(set(log)), min(size, 7))
+        self.assertEqual(engine.text_batch_pt([]), [])
+
+    def testRestart(self):
+        engine = text.PooledEngine(cls=DummyEngine, size=2, log=[])
+        engine.preamble("a")
+        engine.instances[1].done = True
+        engine.text_pt(0, 0, "x")
+        self.assertEqual(engine.text_pt(0, 0, "x"), (0, 0, "x", ("a",)))
+        self.assertFalse(engine.instances[1].done)
+
+    def testArgs(self):
+        self.assertRaises(TypeError, text.PooledEngine, DummyEngine, 2, [])
+
+    def testFinish(self):
+        engine = text.PooledEngine(cls=DummyEngine, size=2, log=[])
+        instances = engine.instances
+        engine.text_pt(0, 0, "x")
+        engine.reset()
+        self.assertEqual([instance.state for instance in instances], [text.STATE_DONE, text.STATE_START])
+        engine.text_pt(0, 0, "x")
+        instances = engine.instances
+        engine.finish()
+        self.assertEqual([instance.state for instance in instances], [text.STATE_DONE, text.STATE_START])
+        self.assertRaises(RuntimeError, engine.text_batch_pt, [(0, 0, "x")])
+
+
+class PooledDVITestCase(unittest.TestCase):
+
+    # the texts are taken from a typeset cache, thus the boxes are created
+    # from dvi data by the pooled instances without running TeX
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def testTextBatchPt(self):
+        cache = text.TypesetCache(self.dir)
+        engine = text.PooledEngine(cls=text.SingleTexEngine, size=3, cache=cache)
+        engine.preamble(r"\def\foo{foo}")
+        for i in range(5):
+            cache.put(engine.instances[0]._cachekey(str(i)), [0, i + 1, 5, 0], dvidata(655360 * (i + 1)))
+        boxes = engine.text_batch_pt([(i, 0, str(i)) for i in range(5)])
+        self.assertEqual([instance.state for instance in engine.instances], [text.STATE_START] * 3)
+        c = canvas.canvas()
+        for i, box in enumerate(boxes):
+            self.assertAlmostEqual(box.bbox().llx_pt, i)
+            self.assertAlmostEqual(box.bbox().width_pt(), i + 1)
+            self.assertEqual(len(box.dvicanvas.items), 1)
+            c.insert(box)
+        self.assertAlmostEqual(c.bbox().urx_pt, 9)
+        self.assertAlmostEqual(engine.text_pt(0, 0, "4").bbox().width_pt(), 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import sys
+if sys.path[0] != "../..":
+    sys.path.insert(0, "../..")
+
+import unittest
+
+import io
+from pyx import canvas, color, deco, path, stamp
+
+
+class StampTestCase(unittest.TestCase):
+
+    def canvases(self):
+        positions_pt = [(0, 0), (10, 5), (-3, 20)]
+        symbol = canvas.canvas()
+        symbol.draw(path.circle_pt(0, 0, 2), [deco.stroked, deco.filled([color.rgb.red])])
+        stamped = canvas.canvas()
+        stamped.insert(stamp.stamp(symbol, positions_pt[:1])).place_pt(*positions_pt[1])
+        stamped.insert(stamp.stamp(symbol, positions_pt[2:]))
+        inline = canvas.canvas()
+        for x_pt, y_pt in positions_pt:
+            inline.draw(path.circle_pt(x_pt, y_pt, 2), [deco.stroked, deco.filled([color.rgb.red])])
+        return stamped, inline
+
+    def testBbox(self):
+        stamped, inline = self.canvases()
+        self.assertEqual(stamped.bbox().highrestuple_pt(), inline.bbox().highrestuple_pt())
+        self.assertFalse(stamp.stamp(canvas.canvas()).bbox())
+
+        # placements and modifications of the canvas after the insertion
+        symbol = canvas.canvas()
+        symbol.stroke(path.line_pt(-1, -1, 1, 1))
+        c = canvas.canvas()
+        s = c.insert(stamp.stamp(symbol, [(0, 0)]))
+        self.assertEqual(c.bbox().highrestuple_pt(), (-1, -1, 1, 1))
+        s.place_pt(100, 100)
+        self.assertEqual(c.bbox().highrestuple_pt(), (-1, -1, 101, 101))
+        symbol.stroke(path.line_pt(0, 0, 2, 2))
+        self.assertEqual(c.bbox().highrestuple_pt(), (-1, -1, 102, 102))
+
+    def output(self, c, method, **kwargs):
+        f = io.BytesIO()
+        getattr(c, method)(f, **kwargs)
+        return f.getvalue()
+
+    def testPS(self):
+        stamped, inline = self.canvases()
+        stampedeps = self.output(stamped, "writeEPSfile")
+        inlineeps = self.output(inline, "writeEPSfile")
+        self.assertEqual(stampedeps.split(b"\n")[1:3], inlineeps.split(b"\n")[1:3]) # bounding boxes
+        self.assertEqual(stampedeps.count(b"%%BeginResource: stamp"), 1)
+        self.assertEqual(stampedeps.count(b"arc\n"), 1)
+
+    def testPDF(self):
+        stamped, inline = self.canvases()
+        stampedpdf = self.output(stamped, "writePDFfile", write_compress=False)
+        self.assertEqual(stampedpdf.count(b"/Subtype /Form"), 1)
+        self.assertEqual(stampedpdf.count(b" Do Q\n"), 3)
+
+    def testSVG(self):
+        stamped, inline = self.canvases()
+        stampedsvg = self.output(stamped, "writeSVGfile")
+        inlinesvg = self.output(inline, "writeSVGfile")
+        self.assertEqual(stampedsvg.split(b"\n")[1].split(b"stroke-width")[0].split(b"viewBox")[1],
+                         inlinesvg.split(b"\n")[1].split(b"stroke-width")[0].split(b"viewBox")[1])
+        self.assertEqual(stampedsvg.count(b"<path"), 1)
+        self.assertEqual(stampedsvg.count(b"<use"), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
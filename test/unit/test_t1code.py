@@ -0,0 +1,39 @@
+import sys
+if sys.path[0] != "../..":
+    sys.path.insert(0, "../..")
+
+import unittest
+
+import random
+from pyx.font import t1code
+
+
+def referencedecoder(code, r, n):
+    plain = []
+    for x in code:
+        plain.append(x ^ (r >> 8))
+        r = ((x + r) * 52845 + 22719) & 0xffff
+    return bytes(plain[n:])
+
+
+class T1codeTestCase(unittest.TestCase):
+
+    def testCodec(self):
+        rng = random.Random(42)
+        for length in [0, 1, 4, 100, t1code.numpythreshold-1, t1code.numpythreshold, 12345]:
+            data = bytes(rng.randrange(256) for i in range(length))
+            code = t1code.encoder(data, 55665, b"PyX!")
+            self.assertEqual(len(code), length+4)
+            self.assertEqual(t1code.decoder(code, 55665, 4), data)
+            self.assertEqual(t1code.decoder(data, 4330, 4), referencedecoder(data, 4330, 4))
+
+    @unittest.skipUnless(t1code.hasnumpy, "numpy not available")
+    def testNumpyDecoder(self):
+        rng = random.Random(42)
+        for length in [1, 2, 3, 100, 4097]:
+            data = bytes(rng.randrange(256) for i in range(length))
+            self.assertEqual(t1code._numpydecoder(data, 55665, 4), referencedecoder(data, 55665, 4))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+import sys
+if sys.path[0] != "../..":
+    sys.path.insert(0, "../..")
+
+import unittest
+
+import io, tempfile
+from pyx import canvas
+from pyx.font import t1file
+from pyx.font.font import SVGglyphoutline, T1font
+from pyx.font.fontcache import fontcache
+
+
+def charstring(code):
+    return t1file.encoder(bytes(code), t1file.T1File.charstringr, b"PyX!")
+
+
+def makefont():
+    data1 = ("%!PS-AdobeFont-1.0: Test 001.000\n"
+             "/FontName /Test def\n"
+             "/FontMatrix [0.001 0 0 0.001 0 0] readonly def\n"
+             "/Encoding StandardEncoding def\n"
+             "currentfile eexec\n")
+    subr = charstring([11]) # return
+    notdef = charstring([139, 239, 13, 14]) # 0 100 hsbw endchar
+    glyph = charstring([139, 239, 13, 139, 10, 14]) # 0 100 hsbw 0 callsubr endchar
+    square = charstring([139, 239, 13, 149, 149, 21, 189, 139, 5, 139, 189, 5, 89, 139, 5, 9, 14]) # 0 100 hsbw 10 10 rmoveto 50 0 rlineto 0 50 rlineto -50 0 rlineto closepath endchar
+    data2 = (b"dup /Private 8 dict dup begin\n"
+             b"/Subrs 1 array\n"
+             b"dup 0 %i RD %s NP\n"
+             b"ND\n"
+             b"2 index /CharStrings 4 dict dup begin\n"
+             b"/.notdef %i RD %s ND\n"
+             b"/A %i RD %s ND\n"
+             b"/B %i RD %s ND\n"
+             b"/C %i RD %s ND\n"
+             b"end\nend\nmark currentfile closefile\n" % (len(subr), subr, len(notdef), notdef, len(glyph), glyph, len(glyph), glyph, len(square), square))
+    data3 = "0"*64 + "\ncleartomark\n"
+    return t1file.T1File(data1, t1file.encoder(data2, t1file.T1File.eexecr, b"PyX!"), data3)
+
+
+class T1fileTestCase(unittest.TestCase):
+
+    def testStrippedFont(self):
+        font = makefont()
+        glyphs = {"B"}
+        strippedfont = font.getstrippedfont(glyphs, [])
+        self.assertEqual(glyphs, {".notdef", "B"})
+        self.assertEqual(strippedfont.name, "Test")
+        strippedfont.getglyphcmds("B")
+        self.assertEqual(sorted(strippedfont.glyphs), [".notdef", "B"])
+        self.assertEqual(len(strippedfont.subrs), 1)
+
+        glyphs = {"B"}
+        self.assertIs(font.getstrippedfont(glyphs, []), strippedfont)
+        self.assertEqual(glyphs, {".notdef", "B"})
+        self.assertIsNot(font.getstrippedfont({"A"}, []), strippedfont)
+        self.assertIs(font.getstrippedfont({"B", ".notdef"}, []), font.getstrippedfont({".notdef", "B"}, []))
+
+        # a modification of the font invalidates the stripped fonts
+        font.setglyphcmds("B", font.getglyphcmds(".notdef"))
+        self.assertIsNot(font.getstrippedfont({"B"}, []), strippedfont)
+        newstrippedfont = font.getstrippedfont({"B"}, [])
+        newstrippedfont.getglyphcmds("B")
+        self.assertEqual(newstrippedfont.subrs, [])
+
+    def testStrippedFontCacheDir(self):
+        cachedir = fontcache.cachedir
+        with tempfile.TemporaryDirectory() as tmpdir:
+            fontcache.cachedir = tmpdir
+            try:
+                strippedfont = makefont().getstrippedfont({"A"}, [])
+                font = makefont()
+                font._getstrippedfont = None # must not be called
+                glyphs = {"A"}
+                self.assertEqual(font.getstrippedfont(glyphs, []).getdata2eexec(), strippedfont.getdata2eexec())
+                self.assertEqual(glyphs, {".notdef", "A"})
+            finally:
+                fontcache.cachedir = cachedir
+
+    def testGlyphOutline(self):
+        font = makefont()
+        outline, wx, wy = font.getglyphoutline("C")
+        self.assertIs(font.getglyphoutline("C")[0], outline)
+        self.assertEqual((wx, wy), (100, 0))
+        self.assertEqual(outline.bbox().highrestuple_pt(), (0, 0, 60, 60))
+        glyphpath = font.getglyphpath_pt(1, 2, "C", 10)
+        self.assertAlmostEqual(glyphpath.wx_pt, 1)
+        self.assertEqual([round(x, 10) for x in glyphpath.path.bbox().highrestuple_pt()], [1, 2, 1.6, 2.6])
+        self.assertEqual(font.getglyphinfo("C"), (100, 0, 0, 0, 60, 60))
+
+        # a modification of the font invalidates the outlines
+        font.setglyphcmds("C", font.getglyphcmds(".notdef"))
+        self.assertIsNot(font.getglyphoutline("C")[0], outline)
+
+    def testSVGglyphs(self):
+        c = canvas.canvas()
+        c.insert(T1font(makefont()).text_pt(0, 0, "CCC", 10))
+        svg = io.BytesIO()
+        c.writeSVGfile(svg)
+        self.assertEqual(svg.getvalue().count(b"<use "), 0)
+        svg = io.BytesIO()
+        c.writeSVGfile(svg, write_reuseglyphs=True)
+        svg = svg.getvalue().decode("ascii")
+        self.assertEqual(svg.count("<path "), 1)
+        self.assertEqual(svg.count("<use "), 3)
+        self.assertIn('transform="matrix(0.010000,-0.000000,-0.000000,0.010000,2.000000,-0.000000)"', svg)
+
+        # fonts of the same name but with different outlines have different ids
+        font1, font2 = makefont(), makefont()
+        font2.setglyphcmds("C", font2.getglyphcmds(".notdef"))
+        self.assertEqual(font1.name, font2.name)
+        self.assertNotEqual(SVGglyphoutline(font1, "C").svgid, SVGglyphoutline(font2, "C").svgid)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import sys
+if sys.path[0] != "../..":
+    sys.path.insert(0, "../..")
+
+import unittest
+
+from pyx import text
+
+
+class input:
+
+    def __init__(self):
+        self.written = []
+
+    def write(self, s):
+        self.written.append(s)
+
+    def flush(self):
+        pass
+
+
+class output:
+
+    def __init__(self, output):
+        self.output = output
+        self.expected = []
+
+    def expect(self, s):
+        self.expected.append(s)
+
+    def wait(self):
+        return True
+
+    def read(self):
+        return self.output
+
+
+def box(page, executeid, width):
+    return ("PyXBox:page=%i,lt=0.0pt,rt=%.1fpt,ht=7.0pt,dp=2.0pt:\n"
+            "[80.121.88.%i]\n"
+            "PyXInputMarker:executeid=%i:\n" % (page, width, page, executeid))
+
+
+class BatchTestCase(unittest.TestCase):
+
+    def engine(self, texoutput):
+        engine = text.SingleTexEngine()
+        engine.state = text.STATE_TYPESET
+        engine.page = 2
+        engine.executeid = 5
+        engine.texinput = input()
+        engine.texoutput = output(texoutput)
+        return engine
+
+    def testBatch(self):
+        engine = self.engine(box(3, 6, 10) + box(4, 7, 20) + box(5, 8, 30))
+        extents_pt = engine._execute_batch(["a", "b", "c"], [])
+        self.assertEqual([round(extent_pt[1]*72.27/72, 5) for extent_pt in extents_pt], [10, 20, 30])
+        # all expressions are written at once and waited for the last one only
+        self.assertEqual(len(engine.texinput.written), 1)
+        self.assertEqual(engine.texinput.written[0].count("\\ProcessPyXBox"), 3)
+        self.assertEqual(engine.texoutput.expected, ["PyXInputMarker:executeid=8:"])
+        self.assertEqual((engine.page, engine.executeid), (5, 8))
+
+    def testBatchError(self):
+        engine = self.engine(box(3, 6, 10) + "! Undefined control sequence.\n" + box(4, 7, 20) + box(5, 8, 30))
+        engine.errordetail = text.errordetail.default
+        with self.assertRaises(text.TexResultError) as cm:
+            engine._execute_batch(["a", "\\b", "c"], [])
+        # the error is attributed to the expression causing it
+        message = str(cm.exception)
+        self.assertIn("\\b", message)
+        self.assertIn("Undefined control sequence", message)
+        self.assertNotIn("ProcessPyXBox{a", message)
+        self.assertNotIn("ProcessPyXBox{c", message)
+
+    def testBatchMissingOutput(self):
+        engine = self.engine(box(3, 6, 10))
+        self.assertRaises(text.TexResultError, engine._execute_batch, ["a", "b"], [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,153 @@
+import sys
+if sys.path[0] != "../..":
+    sys.path.insert(0, "../..")
+
+import os, shutil, struct, tempfile, time, unittest
+from unittest import mock
+
+from pyx import text
+
+
+def dvidata(width):
+    return (struct.pack(">BBLLLB", 247, 2, 25400000, 473628672, 1000, 0) +
+            struct.pack(">B10Ll", 139, 80, 121, 88, 1, 0, 0, 0, 0, 0, 0, -1) +
+            struct.pack(">Bll", 132, 100000, width) + # setrule
+            bytes([140, 248])) # eop, post
+
+
+class TypesetCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def testGetPut(self):
+        cache = text.TypesetCache(self.dir)
+        key = cache.key("latex", "$x$")
+        self.assertNotEqual(key, cache.key("latex", "$y$"))
+        self.assertEqual(cache.get(key), None)
+        cache.put(key, [1, 2, 3, 4], b"dvi")
+        self.assertEqual(cache.get(key), ([1, 2, 3, 4], b"dvi"))
+        self.assertEqual(text.TypesetCache(self.dir).get(key), ([1, 2, 3, 4], b"dvi"))
+
+    def testPrune(self):
+        cache = text.TypesetCache(self.dir, maxsize=250)
+        keys = [cache.key(str(i)) for i in range(5)]
+        for i, key in enumerate(keys):
+            cache.put(key, [0, 0, 0, 0], b"x"*64)
+            filename = cache.filename(key)
+            os.utime(filename, (time.time() - 100 + i, time.time() - 100 + i))
+        self.assertEqual([cache.get(key) is not None for key in keys], [False, False, False, True, True])
+
+    def testEngineCacheHit(self):
+        cache = text.TypesetCache(self.dir)
+        engine = text.SingleTexEngine(cache=cache)
+        engine.preamble(r"\def\foo{foo}")
+        cache.put(engine._cachekey("bar"), [0, 10, 5, 0], dvidata(655360))
+        box = engine.text_pt(0, 0, "bar")
+        self.assertEqual(engine.state, text.STATE_START)
+        self.assertAlmostEqual(box.bbox().width_pt(), 10)
+        self.assertEqual(len(box.dvicanvas.items), 1)
+        boxes = engine.text_batch_pt([(0, 0, "bar"), (1, 1, "bar")])
+        self.assertEqual(engine.state, text.STATE_START)
+        self.assertEqual(len(boxes), 2)
+
+    def testEngineCacheKey(self):
+        cache = text.TypesetCache(self.dir)
+        engine1 = text.SingleLatexEngine(cache=cache)
+        engine2 = text.SingleLatexEngine(cache=cache)
+        engine2.preamble(r"\usepackage{amsmath}")
+        engine3 = text.SingleLatexEngine(cache=cache, docopt="12pt")
+        self.assertEqual(len(set(engine._cachekey("x") for engine in [engine1, engine2, engine3])), 3)
+
+
+class popen:
+
+    def wait(self):
+        return 0
+
+
+class dumpengine(text.SingleTexEngine):
+
+    # replaces the TeX interpreter by writing the preambles into the format
+
+    fail = False
+
+    def do_start(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.started.append(self.tmpdir)
+        self.popen = popen()
+        self.executed = []
+        self.state = text.STATE_PREAMBLE
+
+    def _execute(self, expr, texmessages, oldstate, newstate):
+        self.executed.append(expr)
+
+    def do_dump(self):
+        self.state = text.STATE_DONE
+        if self.fail:
+            raise text.TexResultError("dumping the format failed")
+        fmt = os.path.join(self.tmpdir, "texput.fmt")
+        with open(fmt, "w") as f:
+            f.write("".join(self.executed))
+        return fmt
+
+
+class FormatCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        dumpengine.started = []
+        self.texversion = mock.patch.object(text, "texversion", lambda cmd: "TeX 3.14")
+        self.texversion.start()
+
+    def tearDown(self):
+        self.texversion.stop()
+        shutil.rmtree(self.dir)
+
+    def engine(self, *preambles, **kwargs):
+        engine = dumpengine(formatcache=self.dir, **kwargs)
+        for expr in preambles:
+            engine.preambles.append((expr, []))
+        return engine
+
+    def testDump(self):
+        engine = self.engine(r"\def\foo{foo}")
+        fmt = engine.getformat()
+        self.assertEqual(os.path.dirname(fmt), self.dir)
+        with open(fmt) as f:
+            self.assertEqual(f.read(), r"\def\foo{foo}")
+        self.assertEqual(len(dumpengine.started), 1)
+        self.assertFalse(os.path.exists(dumpengine.started[0]))
+        self.assertEqual(engine.state, text.STATE_START)
+        self.assertEqual(engine.preambles, [(r"\def\foo{foo}", [])])
+
+    def testReuse(self):
+        fmt = self.engine(r"\def\foo{foo}").getformat()
+        self.assertEqual(self.engine(r"\def\foo{foo}").getformat(), fmt)
+        self.assertEqual(len(dumpengine.started), 1)
+
+    def testKey(self):
+        fmt = self.engine(r"\def\foo{foo}").getformat()
+        fmts = [self.engine(r"\def\foo{bar}").getformat(),
+                self.engine(r"\def\foo{foo}", texenc="latin-1").getformat()]
+        with mock.patch.object(text, "texversion", lambda cmd: "TeX 3.141"):
+            fmts.append(self.engine(r"\def\foo{foo}").getformat())
+        self.assertEqual(len(set([fmt] + fmts)), 4)
+        self.assertEqual(len(dumpengine.started), 4)
+
+    def testDumpFailed(self):
+        engine = self.engine(r"\def\foo{foo}")
+        engine.fail = True
+        with self.assertLogs("pyx", "WARNING"):
+            self.assertEqual(engine.getformat(), None)
+        self.assertEqual(os.listdir(self.dir), [])
+        self.assertEqual(engine.preambles, [(r"\def\foo{foo}", [])])
+        self.assertEqual(len(dumpengine.started), 1)
+        self.assertFalse(os.path.exists(dumpengine.started[0]))
+
+
+if __name__ == "__main__":
+    unittest.main()
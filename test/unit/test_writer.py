@@ -0,0 +1,46 @@
+import sys
+if sys.path[0] != "../..":
+    sys.path.insert(0, "../..")
+
+import unittest
+
+import base64, binascii, io, random
+from pyx import writer
+
+
+def encode(stream, data):
+    w = writer.writer(io.BytesIO())
+    stream(w, data)
+    return w.file.getvalue()
+
+
+class StreamTestCase(unittest.TestCase):
+
+    def testASCII85(self):
+        rng = random.Random(42)
+        for datalen in [0, 1, 3, 4, 5, 59, 60, 61, 63, 64, 65, 120, 123, 124, 1000, writer._chunklength, 2*writer._chunklength+61]:
+            data = bytes(rng.randrange(256) for i in range(datalen))
+            if datalen > 100:
+                data = data[:50] + bytes(20) + data[70:]
+            encoded = encode(writer.ascii85stream, data)
+            self.assertEqual(base64.a85decode(encoded, ignorechars=b"\n"), data)
+            self.assertNotIn(b"z", encoded)
+            lines = (encoded + b"\n").splitlines()
+            self.assertEqual(len(lines), writer.ascii85lines(datalen))
+            for line in lines[:-1]:
+                self.assertEqual(len(line), 75)
+
+    def testASCIIHex(self):
+        rng = random.Random(42)
+        for datalen in [0, 1, 31, 32, 33, 1000, writer._chunklength+1]:
+            data = bytes(rng.randrange(256) for i in range(datalen))
+            encoded = encode(writer.asciihexstream, data)
+            self.assertEqual(binascii.a2b_hex(encoded.replace(b"\n", b"")), data)
+            lines = encoded.splitlines()
+            self.assertEqual(len(lines), writer.asciihexlines(datalen))
+            self.assertTrue(all(len(line) == 64 for line in lines[:-1]))
+            self.assertTrue(not encoded or encoded.endswith(b"\n"))
+
+
+if __name__ == "__main__":
+    unittest.main()